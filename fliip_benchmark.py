@@ -0,0 +1,1000 @@
+## Imports
+# Standard Library Imports
+from datetime import datetime, timedelta, date
+import time
+import sys
+import json
+import argparse
+import subprocess
+import threading
+import tempfile
+import calendar
+from dataclasses import dataclass, field, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, parse_qsl, unquote
+from http.cookies import SimpleCookie
+from pathlib import Path
+
+# Local Imports
+import fliip_register_class
+
+# Benchmark runs must not fill the registering log file
+fliip_register_class.log_queue_listener.handlers = (
+    fliip_register_class.logging_stream_handler,
+)
+
+
+# Object to hold the configuration of one benchmark scenario
+@dataclass
+class BenchmarkScenario(object):
+    name: str
+    weekday_classes_to_register: dict[str, list[int]]
+    max_hours_in_future_to_register: int = 168
+    # Status of each class hour: "open" (X/Y), "FULL", "Confirmed", "Waiting" or "Canceled", cycled per day
+    class_status_cycle: list[str] = field(default_factory=lambda: ["open"])
+    privacy_popup: bool = False
+    google_calendar_popup: bool = False
+    out_of_membership: bool = False
+    latency_s: float = 0.05  # Delay added to each page response and modal display
+
+
+# Class hours of the fake gym, every day
+fake_class_hours = [6, 7, 9, 12, 16, 17, 18, 19]
+
+benchmark_scenarios = [
+    BenchmarkScenario(
+        name="one_class_per_week",
+        weekday_classes_to_register={"Tuesday": [12]},
+    ),
+    BenchmarkScenario(
+        name="popups",
+        weekday_classes_to_register={"Tuesday": [12]},
+        privacy_popup=True,
+        google_calendar_popup=True,
+    ),
+    BenchmarkScenario(
+        name="mixed_states",
+        weekday_classes_to_register={
+            "Monday": [12],
+            "Tuesday": [12],
+            "Wednesday": [12],
+            "Thursday": [12],
+            "Friday": [12],
+        },
+        class_status_cycle=["open", "FULL", "Confirmed", "Canceled", "Waiting"],
+    ),
+    BenchmarkScenario(
+        name="out_of_membership",
+        weekday_classes_to_register={"Tuesday": [12], "Thursday": [12]},
+        out_of_membership=True,
+    ),
+    BenchmarkScenario(
+        name="dozens_of_classes",
+        weekday_classes_to_register={
+            calendar.day_name[weekday]: [6, 12, 17] for weekday in range(7)
+        },
+        max_hours_in_future_to_register=2 * 168,
+    ),
+]
+
+
+## Fake Fliip Server
+# Recorded browser booking giving the fake server its booking requests and success response
+default_booking_bundle_path = (
+    Path(__file__).parent.joinpath("tests", "fixtures", "sample_booking").resolve()
+)
+fake_token_value = "benchmark"  # Value of the page tokens (e.g. CSRF) checked on the booking requests
+
+
+def _page_date_str(page_date: date) -> str:
+    # Same format as the one checked by the registering script
+    return page_date.strftime(f"%A %#d %b, %Y")
+
+
+def _match_booking_step(
+    booking_step: fliip_register_class.HttpBookingStep,
+    method: str,
+    path: str,
+    query: str,
+    body: str,
+    headers: dict[str, str],
+) -> dict[str, str] | None:
+    """Return the placeholder values sent by a request of a booking step, None if not a request of the step."""
+    if method != booking_step.method:
+        return None
+    path_segments = path.split("/")
+    template_segments = booking_step.path.split("/")
+    if len(path_segments) != len(template_segments):
+        return None
+    sent_values = []  # (value template, sent value) pairs
+    for template_segment, path_segment in zip(template_segments, path_segments):
+        if fliip_register_class._booking_placeholder_regex.fullmatch(template_segment):
+            sent_values.append((template_segment, unquote(path_segment)))
+        elif template_segment != path_segment:
+            return None
+    query_dict = dict(parse_qsl(query, keep_blank_values=True))
+    sent_values += [
+        (value_template, query_dict.get(query_name))
+        for query_name, value_template in booking_step.query
+    ]
+    lower_headers = {name.lower(): value for name, value in headers.items()}
+    sent_values += [
+        (value_template, lower_headers.get(header_name.lower()))
+        for header_name, value_template in booking_step.headers.items()
+    ]
+    if booking_step.body_format == "json":
+        try:
+            body_dict = json.loads(body)
+        except ValueError:
+            return None
+        sent_values += [
+            (
+                value_template.strip('"'),
+                field_value if isinstance(field_value, str) else json.dumps(field_value),
+            )
+            for field_name, value_template in booking_step.body
+            for field_value in [body_dict.get(field_name)]
+        ]
+    elif booking_step.body_format == "form":
+        body_dict = dict(parse_qsl(body, keep_blank_values=True))
+        sent_values += [
+            (value_template, body_dict.get(field_name))
+            for field_name, value_template in booking_step.body
+        ]
+    booking_values = {}
+    for value_template, sent_value in sent_values:
+        if sent_value is None:
+            return None  # Field of the step missing
+        placeholder_match = fliip_register_class._booking_placeholder_regex.fullmatch(
+            value_template
+        )
+        if placeholder_match is not None:
+            booking_values[placeholder_match.group(1)] = sent_value
+    return booking_values
+
+
+# Local stand-in of a Fliip gym web page (login, calendar week pages, booking modals and requests)
+class FakeFliipServer(object):
+    """
+    Serve Fliip like pages from HTML templates with injectable latency, popups and class states.
+
+    The booking requests (paths, fields, headers and tokens) and the success response are the ones
+    of the browser booking recorded in a fixture bundle (see fliip_register_class.find_recorded_booking).
+    """
+
+    def __init__(
+        self,
+        scenario: BenchmarkScenario,
+        booking_bundle_path: Path = default_booking_bundle_path,
+    ):
+        """
+        :param scenario: Pages and class states to serve.
+        :param booking_bundle_path: Fixture bundle of a browser booking (e.g. recorded with --record).
+        """
+        self.scenario = scenario
+        booking_manifest = fliip_register_class.load_fixture_bundle(booking_bundle_path)
+        recorded_booking = fliip_register_class.find_recorded_booking(booking_manifest)
+        if recorded_booking is None:
+            raise ValueError(f"No class booking in {booking_bundle_path}!")
+        _, page_tokens, booking_exchanges = recorded_booking
+        self.booking_steps = fliip_register_class.learn_http_booking_steps(
+            booking_manifest
+        )
+        self.page_token_names = list(page_tokens)
+        self.booking_exchanges = booking_exchanges
+        self.class_statuses: dict[tuple[str, int], str] = {}
+        self._sessions: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake_fliip_server", daemon=True
+        )
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def class_status(self, class_date: date, class_hour: int) -> str:
+        status_cycle = self.scenario.class_status_cycle
+        default_status = status_cycle[class_date.toordinal() % len(status_cycle)]
+        with self._lock:
+            return self.class_statuses.get(
+                (class_date.isoformat(), class_hour), default_status
+            )
+
+    def book_class(self, class_date: date, class_hour: int) -> str:
+        """Book a class and return its new status: "Confirmed", "Waiting" or the unchanged status."""
+        status = self.class_status(class_date, class_hour)
+        booked_status = {"open": "Confirmed", "FULL": "Waiting"}.get(status, status)
+        with self._lock:
+            self.class_statuses[(class_date.isoformat(), class_hour)] = booked_status
+        return booked_status
+
+    def handle_booking_request(
+        self, method: str, path: str, query: str, body: str, headers: dict[str, str]
+    ) -> tuple[int, str, str] | None:
+        """
+        Answer a request of the recorded booking sequence.
+
+        :return: Status, body and content type of the response, None if not a booking request.
+        """
+        for step_ind, booking_step in enumerate(self.booking_steps):
+            booking_values = _match_booking_step(booking_step, method, path, query, body, headers)
+            if booking_values is not None:
+                break
+        else:
+            return None
+        if any(
+            booking_values.get(f"token:{token_name}", fake_token_value) != fake_token_value
+            for token_name in self.page_token_names
+        ):
+            return 403, "Invalid token.", "text/plain"
+        class_id_str = booking_values.get("element_id", "").split(",")[0] or booking_values.get(
+            "arg0", ""
+        )
+        if not class_id_str.isdigit() or int(class_id_str) % 100 >= len(fake_class_hours):
+            return 400, "Unknown class.", "text/plain"
+        if self.scenario.out_of_membership:
+            # Error modal at the first request, or error message if the booking is one request
+            return 200, "You need a new membership to book this class.", "text/plain"
+        recorded_exchange = self.booking_exchanges[step_ind]
+        if step_ind < len(self.booking_steps) - 1:
+            return (
+                200,
+                recorded_exchange["body"] or "",
+                recorded_exchange["content_type"] or "text/html",
+            )
+        booked_status = self.book_class(
+            date.fromordinal(int(class_id_str) // 100),
+            fake_class_hours[int(class_id_str) % 100],
+        )
+        if booked_status == "Confirmed":
+            return (
+                200,
+                recorded_exchange["body"] or "",
+                recorded_exchange["content_type"] or "text/html",
+            )
+        elif booked_status == "Waiting":
+            return 200, "You have been added to the waiting list.", "text/plain"
+        return 200, "Booking error.", "text/plain"
+
+    def login_page(self) -> str:
+        privacy_popup = ""
+        if self.scenario.privacy_popup:
+            # Reject all button at /html/body/div[2]/div/div/div/div[2]/button[2]
+            privacy_popup = (
+                '<div id="privacy"><div><div><div><div>We use cookies.</div><div>'
+                "<button>Accept all</button>"
+                "<button onclick=\"document.getElementById('privacy').remove()\">Reject all</button>"
+                "</div></div></div></div></div>"
+            )
+        return (
+            "<html><head><title>Login</title></head><body>"
+            '<div id="login"><form method="post" action="/home/login">'
+            '<input type="hidden" name="csrf_token" value="benchmark">'
+            '<input id="username" name="username">'
+            '<input id="password" name="password" type="password">'
+            '<button type="submit">Login</button>'
+            "</form></div>"
+            f"{privacy_popup}</body></html>"
+        )
+
+    def calendar_page(self, page_date: date, show_google_calendar_popup: bool) -> str:
+        week_monday = page_date - timedelta(days=page_date.weekday())
+        day_cells = []
+        for day_ind in range(7):
+            class_date = week_monday + timedelta(days=day_ind)
+            class_cells = []
+            for class_ind, class_hour in enumerate(fake_class_hours):
+                status = self.class_status(class_date, class_hour)
+                class_id = class_date.toordinal() * 100 + class_ind
+                status_text = (
+                    f"{class_id % 15}/15" if status == "open" else status
+                )
+                register_icon = (
+                    f'<i class="subscribe-class-icon" style="display:inline-block;width:16px;height:16px" onclick="register({class_id},\'{class_date.isoformat()}\',{class_hour})"></i>'
+                    if status in ("open", "FULL")
+                    else ""
+                )
+                class_cells.append(
+                    f'<div class="table-chk" id="{class_id},{class_date.isoformat()}">'
+                    f"<p>{status_text}</p><p>CrossFit R&eacute;gulier</p>"
+                    f'<span class="class_time">{class_hour:02d}:00 - {class_hour + 1:02d}:00</span>'
+                    f"{register_icon}</div>"
+                )
+            day_cells.append(
+                f'<td class="day {calendar.day_abbr[class_date.weekday()].lower()}" data-classdate="{class_date.isoformat()}">'
+                + "".join(class_cells)
+                + "</td>"
+            )
+        google_calendar_popup = (
+            '<div class="modal" id="google_calendar_sync"><button class="close" '
+            "onclick=\"document.getElementById('google_calendar_sync').remove()\">x</button>"
+            "Sync your classes with Google Calendar!</div>"
+            if show_google_calendar_popup
+            else ""
+        )
+        page_token_meta_tags = "".join(
+            f'<meta name="{token_name}" content="{fake_token_value}">'
+            for token_name in self.page_token_names
+        )
+        next_week_date = (page_date + timedelta(days=7)).isoformat()
+        return (
+            f"<html><head>{page_token_meta_tags}<title>Calendar</title></head><body>"
+            '<div id="change_language"><div>'
+            "<button onclick=\"document.getElementById('language_menu').style.display='block'\">Language</button>"
+            '<div id="language_menu" style="display:none"><ul>'
+            '<li><a href="/home/change_language/en">English</a></li>'
+            '<li><a href="/home/change_language/fr">Fran&ccedil;ais</a></li>'
+            "</ul></div></div></div>"
+            f'<div><span id="current-date">{_page_date_str(page_date)}</span>'
+            f'<a id="next_week" href="/home/calendar?date={next_week_date}">Next week</a></div>'
+            f'<table><tr>{"".join(day_cells)}</tr></table>'
+            f"{google_calendar_popup}"
+            '<div id="book_confirm_modal" style="display:none"><div><div>'
+            "<div>Confirm your booking?</div>"
+            '<div><button id="confirm" onclick="confirmBooking()">Confirm</button></div>'
+            "</div></div></div>"
+            '<div id="book_confirm_error_modal" style="display:none"><div><div>'
+            '<div id="booking_error_text"></div>'
+            "<div><button onclick=\"hide('book_confirm_error_modal')\">Cancel</button></div>"
+            "</div></div></div>"
+            '<div id="modal_alert" style="display:none"><div><div>'
+            "<div><h4>Message</h4><button onclick=\"hide('modal_alert')\">x</button></div>"
+            '<div id="alert_text"></div>'
+            "</div></div></div>"
+            "<script>"
+            # Recorded booking requests sent with the values of the clicked class, the last one on confirm
+            f"var bookingSteps = {json.dumps([asdict(booking_step) for booking_step in self.booking_steps])};"
+            "var bookingValues = null;"
+            "function show(id) { document.getElementById(id).style.display = 'block'; }"
+            "function hide(id) { document.getElementById(id).style.display = 'none'; }"
+            "function fillTemplate(template, encode) {"
+            "  return template.replace(/\\{(element_id|class_date|start_time|arg\\d+|token:[^{}]+)\\}/g, function(placeholder, name) {"
+            "    var value = String(bookingValues[name]);"
+            "    return encode ? encodeURIComponent(value) : value;"
+            "  });"
+            "}"
+            "function encodePairs(pairs) {"
+            "  return pairs.map(function(pair) { return encodeURIComponent(pair[0]) + '=' + encodeURIComponent(fillTemplate(pair[1])); }).join('&');"
+            "}"
+            "function sendBookingStep(step) {"
+            "  var headers = {}; var body = null; var query = encodePairs(step.query);"
+            "  Object.keys(step.headers).forEach(function(name) { headers[name] = fillTemplate(step.headers[name]); });"
+            "  if (step.body_format === 'json') {"
+            "    var bodyJson = {};"
+            "    step.body.forEach(function(pair) { bodyJson[pair[0]] = JSON.parse(fillTemplate(pair[1])); });"
+            "    body = JSON.stringify(bodyJson); headers['Content-Type'] = 'application/json';"
+            "  } else if (step.body_format === 'form') {"
+            "    body = encodePairs(step.body); headers['Content-Type'] = 'application/x-www-form-urlencoded';"
+            "  }"
+            "  return fetch(fillTemplate(step.path, true) + (query ? '?' + query : ''), {method: step.method, headers: headers, body: body})"
+            "  .then(function(response) { return response.text(); });"
+            "}"
+            "function isMembershipError(text) { return text.toLowerCase().indexOf('new membership') !== -1; }"
+            "function runBookingSteps(steps) {"
+            "  return steps.reduce(function(previous, step) {"
+            "    return previous.then(function(text) { return isMembershipError(text) ? text : sendBookingStep(step); });"
+            "  }, Promise.resolve(''));"
+            "}"
+            "function register() {"
+            "  var box = window.event.target.closest('.table-chk');"
+            "  bookingValues = {element_id: box.id, class_date: box.id.split(',')[1],"
+            "    start_time: box.querySelector('.class_time').textContent.trim().slice(0, 5)};"
+            "  for (var i = 0; i < arguments.length; i++) { bookingValues['arg' + i] = String(arguments[i]); }"
+            "  document.querySelectorAll('meta[name]').forEach(function(meta) { bookingValues['token:' + meta.name] = meta.content; });"
+            "  runBookingSteps(bookingSteps.slice(0, -1)).then(function(text) {"
+            "    if (isMembershipError(text)) {"
+            "      document.getElementById('booking_error_text').textContent = text; show('book_confirm_error_modal');"
+            "    } else { show('book_confirm_modal'); }"
+            "  });"
+            "}"
+            "function confirmBooking() {"
+            "  hide('book_confirm_modal');"
+            "  runBookingSteps(bookingSteps.slice(-1)).then(function(text) {"
+            "    document.getElementById('alert_text').textContent = text; show('modal_alert');"
+            "  });"
+            "}"
+            "</script></body></html>"
+        )
+
+    def _handler_class(self):
+        fake_server = self
+
+        class FakeFliipRequestHandler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass  # Keep the benchmark output clean
+
+            def _session(self) -> dict | None:
+                cookie = SimpleCookie(self.headers.get("Cookie", ""))
+                if "fliip_session" not in cookie:
+                    return None
+                return fake_server._sessions.get(cookie["fliip_session"].value)
+
+            def _send(
+                self,
+                status: int,
+                body: str = "",
+                headers: dict[str, str] | None = None,
+                content_type: str = "text/html; charset=utf-8",
+            ) -> None:
+                time.sleep(fake_server.scenario.latency_s)
+                body_bytes = body.encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body_bytes)))
+                for header_name, header_value in (headers or {}).items():
+                    self.send_header(header_name, header_value)
+                self.end_headers()
+                self.wfile.write(body_bytes)
+
+            def _redirect(self, location: str, headers: dict[str, str] | None = None):
+                self._send(303, headers={"Location": location, **(headers or {})})
+
+            def _send_booking_response(self, method: str, body: str) -> bool:
+                url = urlparse(self.path)
+                booking_response = fake_server.handle_booking_request(
+                    method, url.path, url.query, body, dict(self.headers)
+                )
+                if booking_response is None:
+                    return False
+                status, response_body, content_type = booking_response
+                self._send(status, response_body, content_type=content_type)
+                return True
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/favicon.ico":
+                    self._send(200, content_type="image/x-icon")
+                elif url.path == "/home/login":
+                    self._send(200, fake_server.login_page())
+                elif self._session() is None:
+                    self._redirect("/home/login")
+                elif url.path == "/home/calendar":
+                    session = self._session()
+                    query = parse_qs(url.query)
+                    page_date = (
+                        date.fromisoformat(query["date"][0])
+                        if "date" in query
+                        else datetime.now().date()
+                    )
+                    # Google Calendar popup only on the first page after login
+                    show_google_calendar_popup = session.pop(
+                        "google_calendar_popup", False
+                    )
+                    self._send(
+                        200,
+                        fake_server.calendar_page(
+                            page_date, show_google_calendar_popup
+                        ),
+                    )
+                elif url.path.startswith("/home/change_language/"):
+                    self._session()["language"] = url.path.rsplit("/", 1)[-1]
+                    self._redirect("/home/calendar")
+                elif not self._send_booking_response("GET", ""):
+                    self._send(404, "Not found")
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+                form = parse_qs(body)
+                if url.path == "/home/login":
+                    if not form.get("username") or not form.get("password"):
+                        self._send(200, fake_server.login_page())
+                        return
+                    session_id = f"session{len(fake_server._sessions)}"
+                    fake_server._sessions[session_id] = {
+                        "google_calendar_popup": fake_server.scenario.google_calendar_popup
+                    }
+                    self._redirect(
+                        "/home/calendar",
+                        headers={"Set-Cookie": f"fliip_session={session_id}; Path=/"},
+                    )
+                elif self._session() is None:
+                    self._send(403, "Not logged in")
+                elif not self._send_booking_response("POST", body):
+                    self._send(404, "Not found")
+
+        return FakeFliipRequestHandler
+
+
+# Local server of a recorded fixture bundle (see fliip_register_class.SessionRecorder)
+class FixtureReplayServer(object):
+    """Serve the recorded exchanges of a fixture bundle at the recorded speed or faster."""
+
+    def __init__(self, bundle_dir_path: Path, speed: float = 1.0):
+        """
+        :param bundle_dir_path: Folder of the fixture bundle (with its manifest.json).
+        :param speed: Speed up factor of the recorded response times, 0 to reply without delay.
+        """
+        self.manifest = fliip_register_class.load_fixture_bundle(bundle_dir_path)
+        self.speed = speed
+        # Exchanges of each request served in the recorded order, the last one is repeated
+        self._exchanges: dict[tuple[str, str, str], list[dict]] = {}
+        for exchange in self.manifest["exchanges"]:
+            self._exchanges.setdefault(self._exchange_key(exchange), []).append(exchange)
+        self._served_counts: dict[tuple[str, str, str], int] = {}
+        # Requests received, in order: method, path, query, body and headers
+        self.received_requests: list[dict] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fixture_replay_server", daemon=True
+        )
+
+    @staticmethod
+    def _exchange_key(exchange: dict) -> tuple[str, str, str]:
+        return (
+            exchange["method"],
+            exchange["path"],
+            "&".join(sorted(exchange["query"].split("&"))),
+        )
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def calendar_pages(self) -> list[dict]:
+        """Return the recorded calendar page exchanges."""
+        return [
+            exchange
+            for exchange in self.manifest["exchanges"]
+            if exchange["method"] == "GET"
+            and exchange["body"] is not None
+            and fliip_register_class.parse_calendar_page_date(exchange["body"]) is not None
+        ]
+
+    def next_exchange(self, method: str, path: str, query: str) -> dict | None:
+        exchange_key = self._exchange_key({"method": method, "path": path, "query": query})
+        exchange_list = self._exchanges.get(exchange_key)
+        if exchange_list is None:
+            return None
+        with self._lock:
+            served_count = self._served_counts.get(exchange_key, 0)
+            self._served_counts[exchange_key] = served_count + 1
+        return exchange_list[min(served_count, len(exchange_list) - 1)]
+
+    def _handler_class(self):
+        replay_server = self
+
+        class FixtureReplayRequestHandler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass  # Keep the benchmark output clean
+
+            def _replay(self, method: str) -> None:
+                url = urlparse(self.path)
+                request_body = (
+                    self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+                    if method == "POST"
+                    else None
+                )
+                with replay_server._lock:
+                    replay_server.received_requests.append(
+                        {
+                            "method": method,
+                            "path": url.path,
+                            "query": url.query,
+                            "body": request_body,
+                            "headers": dict(self.headers),
+                        }
+                    )
+                exchange = replay_server.next_exchange(method, url.path, url.query)
+                if exchange is None:
+                    body_bytes = b"Not recorded"
+                    self.send_response(404)
+                    self.send_header("Content-Length", str(len(body_bytes)))
+                    self.end_headers()
+                    self.wfile.write(body_bytes)
+                    return
+                if replay_server.speed > 0:
+                    time.sleep(exchange["duration_s"] / replay_server.speed)
+                body_bytes = (exchange["body"] or "").encode()
+                self.send_response(exchange["status"])
+                if exchange["content_type"] is not None:
+                    content_type = exchange["content_type"]
+                    if "charset" not in content_type and content_type.startswith("text/"):
+                        content_type += "; charset=utf-8"
+                    self.send_header("Content-Type", content_type)
+                if exchange["location"] is not None:
+                    # Recorded redirects to the gym web page stay on the replay server
+                    location = urlparse(exchange["location"])
+                    self.send_header(
+                        "Location",
+                        location.path + (f"?{location.query}" if location.query else ""),
+                    )
+                self.send_header("Content-Length", str(len(body_bytes)))
+                self.end_headers()
+                self.wfile.write(body_bytes)
+
+            def do_GET(self):
+                self._replay("GET")
+
+            def do_POST(self):
+                self._replay("POST")
+
+        return FixtureReplayRequestHandler
+
+
+## Benchmark Harness
+def _peak_rss_mb() -> tuple[float | None, float | None]:
+    """Return the peak RSS in MB of this process and of its largest terminated child (e.g. chromedriver)."""
+    try:
+        import resource
+    except ImportError:
+        return None, None  # Not available on Windows
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    rss_unit_mb = 1 / (1024 * 1024) if sys.platform == "darwin" else 1 / 1024
+    return (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * rss_unit_mb,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * rss_unit_mb,
+    )
+
+
+def run_scenario(
+    scenario: BenchmarkScenario,
+    http_backend: bool = False,
+    headless: bool = True,
+    web_timeout: float = 5.0,
+    browser_profile_name: str = "lean",
+    multi_tab: bool = False,
+    learned_booking_steps: bool = True,
+) -> dict:
+    """
+    Run main against a fake Fliip server for a scenario.
+
+    :param learned_booking_steps: Save the fake server booking requests as learned ones, False to
+        book with the default HTTP booking requests.
+    :return: Dict with the wall time, per-step latencies, WebDriver/HTTP round trips, results and peak RSS.
+    """
+    with FakeFliipServer(scenario) as fake_server, tempfile.TemporaryDirectory() as temp_dir:
+        fliip_register_class.fliip_base_url_template = fake_server.base_url
+        # HTTP backend booking requests of the fake server, as if learned from a browser booking
+        fliip_register_class.http_booking_steps_file_path = Path(temp_dir).joinpath(
+            "fliip_http_booking.json"
+        )
+        if learned_booking_steps:
+            fliip_register_class.save_http_booking_steps(
+                fake_server.booking_steps,
+                learned_from=default_booking_bundle_path.name,
+                booking_steps_file_path=fliip_register_class.http_booking_steps_file_path,
+            )
+        fliip_register_class.default_browser_profile = (
+            fliip_register_class.browser_profiles[browser_profile_name]
+        )
+        start_time = time.perf_counter()
+        report = fliip_register_class.main(
+            fliip_gym_name="benchmark",
+            fliip_username="benchmark@fliip.test",
+            fliip_password="benchmark",
+            max_hours_in_future_to_register=scenario.max_hours_in_future_to_register,
+            weekday_classes_to_register=scenario.weekday_classes_to_register,
+            headless=headless,
+            web_timeout=web_timeout,
+            http_backend=http_backend,
+            use_session_cache=False,
+            use_state_store=False,
+            use_timetable_cache=False,
+            metrics_dir_path=None,
+            multi_tab=multi_tab,
+        )
+        wall_time_s = time.perf_counter() - start_time
+    peak_rss_mb, peak_children_rss_mb = _peak_rss_mb()
+    return {
+        "scenario": scenario.name,
+        "backend": "http"
+        if http_backend
+        else f"selenium ({browser_profile_name}{', tabs' if multi_tab else ''})",
+        "wall_time_s": wall_time_s,
+        "registered": len(report.registered_date_list),
+        "errors": len(report.error_date_list),
+        "spans": {
+            span_name: {"count": span_count, "total_s": span_total_s}
+            for span_name, (
+                span_count,
+                span_total_s,
+            ) in report.metrics.span_durations().items()
+        },
+        "counters": report.metrics.to_dict()["counters"],
+        "peak_rss_mb": peak_rss_mb,
+        "peak_children_rss_mb": peak_children_rss_mb,
+    }
+
+
+def run_benchmark(
+    scenario_names: list[str] | None = None,
+    latency_s: float | None = None,
+    http_backend: bool = False,
+    web_timeout: float = 5.0,
+    browser_profile_name: str = "lean",
+    multi_tab: bool = False,
+) -> list[dict]:
+    """
+    Run each scenario in its own process (isolated peak RSS) and return their results.
+
+    :param scenario_names: Names of the scenarios to run, all if None.
+    :param latency_s: Override of the scenarios injected latency.
+    """
+    result_list = []
+    for scenario in benchmark_scenarios:
+        if scenario_names is not None and scenario.name not in scenario_names:
+            continue
+        command = [
+            sys.executable,
+            str(Path(__file__).resolve()),
+            "--run-scenario",
+            scenario.name,
+            "--web-timeout",
+            str(web_timeout),
+            "--browser-profile",
+            browser_profile_name,
+        ]
+        if latency_s is not None:
+            command += ["--latency", str(latency_s)]
+        if http_backend:
+            command.append("--http-backend")
+        if multi_tab:
+            command.append("--multi-tab")
+        scenario_process = subprocess.run(
+            command, capture_output=True, text=True, check=True
+        )
+        result_list.append(json.loads(scenario_process.stdout.strip().splitlines()[-1]))
+    return result_list
+
+
+def run_replay(
+    bundle_dir_path: Path,
+    speed: float = 1.0,
+    http_backend: bool = False,
+    headless: bool = True,
+    web_timeout: float = 5.0,
+    browser_profile_name: str = "lean",
+    parse_iterations: int = 20,
+) -> dict:
+    """
+    Replay the calendar pages of a fixture bundle and time the parsing and booking hot paths.
+
+    The week pages are loaded by path from the replay server (main picks its weeks from the
+    current date, it can't run against pages recorded another day), parsed, and the first
+    bookable class of each page is booked with the in-browser booking script.
+
+    :param speed: Speed up factor of the recorded response times, 0 to reply without delay.
+    :param parse_iterations: Number of parses of each page timed.
+    :return: Dict with the wall time, per-step latencies, round trips and classes of each page.
+    """
+    with FixtureReplayServer(bundle_dir_path, speed=speed) as replay_server:
+        metrics = fliip_register_class.RunMetrics(replay=bundle_dir_path.name)
+        page_result_list = []
+        start_time = time.perf_counter()
+        if http_backend:
+            http_session = fliip_register_class.FliipHttpSession(
+                fliip_gym_name=replay_server.manifest["fliip_gym_name"],
+                web_timeout=web_timeout,
+                base_url=replay_server.base_url,
+                metrics=metrics,
+            )
+        else:
+            fliip_register_class.default_browser_profile = (
+                fliip_register_class.browser_profiles[browser_profile_name]
+            )
+            web_handle = fliip_register_class.get_web_web_handle(
+                headless=headless, web_timeout=web_timeout, metrics=metrics
+            )
+        try:
+            for exchange in replay_server.calendar_pages():
+                page_path = exchange["path"] + (
+                    f"?{exchange['query']}" if exchange["query"] else ""
+                )
+                with metrics.span("week_page_load", page=page_path):
+                    if http_backend:
+                        page_source = http_session._get(page_path).text
+                    else:
+                        web_handle.driver.get(f"{replay_server.base_url}{page_path}")
+                        page_source = web_handle.driver.page_source
+                for _ in range(parse_iterations):
+                    with metrics.span("week_page_parse"):
+                        week_classes = fliip_register_class.parse_calendar_week_page(
+                            page_source
+                        )
+                page_result = {
+                    "page": page_path,
+                    "classes": len(week_classes),
+                    "statuses": sorted(
+                        calendar_class.status for calendar_class in week_classes.values()
+                    ),
+                    "booking": None,
+                }
+                bookable_class = next(
+                    (
+                        calendar_class
+                        for calendar_class in week_classes.values()
+                        if calendar_class.status == "open"
+                        and calendar_class.register_onclick is not None
+                    ),
+                    None,
+                )
+                if bookable_class is not None and not http_backend:
+                    # Booking requests answered from the bundle (404 if none was recorded)
+                    try:
+                        page_result["booking"] = fliip_register_class._book_class_in_browser(
+                            web_handle=web_handle,
+                            element_id=bookable_class.element_id,
+                            datetime_to_register=datetime.strptime(
+                                f"{bookable_class.class_date} {bookable_class.start_time}",
+                                "%Y-%m-%d %H:%M",
+                            ),
+                        )
+                    except Exception as e:
+                        page_result["booking"] = repr(e)
+                page_result_list.append(page_result)
+        finally:
+            if http_backend:
+                http_session.close()
+            else:
+                web_handle.close()
+        wall_time_s = time.perf_counter() - start_time
+    peak_rss_mb, peak_children_rss_mb = _peak_rss_mb()
+    return {
+        "scenario": f"replay:{bundle_dir_path.name}",
+        "backend": "http" if http_backend else f"selenium ({browser_profile_name})",
+        "wall_time_s": wall_time_s,
+        "registered": sum(
+            page_result["booking"] is True for page_result in page_result_list
+        ),
+        "errors": sum(
+            isinstance(page_result["booking"], str) for page_result in page_result_list
+        ),
+        "pages": page_result_list,
+        "spans": {
+            span_name: {"count": span_count, "total_s": span_total_s}
+            for span_name, (span_count, span_total_s) in metrics.span_durations().items()
+        },
+        "counters": metrics.to_dict()["counters"],
+        "peak_rss_mb": peak_rss_mb,
+        "peak_children_rss_mb": peak_children_rss_mb,
+    }
+
+
+def format_results(result_list: list[dict]) -> str:
+    """Return the benchmark results as a text table."""
+    lines = [
+        f"{'scenario':<22}{'backend':<28}{'wall (s)':>10}{'booked':>8}{'errors':>8}{'round trips':>13}{'peak RSS (MB)':>15}{'children RSS (MB)':>19}"
+    ]
+    for result in result_list:
+        round_trips = result["counters"].get(
+            "webdriver_commands", result["counters"].get("http_requests", 0)
+        )
+        peak_rss = (
+            f"{result['peak_rss_mb']:.0f}" if result["peak_rss_mb"] is not None else "n/a"
+        )
+        peak_children_rss = (
+            f"{result['peak_children_rss_mb']:.0f}"
+            if result["peak_children_rss_mb"] is not None
+            else "n/a"
+        )
+        lines.append(
+            f"{result['scenario']:<22}{result['backend']:<28}{result['wall_time_s']:>10.2f}"
+            f"{result['registered']:>8}{result['errors']:>8}{round_trips:>13}{peak_rss:>15}{peak_children_rss:>19}"
+        )
+        for span_name, span in result["spans"].items():
+            lines.append(
+                f"    {span_name:<30}{span['count']:>5} x {span['total_s'] / span['count']:.3f}s"
+            )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(
+        description="Offline Fliip registering benchmark against a local fake Fliip server."
+    )
+    argument_parser.add_argument(
+        "--scenario",
+        action="append",
+        help="Scenario to run (can be repeated), all by default: "
+        + ", ".join(scenario.name for scenario in benchmark_scenarios),
+    )
+    argument_parser.add_argument(
+        "--latency", type=float, help="Injected latency of each response in seconds."
+    )
+    argument_parser.add_argument(
+        "--http-backend", action="store_true", help="Use the HTTP only backend."
+    )
+    argument_parser.add_argument(
+        "--web-timeout", type=float, default=5.0, help="Webdriver timeout in seconds."
+    )
+    argument_parser.add_argument(
+        "--browser-profile",
+        choices=sorted(fliip_register_class.browser_profiles),
+        default="lean",
+        help="Chrome performance profile of the selenium backend.",
+    )
+    argument_parser.add_argument(
+        "--multi-tab",
+        action="store_true",
+        help="Load the target weeks in parallel tabs (selenium backend).",
+    )
+    argument_parser.add_argument(
+        "--replay",
+        type=Path,
+        action="append",
+        help="Fixture bundle recorded with --record to replay instead of the scenarios (can be repeated).",
+    )
+    argument_parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="Replay speed up factor of the recorded response times, 0 for no delay.",
+    )
+    argument_parser.add_argument(
+        "--json", type=Path, help="Also write the results to this JSON file."
+    )
+    argument_parser.add_argument(
+        "--run-scenario", help=argparse.SUPPRESS
+    )  # Child process running one scenario
+    arguments = argument_parser.parse_args()
+
+    if arguments.run_scenario is not None:
+        scenario = next(
+            scenario
+            for scenario in benchmark_scenarios
+            if scenario.name == arguments.run_scenario
+        )
+        if arguments.latency is not None:
+            scenario.latency_s = arguments.latency
+        print(
+            json.dumps(
+                run_scenario(
+                    scenario,
+                    http_backend=arguments.http_backend,
+                    web_timeout=arguments.web_timeout,
+                    browser_profile_name=arguments.browser_profile,
+                    multi_tab=arguments.multi_tab,
+                )
+            )
+        )
+        raise SystemExit()
+
+    if arguments.replay is not None:
+        benchmark_result_list = [
+            run_replay(
+                bundle_dir_path,
+                speed=arguments.speed,
+                http_backend=arguments.http_backend,
+                web_timeout=arguments.web_timeout,
+                browser_profile_name=arguments.browser_profile,
+            )
+            for bundle_dir_path in arguments.replay
+        ]
+        print(format_results(benchmark_result_list))
+        if arguments.json is not None:
+            with open(arguments.json, "w") as json_file:
+                json.dump(benchmark_result_list, json_file, indent=2)
+        raise SystemExit()
+
+    benchmark_result_list = run_benchmark(
+        scenario_names=arguments.scenario,
+        latency_s=arguments.latency,
+        http_backend=arguments.http_backend,
+        web_timeout=arguments.web_timeout,
+        browser_profile_name=arguments.browser_profile,
+        multi_tab=arguments.multi_tab,
+    )
+    print(format_results(benchmark_result_list))
+    if arguments.json is not None:
+        with open(arguments.json, "w") as json_file:
+            json.dump(benchmark_result_list, json_file, indent=2)
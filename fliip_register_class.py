@@ -1,31 +1,133 @@
 ## Imports
+from __future__ import annotations  # Annotations of the deferred third party types are not evaluated
+
 # Standard Library Imports
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
 import time
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field, asdict
 import logging
 import calendar
 from pathlib import Path
+from html.parser import HTMLParser
+import re
+from typing import Callable, TYPE_CHECKING
+import json
+import hashlib
+import base64
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import argparse
+import sqlite3
+import tempfile
+import shutil
+import logging.handlers
+import queue
+import contextvars
+import gzip
+from contextlib import contextmanager
+import weakref
+import copy
+import uuid
+import urllib.parse
+import html
+import random
+import atexit
+import signal
+import sys
+import asyncio
+import functools
+from multiprocessing.connection import Listener, Client
 
 # Third Party Imports
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.webdriver import (
-    WebDriver,
-)  # For typing of function attributes
-
-import dateutil.parser as parser
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
+# Deferred to their first use (see the _load_* functions), a run with nothing to register starts fast
+if TYPE_CHECKING:
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.chrome.webdriver import (
+        WebDriver,
+    )  # For typing of function attributes
+    import requests
+    from cryptography.fernet import Fernet
+    import smtplib
+    from email.mime.multipart import MIMEMultipart
+    import psutil
+
+_lazy_import_lock = threading.RLock()
+
+
+# Run a deferred import function once, its module names are then used as if imported at the top
+def _lazy_import(import_function: Callable[[], None]) -> Callable[[], None]:
+    imported = threading.Event()  # Set once all the names are bound, no thread sees them half imported
+
+    @functools.wraps(import_function)
+    def load() -> None:
+        if imported.is_set():
+            return
+        with _lazy_import_lock:
+            if not imported.is_set():
+                import_function()
+                imported.set()
+
+    return load
+
+
+@_lazy_import
+def _load_selenium() -> None:
+    global webdriver, By, Keys, WebDriverWait, EC
+    global TimeoutException, NoSuchElementException, StaleElementReferenceException
+    global WebDriverException, InvalidSessionIdException
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.common.keys import Keys
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import (
+        TimeoutException,
+        NoSuchElementException,
+        StaleElementReferenceException,
+        WebDriverException,
+        InvalidSessionIdException,
+    )
+
+
+@_lazy_import
+def _load_psutil() -> None:
+    global psutil
+    import psutil
+
+
+@_lazy_import
+def _load_dateutil() -> None:
+    global dateutil_parser
+    import dateutil.parser as dateutil_parser
+
+
+@_lazy_import
+def _load_requests() -> None:
+    global requests, HTTPAdapter
+    import requests
+    from requests.adapters import HTTPAdapter
+
+
+@_lazy_import
+def _load_cryptography() -> None:
+    global Fernet, InvalidToken
+    from cryptography.fernet import Fernet, InvalidToken
+
+
+@_lazy_import
+def _load_email() -> None:
+    global smtplib, MIMEText, MIMEMultipart, MIMEBase, encoders
+    import smtplib
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.base import MIMEBase
+    from email import encoders
+
 
 # Configure logging
+# Records are put in a queue by the callers and written by a background thread (see log_queue_listener),
+# logging never waits on the disk nor the console
 # Common logging config
 logging_common_formatting_string = (
     "%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s"
@@ -33,14 +135,192 @@ logging_common_formatting_string = (
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)  # Set the logger level to DEBUG
 
-# Logging file handler config (logs to a file)
+# Fields added to the records logged in a log_context block (run, account and class)
+log_context_fields = ("run_id", "account", "class_datetime")
+_log_context: contextvars.ContextVar[dict[str, str]] = contextvars.ContextVar(
+    "fliip_log_context", default={}
+)
+
+
+@contextmanager
+def log_context(**fields: str):
+    """Tag the records logged in the enclosed block (and the threads and tasks it starts) with fields."""
+    log_context_token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(log_context_token)
+
+
+def _add_log_context(record: logging.LogRecord) -> bool:
+    # Filter of the queue handler, runs in the thread logging the record before it is queued
+    for field_name, field_value in _log_context.get().items():
+        setattr(record, field_name, field_value)
+    return True
+
+
+# One JSON object per line: time, level, source, message and context fields
+class JsonLinesFormatter(logging.Formatter):
+    """Format the records as JSON lines, parsed back by _log_line_datetime and read_run_log."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        log_entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "file": record.filename,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        for field_name in log_context_fields:
+            field_value = getattr(record, field_name, None)
+            if field_value is not None:
+                log_entry[field_name] = field_value
+        # Traceback formatted by the queue handler (see LogQueueHandler), or here if logged directly
+        exc_text = (
+            self.formatException(record.exc_info) if record.exc_info else record.exc_text
+        )
+        if exc_text:
+            log_entry["exc"] = exc_text
+        if record.stack_info:
+            log_entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(log_entry, ensure_ascii=False)
+
+
+# Queue handler keeping the traceback out of the message, formatted apart by each handler formatter
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """Queue the records with their message merged and traceback text formatted, in the logging thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            # Traceback objects are formatted now, while their frames are alive
+            record.exc_text = logging_stream_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+# Byte offsets of the log file lines of each run, a run log is then read with a seek (see read_run_log)
+class RunLogIndex(logging.Handler):
+    """Sidecar index of the (first, end) byte offsets of the records of each run in the log file."""
+
+    def __init__(
+        self,
+        index_file_path: Path,
+        max_runs: int = 1000,
+        save_period_s: float = 1.0,
+    ):
+        """
+        :param index_file_path: Path to the JSON index file, next to the log file.
+        :param max_runs: Number of most recent runs kept in the index.
+        :param save_period_s: Min period between two index file writes (also written by flush_logs).
+        """
+        super().__init__()
+        self.index_file_path = index_file_path
+        self.max_runs = max_runs
+        self.save_period_s = save_period_s
+        self.run_offsets: dict[str, list[int]] | None = None  # Loaded at first use
+        # Runs logging when the log file rotated, their lines span files and are found by a scan
+        self.rotated_run_ids: dict[str, None] = {}
+        self._last_save_time = 0.0
+        self._index_lock = threading.Lock()
+
+    def _load(self) -> dict[str, list[int]]:
+        if self.run_offsets is None:
+            try:
+                with open(self.index_file_path) as index_file:
+                    self.run_offsets = json.load(index_file)
+            except (OSError, ValueError):
+                self.run_offsets = {}
+        return self.run_offsets
+
+    def mark_start(self, record: logging.LogRecord) -> bool:
+        """Filter of the log file handler, keep the offset of the record before it is written."""
+        log_stream = logging_file_handler.stream
+        try:
+            record.log_file_offset = (
+                log_stream.tell()
+                if log_stream is not None
+                else get_log_file_offset(Path(logging_file_handler.baseFilename))
+            )
+        except (OSError, ValueError):
+            record.log_file_offset = None  # Log file closed meanwhile (e.g. by clean_old_log_entries)
+        return True
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Called after the file handler wrote the record (same listener thread)
+        start_offset = getattr(record, "log_file_offset", None)
+        log_stream = logging_file_handler.stream
+        if start_offset is None or log_stream is None:
+            return  # Not written to the log file (level below the file handler one)
+        try:
+            end_offset = log_stream.tell()
+        except (OSError, ValueError):
+            return
+        run_id = getattr(record, "run_id", None)
+        with self._index_lock:
+            run_offsets = self._load()
+            if end_offset <= start_offset:
+                # Log file rotated before the record was written, offsets of the old file are gone
+                self.rotated_run_ids.update(dict.fromkeys(run_offsets))
+                while len(self.rotated_run_ids) > self.max_runs:
+                    del self.rotated_run_ids[next(iter(self.rotated_run_ids))]  # Oldest run
+                run_offsets.clear()
+                start_offset = 0
+            if run_id is not None and run_id not in self.rotated_run_ids:
+                run_offsets.setdefault(run_id, [start_offset, end_offset])[1] = end_offset
+                if len(run_offsets) > self.max_runs:
+                    del run_offsets[next(iter(run_offsets))]  # Oldest run
+        if time.monotonic() - self._last_save_time >= self.save_period_s:
+            self.save()
+
+    def get(self, run_id: str) -> tuple[int, int] | None:
+        """Return the (first, end) byte offsets of the records of a run, None if not indexed."""
+        with self._index_lock:
+            run_offset = self._load().get(run_id)
+        return tuple(run_offset) if run_offset is not None else None
+
+    def rebuild(self, log_file_path: Path) -> None:
+        """Index the whole log file again (e.g. after old entries were removed)."""
+        run_offsets: dict[str, list[int]] = {}
+        offset = 0
+        with open(log_file_path, "rb") as log_file:
+            for line in log_file:
+                run_id = _log_line_run_id(line)
+                if run_id is not None:
+                    run_offsets.setdefault(run_id, [offset, 0])[1] = offset + len(line)
+                offset += len(line)
+        with self._index_lock:
+            self.run_offsets = run_offsets
+        self.save()
+
+    def save(self) -> None:
+        with self._index_lock:
+            if self.run_offsets is None:
+                return
+            index_json = json.dumps(self.run_offsets)
+            self._last_save_time = time.monotonic()
+        temp_index_file_path = self.index_file_path.with_suffix(".tmp")
+        temp_index_file_path.write_text(index_json)
+        os.replace(temp_index_file_path, self.index_file_path)
+
+
+# Logging file handler config (logs to a file, opened at the first record)
 logging_file_path = (
     Path(__file__).parent.joinpath("fliip_register.log").resolve()
 )  # Default log file path
-logging_file_handler = logging.FileHandler(logging_file_path)
+logging_file_handler = logging.FileHandler(logging_file_path, delay=True)
 logging_file_handler.setLevel(logging.INFO)  # Log only errors and above to the file
-logging_file_formatter = logging.Formatter(logging_common_formatting_string)
+logging_file_formatter = JsonLinesFormatter()
 logging_file_handler.setFormatter(logging_file_formatter)
+run_log_index = RunLogIndex(
+    logging_file_path.with_name(f"{logging_file_path.name}.index.json")
+)  # Default run log index path, next to the log file
+logging_file_handler.addFilter(run_log_index.mark_start)
 
 # Logging stream handler config (logs to the console)
 logging_stream_handler = logging.StreamHandler()
@@ -48,9 +328,48 @@ logging_stream_handler.setLevel(logging.INFO)  # Log info and above to the conso
 logging_stream_formatter = logging.Formatter(logging_common_formatting_string)
 logging_stream_handler.setFormatter(logging_stream_formatter)
 
-# Add handlers to the logger
-logger.addHandler(logging_file_handler)
-logger.addHandler(logging_stream_handler)
+# Add the queue handler to the logger, the handlers are called by the listener thread
+log_queue: queue.Queue[logging.LogRecord] = queue.Queue()
+logging_queue_handler = LogQueueHandler(log_queue)
+logging_queue_handler.addFilter(_add_log_context)
+logger.addHandler(logging_queue_handler)
+log_queue_listener = logging.handlers.QueueListener(
+    log_queue,
+    logging_file_handler,
+    run_log_index,
+    logging_stream_handler,
+    respect_handler_level=True,
+)
+log_queue_listener.start()
+
+
+def flush_logs() -> None:
+    """Wait for the queued records to be written and save the run log index."""
+    if log_queue_listener._thread is not None:
+        log_queue.join()
+    run_log_index.save()
+
+
+def _stop_log_queue_listener() -> None:
+    log_queue_listener.stop()  # Writes the queued records first
+    run_log_index.save()
+
+
+atexit.register(_stop_log_queue_listener)  # Registered first, runs after the other exit handlers
+
+
+# Fliip gym web page URL, can be pointed to a local stand-in server (e.g. for benchmarks)
+fliip_base_url_template = "https://{fliip_gym_name}.fliipapp.com"
+
+
+def get_fliip_base_url(fliip_gym_name: str) -> str:
+    """Return the web page URL of a Fliip gym (without trailing slash)."""
+    return fliip_base_url_template.format(fliip_gym_name=fliip_gym_name).rstrip("/")
+
+
+def get_calendar_week_url(fliip_gym_name: str, week_date: date) -> str:
+    """Return the calendar page URL of the week of a date (date query parameter)."""
+    return f"{get_fliip_base_url(fliip_gym_name)}{fliip_calendar_path}?date={week_date.strftime('%Y-%m-%d')}"
 
 
 def weekday_short_str(dt: datetime) -> str:
@@ -58,6 +377,27 @@ def weekday_short_str(dt: datetime) -> str:
     return calendar.day_abbr[dt.weekday()].lower()
 
 
+# Parse the timestamp of a log line, None if the line doesn't start with one (e.g. traceback lines)
+def _log_line_datetime(line: str) -> datetime | None:
+    try:
+        if line.startswith("{"):
+            return datetime.fromisoformat(json.loads(line)["time"])
+        # Text line of the log files written before the JSON lines format
+        return datetime.strptime(line.split(" - ")[0], "%Y-%m-%d %H:%M:%S,%f")
+    except (ValueError, IndexError, KeyError, TypeError):
+        return None
+
+
+# Run id of a JSON log line, None if it has none
+def _log_line_run_id(line: bytes) -> str | None:
+    if not line.startswith(b"{"):
+        return None
+    try:
+        return json.loads(line).get("run_id")
+    except ValueError:
+        return None
+
+
 def clean_old_log_entries(
     log_file_path: Path,
     days_threshold: int = 31,
@@ -65,60 +405,455 @@ def clean_old_log_entries(
     """
     Remove log entries older than the specified threshold from the log file.
 
+    The log file is in timestamp order, so it is streamed up to the first recent entry and
+    the rest is copied as is to a temporary file that atomically replaces the log file.
+
     :param log_file_path: Path to the log file.
     :param days_threshold: Number of days to keep log entries.
     """
+    log_file_path = Path(log_file_path)
+    if not log_file_path.exists():
+        return  # Nothing logged yet (the log file is opened at the first record)
+    # Hold the file handler while rewriting so no entry is lost, and close its stream
+    # (reopened on next log) so the file can be replaced on Windows too
+    is_logging_file = Path(logging_file_handler.baseFilename) == log_file_path.resolve()
+    if is_logging_file:
+        logging_file_handler.acquire()
+    temp_file_path = None
     try:
+        if is_logging_file:
+            logging_file_handler.close()
         threshold_date = datetime.now() - timedelta(days=days_threshold)
-        with open(log_file_path, "r") as log_file:
-            lines = log_file.readlines()
+        dropped_line_count = 0
+        with open(log_file_path, "r") as log_file, tempfile.NamedTemporaryFile(
+            "w", dir=log_file_path.parent, prefix=log_file_path.name, delete=False
+        ) as temp_file:
+            temp_file_path = Path(temp_file.name)
+            for line in log_file:
+                log_date = _log_line_datetime(line)
+                if log_date is None:
+                    # If the line doesn't match the expected format, keep it (e.g., header lines)
+                    temp_file.write(line)
+                elif log_date >= threshold_date:
+                    # All next entries are recent, copy them without parsing
+                    temp_file.write(line)
+                    shutil.copyfileobj(log_file, temp_file)
+                    break
+                else:
+                    dropped_line_count += 1
 
-        # Filter log entries based on the threshold
-        recent_lines = []
-        for line in lines:
-            try:
-                # Extract the timestamp from the log entry
-                timestamp_str = line.split(" - ")[0]
-                log_date = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S,%f")
-                if log_date >= threshold_date:
-                    recent_lines.append(line)
-            except (ValueError, IndexError):
-                # If the line doesn't match the expected format, keep it (e.g., header lines)
-                recent_lines.append(line)
-
-        # Rewrite the log file with recent entries
-        with open(log_file_path, "w") as log_file:
-            log_file.writelines(recent_lines)
+        if dropped_line_count > 0:
+            os.replace(temp_file_path, log_file_path)
+            temp_file_path = None
+            if is_logging_file:
+                run_log_index.rebuild(log_file_path)  # Offsets shifted by the removed lines
 
         logger.debug(
             f"Old log entries older than {days_threshold} days ({threshold_date}) have been cleaned."
         )
     except Exception as e:
         logger.error(f"Failed to clean old log entries: {e}")
+    finally:
+        if temp_file_path is not None:
+            temp_file_path.unlink(missing_ok=True)
+        if is_logging_file:
+            logging_file_handler.release()
+
+
+def configure_log_rotation(
+    rotation: str,
+    max_bytes: int = 1_000_000,
+    when: str = "midnight",
+    backup_count: int = 31,
+) -> None:
+    """
+    Replace the log file handler by a rotating one, as an alternative to clean_old_log_entries.
+
+    :param rotation: "size" to rotate when the file reaches max_bytes, "time" to rotate at each when interval.
+    :param max_bytes: Max log file size for the "size" rotation.
+    :param when: Rotation interval of the "time" rotation (see logging.handlers.TimedRotatingFileHandler).
+    :param backup_count: Number of rotated log files to keep.
+    """
+    global logging_file_handler
+    if rotation == "size":
+        rotating_file_handler = logging.handlers.RotatingFileHandler(
+            logging_file_path, maxBytes=max_bytes, backupCount=backup_count
+        )
+    elif rotation == "time":
+        rotating_file_handler = logging.handlers.TimedRotatingFileHandler(
+            logging_file_path, when=when, backupCount=backup_count
+        )
+    else:
+        raise ValueError(f"Unknown log rotation {rotation}, expected 'size' or 'time'.")
+    rotating_file_handler.setLevel(logging_file_handler.level)
+    rotating_file_handler.setFormatter(logging_file_handler.formatter)
+    rotating_file_handler.addFilter(run_log_index.mark_start)
+    flush_logs()
+    # The listener calls the handlers in order, the run log index right after the file handler
+    log_queue_listener.handlers = tuple(
+        rotating_file_handler if handler is logging_file_handler else handler
+        for handler in log_queue_listener.handlers
+    )
+    logging_file_handler.close()
+    logging_file_handler = rotating_file_handler
+
+
+## Instrumentation
+run_metrics_dir_path = (
+    Path(__file__).parent.joinpath("fliip_metrics").resolve()
+)  # Default folder of the JSON run traces
+run_metrics_max_age_days = 31  # JSON run traces kept as long as the log entries
+run_metrics_max_traces = 1000  # Most recent JSON run traces kept (e.g. daemon runs every few minutes)
+
+
+# Timed spans and counters of one run
+class RunMetrics(object):
+    """Per-step timing spans and counters (e.g. WebDriver round trips) exported as a JSON trace."""
+
+    def __init__(self, run_id: str | None = None, **labels: str):
+        """
+        :param run_id: Unique id of the run, generated if None.
+        :param labels: Labels of the run (e.g. gym and username) added to the exports.
+        """
+        self.run_id = run_id if run_id is not None else uuid.uuid4().hex[:12]
+        self.labels = labels
+        self.start_time = time.time()
+        self.spans: list[dict] = []
+        self.counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Time the enclosed block as a span named name."""
+        start_time = time.time()
+        start_counter = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = repr(e)
+            raise
+        finally:
+            span = {
+                "name": name,
+                "start": start_time,
+                "duration_s": time.perf_counter() - start_counter,
+            }
+            if attributes:
+                span["attributes"] = attributes
+            if error is not None:
+                span["error"] = error
+            with self._lock:
+                self.spans.append(span)
+
+    def record_span(
+        self, name: str, start_time: float, duration_s: float, **attributes
+    ) -> None:
+        """Add a span timed outside of python (e.g. inside the browser)."""
+        span = {"name": name, "start": start_time, "duration_s": duration_s}
+        if attributes:
+            span["attributes"] = attributes
+        with self._lock:
+            self.spans.append(span)
+
+    def count(self, name: str, increment: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + increment
+
+    def span_durations(self) -> dict[str, tuple[int, float]]:
+        """Return the (count, total duration in seconds) of the spans by name."""
+        span_durations: dict[str, tuple[int, float]] = {}
+        with self._lock:
+            for span in self.spans:
+                span_count, span_total_s = span_durations.get(span["name"], (0, 0.0))
+                span_durations[span["name"]] = (
+                    span_count + 1,
+                    span_total_s + span["duration_s"],
+                )
+        return span_durations
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "run_id": self.run_id,
+                "labels": self.labels,
+                "start": self.start_time,
+                "duration_s": time.time() - self.start_time,
+                "spans": list(self.spans),
+                "counters": dict(self.counters),
+            }
+
+    def write_json_trace(self, metrics_dir_path: Path = run_metrics_dir_path) -> Path:
+        """Write the run trace to metrics_dir_path/trace_{start}_{run_id}.json and return its path."""
+        metrics_dir_path.mkdir(parents=True, exist_ok=True)
+        trace_file_path = metrics_dir_path.joinpath(
+            f"trace_{datetime.fromtimestamp(self.start_time).strftime('%Y%m%d_%H%M%S')}_{self.run_id}.json"
+        )
+        with open(trace_file_path, "w") as trace_file:
+            json.dump(self.to_dict(), trace_file, indent=2)
+        return trace_file_path
+
+    def write_prometheus_textfile(self, textfile_path: Path) -> None:
+        """Write the metrics in the Prometheus node exporter textfile format (atomically replaced)."""
+        labels_str = ",".join(f'{key}="{value}"' for key, value in self.labels.items())
+        labels_prefix = f"{labels_str}," if labels_str else ""
+        lines = [
+            "# TYPE fliip_run_timestamp_seconds gauge",
+            f"fliip_run_timestamp_seconds{{{labels_str}}} {self.start_time}",
+            "# TYPE fliip_run_duration_seconds gauge",
+            f"fliip_run_duration_seconds{{{labels_str}}} {time.time() - self.start_time}",
+            "# TYPE fliip_span_duration_seconds gauge",
+            "# TYPE fliip_span_count gauge",
+        ]
+        for span_name, (span_count, span_total_s) in self.span_durations().items():
+            lines.append(
+                f'fliip_span_duration_seconds{{{labels_prefix}span="{span_name}"}} {span_total_s}'
+            )
+            lines.append(
+                f'fliip_span_count{{{labels_prefix}span="{span_name}"}} {span_count}'
+            )
+        lines.append("# TYPE fliip_counter gauge")
+        for counter_name, counter_value in self.to_dict()["counters"].items():
+            lines.append(
+                f'fliip_counter{{{labels_prefix}counter="{counter_name}"}} {counter_value}'
+            )
+        textfile_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_textfile_path = textfile_path.with_suffix(".prom.tmp")
+        with open(temp_textfile_path, "w") as textfile:
+            textfile.write("\n".join(lines) + "\n")
+        os.replace(temp_textfile_path, textfile_path)
+
+
+def clean_old_metrics_traces(
+    metrics_dir_path: Path = run_metrics_dir_path,
+    days_threshold: int = run_metrics_max_age_days,
+    max_traces: int | None = run_metrics_max_traces,
+) -> None:
+    """
+    Remove the JSON run traces older than the threshold, and the oldest ones above max_traces.
+
+    :param metrics_dir_path: Folder of the JSON run traces (see RunMetrics.write_json_trace).
+    :param days_threshold: Number of days to keep the traces.
+    :param max_traces: Number of most recent traces to keep, no limit if None.
+    """
+    threshold_timestamp = (datetime.now() - timedelta(days=days_threshold)).timestamp()
+    # Trace file names start with their run start time, sorted oldest first
+    trace_file_paths = sorted(Path(metrics_dir_path).glob("trace_*.json"))
+    old_trace_count = (
+        max(0, len(trace_file_paths) - max_traces) if max_traces is not None else 0
+    )
+    for trace_ind, trace_file_path in enumerate(trace_file_paths):
+        try:
+            if (
+                trace_ind < old_trace_count
+                or trace_file_path.stat().st_mtime < threshold_timestamp
+            ):
+                trace_file_path.unlink()
+        except FileNotFoundError:
+            continue  # Removed meanwhile by another run
 
 
 # Object to hold the Selenium WebDriver and WebDriverWait
-@dataclass
+@dataclass(eq=False)  # Compared and hashed by identity, one handle per browser
 class WebHandle(object):
     driver: WebDriver
     wait: WebDriverWait
+    metrics: RunMetrics = field(default_factory=RunMetrics)
+    web_timeout: float = 5.0  # Timeout of each step of the in-browser booking script
+    booking_count: int = 0  # Bookings done with the browser, for recycling (see needs_recycling)
+    _closed: bool = field(default=False, init=False, repr=False)
+
+    def __post_init__(self):
+        _load_selenium()  # Handles made outside of get_web_web_handle
+        _open_web_handles.add(self)
+        # Count every WebDriver command (one round trip to chromedriver each) in the metrics
+        web_handle_ref = weakref.ref(self)  # No reference cycle, __del__ still quits the driver
+        driver_execute = self.driver.execute
+
+        def counted_execute(driver_command, params=None):
+            web_handle = web_handle_ref()
+            if web_handle is not None:
+                web_handle.metrics.count("webdriver_commands")
+                web_handle.metrics.count(f"webdriver_command.{driver_command}")
+            return driver_execute(driver_command, params)
+
+        self.driver.execute = counted_execute
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _get_process_tree(self) -> list[psutil.Process]:
+        """Return the chromedriver process and its descendants (chrome and its helpers)."""
+        driver_service_process = getattr(
+            getattr(self.driver, "service", None), "process", None
+        )
+        if driver_service_process is None:
+            return []  # Not a local chromedriver
+        _load_psutil()
+        try:
+            driver_process = psutil.Process(driver_service_process.pid)
+            return [driver_process] + driver_process.children(recursive=True)
+        except psutil.Error:
+            return []
+
+    def get_rss_mb(self) -> float:
+        """Return the resident memory of the browser process tree in MB."""
+        process_tree = self._get_process_tree()
+        if len(process_tree) == 0:
+            return 0.0
+        _load_psutil()
+        rss_bytes = 0
+        for process in process_tree:
+            try:
+                rss_bytes += process.memory_info().rss
+            except psutil.Error:
+                pass  # Process exited meanwhile
+        return rss_bytes / (1024 * 1024)
+
+    def needs_recycling(
+        self, max_bookings: int | None = None, max_rss_mb: float | None = None
+    ) -> str | None:
+        """Return why the browser should be relaunched (too many bookings or too much memory), None if not."""
+        if max_bookings is not None and self.booking_count >= max_bookings:
+            return f"{self.booking_count} bookings"
+        if max_rss_mb is not None:
+            rss_mb = self.get_rss_mb()
+            if rss_mb > max_rss_mb:
+                return f"{rss_mb:.0f}MB resident memory"
+        return None
+
+    def close(self) -> None:
+        """Quit the browser and kill what is left of its process tree, can be called more than once."""
+        if self._closed:
+            return
+        self._closed = True
+        _open_web_handles.discard(self)
+        process_tree = self._get_process_tree()  # Before quit, the chrome processes are then orphans
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.debug(f"Browser quit failed ({e!r}), killing its processes...")
+        if len(process_tree) > 0:
+            _load_psutil()
+            for process in process_tree:
+                try:
+                    process.kill()
+                except psutil.Error:
+                    pass  # Already exited with quit
+            psutil.wait_procs(process_tree, timeout=5)
 
     def __del__(self):
         # Close the browser when the object is deleted
-        self.driver.quit()
+        try:
+            self.close()
+        except Exception:
+            pass  # Interpreter shutting down, atexit already closed the open handles
+
+
+# Browsers not closed yet, closed at interpreter exit (e.g. exception escaping main)
+_open_web_handles: weakref.WeakSet[WebHandle] = weakref.WeakSet()
+
+
+def _close_open_web_handles() -> None:
+    for web_handle in list(_open_web_handles):
+        web_handle.close()
+
+
+atexit.register(_close_open_web_handles)
+
+
+# Object to hold the Chrome performance profile (page load strategy, blocked resources, lean flags)
+@dataclass
+class BrowserProfile(object):
+    page_load_strategy: str = "eager"  # "normal" waits for the load event, "eager" for DOMContentLoaded, "none" for nothing
+    block_images: bool = True
+    # URL patterns blocked over the Chrome DevTools Protocol (fonts, media, analytics and third party scripts)
+    blocked_url_patterns: list[str] = field(
+        default_factory=lambda: [
+            "*.woff",
+            "*.woff2",
+            "*.ttf",
+            "*.otf",
+            "*.eot",
+            "*.mp4",
+            "*.webm",
+            "*google-analytics.com*",
+            "*googletagmanager.com*",
+            "*doubleclick.net*",
+            "*facebook.net*",
+            "*connect.facebook.com*",
+            "*hotjar.com*",
+            "*intercom.io*",
+            "*intercomcdn.com*",
+            "*crisp.chat*",
+            "*youtube.com*",
+        ]
+    )
+    window_size: tuple[int, int] | None = (1280, 800)  # Still the desktop layout of the calendar
+    lean_flags: bool = True  # Disable extensions, background networking, sync, translate...
+
+
+# Chrome flags of the lean profile, features not needed to book a class
+lean_chrome_arguments = [
+    "disable-extensions",
+    "disable-background-networking",
+    "disable-component-update",
+    "disable-default-apps",
+    "disable-sync",
+    "disable-client-side-phishing-detection",
+    "disable-domain-reliability",
+    "disable-breakpad",
+    "disable-dev-shm-usage",  # /dev/shm is tiny on small boxes and containers
+    "disable-features=Translate,OptimizationHints,MediaRouter,AutofillServerCommunication",
+    "metrics-recording-only",
+    "no-first-run",
+    "no-default-browser-check",
+    "mute-audio",
+    "password-store=basic",
+    "renderer-process-limit=2",
+    # Week tabs of the multi-tab engine load and book in the background
+    "disable-background-timer-throttling",
+    "disable-renderer-backgrounding",
+    "disable-backgrounding-occluded-windows",
+]
+
+lean_browser_profile = BrowserProfile()
+full_browser_profile = BrowserProfile(
+    page_load_strategy="normal",
+    block_images=False,
+    blocked_url_patterns=[],
+    window_size=None,
+    lean_flags=False,
+)  # Chrome defaults, for debugging pages broken by the lean profile
+browser_profiles = {"lean": lean_browser_profile, "full": full_browser_profile}
+default_browser_profile = lean_browser_profile  # Used when no profile is given
 
 
 # Get a WebHandle object for the selenium chrome webdriver and WebDriverWait
 def get_web_web_handle(
     headless: bool,
     web_timeout: float,
+    metrics: RunMetrics | None = None,
+    browser_profile: BrowserProfile | None = None,
+    session_recorder: SessionRecorder | None = None,
 ) -> WebHandle:
     """
     Get a browser handle for the selenium webdriver.
     :param headless: If True, run the browser in headless mode.
     :param web_timeout: The timeout for the webdriver.
+    :param metrics: Run metrics of the browser, a new one if None.
+    :param browser_profile: Chrome performance profile, default_browser_profile if None.
+    :param session_recorder: Recorder of the browser network exchanges (from its performance log), None to not record.
     :return: A WebHandle object containing the driver and wait objects.
     """
+    if metrics is None:
+        metrics = RunMetrics()
+    if browser_profile is None:
+        browser_profile = default_browser_profile
+    _load_selenium()
     logger.debug("Getting browser handle...")
     # Set up the Chrome WebDriver (Make sure you have downloaded chromedriver)
     options = webdriver.ChromeOptions()
@@ -133,127 +868,753 @@ def get_web_web_handle(
     if headless:
         options.add_argument("headless")
         options.add_argument("disable-gpu")
-    driver = webdriver.Chrome(options=options)
+    # Waits are explicit, no need to wait for images and third party scripts to load
+    options.page_load_strategy = browser_profile.page_load_strategy
+    if browser_profile.window_size is not None:
+        options.add_argument(
+            f"window-size={browser_profile.window_size[0]},{browser_profile.window_size[1]}"
+        )
+    if browser_profile.lean_flags:
+        for chrome_argument in lean_chrome_arguments:
+            options.add_argument(chrome_argument)
+    if browser_profile.block_images:
+        options.add_experimental_option(
+            "prefs", {"profile.managed_default_content_settings.images": 2}
+        )
+    if session_recorder is not None:
+        # Network events (with the response bodies fetched over the DevTools Protocol)
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    with metrics.span("chrome_launch"):
+        driver = webdriver.Chrome(options=options)
+    # Launched browser set up, quit if it fails: no handle would close it and Chrome would outlive the run
+    try:
+        if browser_profile.blocked_url_patterns:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd(
+                "Network.setBlockedURLs", {"urls": browser_profile.blocked_url_patterns}
+            )
+
+        # Define the WebDriverWait for waiting for elements
+        wait = WebDriverWait(
+            driver, timeout=web_timeout, poll_frequency=wait_poll_frequency_s
+        )  # seconds
+        # The booking script waits for up to 3 modals of web_timeout each
+        driver.set_script_timeout(4 * web_timeout)
+
+        web_handle = WebHandle(
+            driver=driver, wait=wait, metrics=metrics, web_timeout=web_timeout
+        )
+    except BaseException:
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.debug(f"Browser quit failed: {e!r}")
+        raise
+    if session_recorder is not None:
+        try:
+            session_recorder.attach_browser(web_handle)
+        except BaseException:
+            web_handle.close()
+            raise
+    return web_handle
 
-    # Define the WebDriverWait for waiting for elements
-    wait = WebDriverWait(driver, timeout=web_timeout)  # seconds
 
-    return WebHandle(driver=driver, wait=wait)
+## Adaptive Waits
+wait_latencies_file_path = (
+    Path(__file__).parent.joinpath("fliip_wait_latencies.json").resolve()
+)  # Observed step latencies kept between runs
+wait_poll_frequency_s = 0.05  # WebDriverWait default of 0.5s adds up to 0.5s to every wait
 
 
-# Login to the Fliip gym web page and set the language to English for proper parsing of date strings
-def fliip_web_page_login(
+# Wait timeout of each step learned from its observed latencies
+class AdaptiveTimeouts(object):
+    """Per-step timeouts set to a margin over the 95th percentile of the step latencies, reset by a timed out wait."""
+
+    def __init__(
+        self,
+        margin: float = 3.0,
+        min_timeout_s: float = 2.0,
+        min_timeout_fraction: float = 0.25,
+        min_samples: int = 5,
+        history_size: int = 50,
+    ):
+        """
+        :param margin: Factor applied to the 95th percentile latency of a step.
+        :param min_timeout_s: Lowest timeout of a step.
+        :param min_timeout_fraction: Lowest timeout of a step as a fraction of its max timeout (web_timeout).
+        :param min_samples: Observed latencies needed before a step timeout is learned.
+        :param history_size: Latest latencies kept per step.
+        """
+        self.margin = margin
+        self.min_timeout_s = min_timeout_s
+        self.min_timeout_fraction = min_timeout_fraction
+        self.min_samples = min_samples
+        self.history_size = history_size
+        self.latencies: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, step: str, latency_s: float) -> None:
+        with self._lock:
+            step_latencies = self.latencies.setdefault(step, [])
+            step_latencies.append(latency_s)
+            del step_latencies[: -self.history_size]
+
+    def observe_timeout(self, step: str, timeout_s: float) -> None:
+        """
+        Record a wait of a step timed out after timeout_s.
+
+        The step latency is at least timeout_s: its history is restarted from that sample, the step
+        waits up to its max timeout until enough new latencies are observed.
+        """
+        with self._lock:
+            self.latencies[step] = [timeout_s]
+
+    def timeout(self, step: str, max_timeout_s: float) -> float:
+        """Return the learned timeout of a step, max_timeout_s until enough latencies are observed."""
+        with self._lock:
+            step_latencies = sorted(self.latencies.get(step, []))
+        if len(step_latencies) < self.min_samples:
+            return max_timeout_s
+        p95_latency_s = step_latencies[int(0.95 * (len(step_latencies) - 1))]
+        min_timeout_s = max(self.min_timeout_s, max_timeout_s * self.min_timeout_fraction)
+        return min(max_timeout_s, max(min_timeout_s, p95_latency_s * self.margin))
+
+    def load(self, latencies_file_path: Path = wait_latencies_file_path) -> None:
+        try:
+            with open(latencies_file_path, "r") as latencies_file:
+                latencies = json.load(latencies_file)
+        except (OSError, ValueError):
+            return  # No latencies observed yet (or unreadable file), start over
+        with self._lock:
+            self.latencies = {
+                step: [float(latency_s) for latency_s in step_latencies][
+                    -self.history_size :
+                ]
+                for step, step_latencies in latencies.items()
+            }
+
+    def save(self, latencies_file_path: Path = wait_latencies_file_path) -> None:
+        with self._lock:
+            latencies = dict(self.latencies)
+        temp_latencies_file_path = latencies_file_path.with_suffix(".json.tmp")
+        with open(temp_latencies_file_path, "w") as latencies_file:
+            json.dump(latencies, latencies_file)
+        os.replace(temp_latencies_file_path, latencies_file_path)
+
+
+adaptive_timeouts = AdaptiveTimeouts()  # Shared by all the browsers of the process
+
+
+# Wait for the first of several expected outcomes of a step, e.g. privacy dialog shown or login form ready
+def race_wait(
     web_handle: WebHandle,
-    fliip_gym_name: str,
-    fliip_username: str,
-    fliip_password: str,
-) -> None:
-    logger.info(
-        f"Connecting {fliip_username} to {fliip_gym_name} Fliip Gym Web Page..."
-    )
-    # Go to the Fliip login page
-    logger.debug("Opening Fliip gym web page...")
-    web_handle.driver.get(f"https://{fliip_gym_name}.fliipapp.com/home/login")
+    step: str,
+    outcomes: dict[str, Callable[[WebDriver], object]],
+    timeout_s: float | None = None,
+) -> tuple[str, object]:
+    """
+    :param step: Name of the step, for its span and learned timeout.
+    :param outcomes: Expected conditions by outcome name, checked in this order at each poll.
+    :param timeout_s: Timeout of the wait, learned from the step latencies (at most web_timeout) if None.
+    :return: Name and condition result of the first outcome resolved.
+    :raise TimeoutException: No outcome resolved before the timeout.
+    """
+    if timeout_s is None:
+        timeout_s = adaptive_timeouts.timeout(step, web_handle.web_timeout)
 
-    # Wait for the page to load and click refuse all privacy button
-    try:
-        reject_button = web_handle.wait.until(
-            EC.element_to_be_clickable(
-                (By.XPATH, "/html/body/div[2]/div/div/div/div[2]/button[2]")
+    def first_outcome(driver: WebDriver):
+        for outcome_name, condition in outcomes.items():
+            try:
+                outcome_result = condition(driver)
+            except (NoSuchElementException, StaleElementReferenceException):
+                outcome_result = False  # Do not let one outcome hide the others
+            if outcome_result:
+                return outcome_name, outcome_result
+        return False
+
+    start_counter = time.perf_counter()
+    with web_handle.metrics.span(step):
+        try:
+            outcome_name, outcome_result = WebDriverWait(
+                web_handle.driver,
+                timeout=timeout_s,
+                poll_frequency=wait_poll_frequency_s,
+            ).until(first_outcome)
+        except TimeoutException:
+            adaptive_timeouts.observe_timeout(step, timeout_s)
+            raise TimeoutException(
+                f"No outcome of {step} ({', '.join(outcomes)}) after {timeout_s:.1f}s!"
             )
-        )
-        reject_button.click()
-    except:
-        # Privacy window not present, continue
-        # TODO: Improve this first step in case of no privacy window, not wait timeout period?
-        logger.warning(
-            "Privacy window not present, continuing to login..."
-        )  # Warning to see occurence of this window
-        pass
+    adaptive_timeouts.observe(step, time.perf_counter() - start_counter)
+    logger.debug(f"Wait {step} resolved with {outcome_name}.")
+    return outcome_name, outcome_result
+
+
+## Session Cache
+# Encrypted cookies and language preference per (gym, username) to skip login on repeat runs
+session_cache_dir_path = (
+    Path(__file__).parent.joinpath("fliip_session_cache").resolve()
+)  # Default session cache folder
+session_cache_salt_size = 16
+session_cache_kdf_iterations = 100_000
 
-    # Login on Fliip
-    logger.debug("Logging onto Fliip gym web page...")
-    # Find the username and password input fields and log in
-    username_input = web_handle.driver.find_element(By.ID, "username")
-    password_input = web_handle.driver.find_element(By.ID, "password")
 
-    username_input.send_keys(fliip_username)  # Replace with your actual username
-    password_input.send_keys(fliip_password)  # Replace with your actual password
+def _session_cache_file_path(fliip_gym_name: str, fliip_username: str) -> Path:
+    cache_id = hashlib.sha256(f"{fliip_gym_name}:{fliip_username}".encode()).hexdigest()
+    return session_cache_dir_path.joinpath(f"{cache_id}.session")
+
+
+def _session_cache_fernet(fliip_password: str, salt: bytes) -> Fernet:
+    _load_cryptography()
+    # Key derived from the account password, no other secret to store
+    key = hashlib.pbkdf2_hmac(
+        "sha256", fliip_password.encode(), salt, session_cache_kdf_iterations
+    )
+    return Fernet(base64.urlsafe_b64encode(key))
+
 
-    # Submit the form
-    password_input.send_keys(Keys.RETURN)
+def save_session_cache(
+    fliip_gym_name: str,
+    fliip_username: str,
+    fliip_password: str,
+    cookies: list[dict],
+    language: str,
+) -> None:
+    """
+    Save an authenticated session to the encrypted on-disk session cache.
 
-    # Wait to the login to occur and change to English to properly parse date strings
+    :param fliip_gym_name: Fliip gym name.
+    :param fliip_username: Fliip account username.
+    :param fliip_password: Fliip account password, used to derive the encryption key.
+    :param cookies: Session cookies in selenium format (dicts with name, value, domain, path...).
+    :param language: Language set on the session (e.g. "en").
+    """
     try:
-        # Window to inform that google calendar can be syncronized probably popped up
-        close_button = web_handle.driver.find_element(
-            By.CLASS_NAME,
-            "close",
-        )
-        close_button.click()
-        logger.warning(
-            "Google Calendar sync info window detected and closed!"
-        )  # Warning to see occurence of this window
+        salt = os.urandom(session_cache_salt_size)
+        session_data = json.dumps(
+            {
+                "cookies": cookies,
+                "language": language,
+                "saved": datetime.now().isoformat(),
+            }
+        ).encode()
+        token = _session_cache_fernet(fliip_password, salt).encrypt(session_data)
+        session_cache_dir_path.mkdir(parents=True, exist_ok=True)
+        cache_file_path = _session_cache_file_path(fliip_gym_name, fliip_username)
+        with open(cache_file_path, "wb") as cache_file:
+            cache_file.write(salt + token)
+        logger.debug(f"Session of {fliip_username} saved to cache.")
     except Exception as e:
-        # No window to close, continue
-        pass
+        logger.error(f"Failed to save session cache: {e}")
 
-    logger.debug("Logged in, changing language to english...")
-    language_button = web_handle.wait.until(
-        EC.element_to_be_clickable((By.XPATH, '//*[@id="change_language"]/div/button'))
-    )
-    language_button.click()  # First click on the button to open the language menu
-    en_language_button = web_handle.wait.until(
-        EC.element_to_be_clickable(
-            (By.XPATH, '//*[@id="change_language"]/div/div/ul/li[1]/a')
-        )
-    )
-    en_language_button.click()  # Click on the english button
-    logger.debug("Connected!")
-    return
 
+def load_session_cache(
+    fliip_gym_name: str,
+    fliip_username: str,
+    fliip_password: str,
+) -> dict | None:
+    """
+    Load a session from the encrypted on-disk session cache.
 
-# Helper function to get the datetime of the class weekday to register
-def get_datetime_from_weekday_str(
-    weekday_to_register_str: str,
-    hour_to_register: int,
-    current_calendar_page_date: datetime,
-) -> datetime:
-    # Calculate how many days to subtract from current calandar page date to get to weekday
-    weekday_to_register_number = time.strptime(weekday_to_register_str, "%A").tm_wday
-    days_to_weekday = current_calendar_page_date.weekday() - weekday_to_register_number
-    calendar_page_weekday = current_calendar_page_date - timedelta(days=days_to_weekday)
-    calendar_page_weekday = calendar_page_weekday.replace(
-        hour=hour_to_register
-    )  # Noon class
-    return calendar_page_weekday
+    :param fliip_gym_name: Fliip gym name.
+    :param fliip_username: Fliip account username.
+    :param fliip_password: Fliip account password, used to derive the encryption key.
+    :return: Dict with "cookies", "language" and "saved" keys, None if no usable cache.
+    """
+    cache_file_path = _session_cache_file_path(fliip_gym_name, fliip_username)
+    if not cache_file_path.exists():
+        return None
+    _load_cryptography()
+    try:
+        with open(cache_file_path, "rb") as cache_file:
+            cache_content = cache_file.read()
+        salt = cache_content[:session_cache_salt_size]
+        token = cache_content[session_cache_salt_size:]
+        return json.loads(_session_cache_fernet(fliip_password, salt).decrypt(token))
+    except (InvalidToken, ValueError) as e:
+        # Password changed or corrupted file, a full login will overwrite it
+        logger.warning(f"Unusable session cache for {fliip_username}: {e!r}")
+        return None
 
 
-class OutOfMembershipError(RuntimeError):
-    """Custom exception raised when the user is out of membership."""
+def invalidate_session_cache(fliip_gym_name: str, fliip_username: str) -> None:
+    """Remove the cached session of an account (e.g. rejected by the gym web page)."""
+    _session_cache_file_path(fliip_gym_name, fliip_username).unlink(missing_ok=True)
 
-    def __init__(
-        self,
-        message="No more membership available on account! Can't continue registering...",
+
+# Restore a cached session in the browser, return true if it is still logged in
+def _restore_cached_web_session(
+    web_handle: WebHandle,
+    fliip_gym_name: str,
+    fliip_username: str,
+    fliip_password: str,
+) -> bool:
+    session_cache = load_session_cache(fliip_gym_name, fliip_username, fliip_password)
+    if session_cache is None:
+        return False
+    # Cookies can only be added on the gym domain, a small resource is enough to get there
+    web_handle.driver.get(f"{get_fliip_base_url(fliip_gym_name)}/favicon.ico")
+    for cookie in session_cache["cookies"]:
+        try:
+            web_handle.driver.add_cookie(cookie)
+        except Exception as e:
+            logger.debug(f"Cached cookie {cookie.get('name')} not restored: {e}")
+    # One request to check the session: calendar page only shows up when logged in
+    web_handle.driver.get(f"{get_fliip_base_url(fliip_gym_name)}{fliip_calendar_path}")
+    current_date_elements = web_handle.driver.find_elements(By.ID, "current-date")
+    if len(current_date_elements) == 0:
+        logger.info(f"Cached session of {fliip_username} expired, logging in...")
+        return False
+    if session_cache.get("language") != "en" or not any(
+        day_name in current_date_elements[0].text for day_name in calendar.day_name
     ):
-        super().__init__(message)
+        _change_language_to_english(web_handle=web_handle)
+    return True
 
 
-class ClassCanceledError(RuntimeError):
-    """Custom exception raised when the gym has cancelled that class!"""
+# Change the Fliip web page language to English with the language menu
+def _change_language_to_english(web_handle: WebHandle) -> None:
+    with web_handle.metrics.span("language_switch"):
+        _click_english_language(web_handle=web_handle)
 
-    def __init__(self, message="Gym has canceled the class, can't register!"):
-        super().__init__(message)
+
+def _click_english_language(web_handle: WebHandle) -> None:
+    _, language_button = race_wait(
+        web_handle,
+        "language_button_wait",
+        {
+            "language_button": EC.element_to_be_clickable(
+                (By.XPATH, '//*[@id="change_language"]/div/button')
+            )
+        },
+    )
+    language_button.click()  # First click on the button to open the language menu
+    _, en_language_button = race_wait(
+        web_handle,
+        "language_menu_wait",
+        {
+            "english_button": EC.element_to_be_clickable(
+                (By.XPATH, '//*[@id="change_language"]/div/div/ul/li[1]/a')
+            )
+        },
+    )
+    en_language_button.click()  # Click on the english button
+
+
+privacy_dialog_reject_xpath = "/html/body/div[2]/div/div/div/div[2]/button[2]"  # Refuse all button
+# Close button of the Google Calendar sync popup shown after the login, not of any other dialog
+google_calendar_popup_close_xpath = (
+    "//div[contains(@class, 'modal') and contains(., 'Google')]"
+    "//*[contains(concat(' ', normalize-space(@class), ' '), ' close ')]"
+)
+
+
+# Login to the Fliip gym web page and set the language to English for proper parsing of date strings
+# If use_session_cache is true, a still valid cached session is reused instead of logging in.
+def fliip_web_page_login(
+    web_handle: WebHandle,
+    fliip_gym_name: str,
+    fliip_username: str,
+    fliip_password: str,
+    use_session_cache: bool = False,
+) -> None:
+    with web_handle.metrics.span("login"):
+        _fliip_web_page_login(
+            web_handle=web_handle,
+            fliip_gym_name=fliip_gym_name,
+            fliip_username=fliip_username,
+            fliip_password=fliip_password,
+            use_session_cache=use_session_cache,
+        )
+
+
+def _fliip_web_page_login(
+    web_handle: WebHandle,
+    fliip_gym_name: str,
+    fliip_username: str,
+    fliip_password: str,
+    use_session_cache: bool,
+) -> None:
+    logger.info(
+        f"Connecting {fliip_username} to {fliip_gym_name} Fliip Gym Web Page..."
+    )
+    if use_session_cache and _restore_cached_web_session(
+        web_handle=web_handle,
+        fliip_gym_name=fliip_gym_name,
+        fliip_username=fliip_username,
+        fliip_password=fliip_password,
+    ):
+        logger.debug("Connected with cached session!")
+        return
+    # Go to the Fliip login page
+    logger.debug("Opening Fliip gym web page...")
+    web_handle.driver.get(f"{get_fliip_base_url(fliip_gym_name)}{fliip_login_path}")
+
+    # Wait for the page to load: privacy dialog shown, login form ready or already logged in
+    # (dialog checked first so it wins when shown with the form)
+    page_outcome, page_outcome_result = race_wait(
+        web_handle,
+        "privacy_dialog_wait",
+        {
+            "privacy_dialog": EC.element_to_be_clickable(
+                (By.XPATH, privacy_dialog_reject_xpath)
+            ),
+            "logged_in": EC.presence_of_element_located((By.ID, "change_language")),
+            "login_form": EC.element_to_be_clickable((By.ID, "password")),
+        },
+    )
+    if page_outcome == "privacy_dialog":
+        page_outcome_result.click()  # Click refuse all privacy button
+
+    if page_outcome != "logged_in":
+        # Login on Fliip
+        logger.debug("Logging onto Fliip gym web page...")
+        # Find the username and password input fields and log in
+        username_input = web_handle.driver.find_element(By.ID, "username")
+        password_input = web_handle.driver.find_element(By.ID, "password")
+
+        username_input.send_keys(fliip_username)  # Replace with your actual username
+        password_input.send_keys(fliip_password)  # Replace with your actual password
+
+        if page_outcome == "login_form":
+            # Late privacy dialog shown after the login form: checked once without waiting, dismissed before the submit
+            privacy_reject_buttons = web_handle.driver.find_elements(
+                By.XPATH, privacy_dialog_reject_xpath
+            )
+            if len(privacy_reject_buttons) > 0 and privacy_reject_buttons[0].is_displayed():
+                privacy_reject_buttons[0].click()
+                logger.warning(
+                    "Late privacy window detected and closed!"
+                )  # Warning to see occurence of this window
+
+        # Submit the form
+        password_input.send_keys(Keys.RETURN)
+
+        # Wait to the login to occur: window to inform that google calendar can be syncronized or calendar page
+        login_outcome, login_outcome_result = race_wait(
+            web_handle,
+            "login_submit_wait",
+            {
+                "google_calendar_popup": EC.element_to_be_clickable(
+                    (By.XPATH, google_calendar_popup_close_xpath)
+                ),
+                "logged_in": EC.presence_of_element_located((By.ID, "change_language")),
+            },
+        )
+        if login_outcome == "google_calendar_popup":
+            login_outcome_result.click()
+            logger.warning(
+                "Google Calendar sync info window detected and closed!"
+            )  # Warning to see occurence of this window
+
+    logger.debug("Logged in, changing language to english...")
+    _change_language_to_english(web_handle=web_handle)
+    if use_session_cache:
+        save_session_cache(
+            fliip_gym_name=fliip_gym_name,
+            fliip_username=fliip_username,
+            fliip_password=fliip_password,
+            cookies=web_handle.driver.get_cookies(),
+            language="en",
+        )
+    logger.debug("Connected!")
+    return
+
+
+# Helper function to get the datetime of the class weekday to register
+def get_datetime_from_weekday_str(
+    weekday_to_register_str: str,
+    hour_to_register: int,
+    current_calendar_page_date: datetime,
+) -> datetime:
+    # Calculate how many days to subtract from current calandar page date to get to weekday
+    weekday_to_register_number = time.strptime(weekday_to_register_str, "%A").tm_wday
+    days_to_weekday = current_calendar_page_date.weekday() - weekday_to_register_number
+    calendar_page_weekday = current_calendar_page_date - timedelta(days=days_to_weekday)
+    calendar_page_weekday = calendar_page_weekday.replace(
+        hour=hour_to_register
+    )  # Noon class
+    return calendar_page_weekday
+
+
+class OutOfMembershipError(RuntimeError):
+    """Custom exception raised when the user is out of membership."""
+
+    def __init__(
+        self,
+        message="No more membership available on account! Can't continue registering...",
+    ):
+        super().__init__(message)
+
+
+class ClassCanceledError(RuntimeError):
+    """Custom exception raised when the gym has cancelled that class!"""
+
+    def __init__(self, message="Gym has canceled the class, can't register!"):
+        super().__init__(message)
+
+
+class ClassWaitlistedError(RuntimeError):
+    """Custom exception raised when the booking ended on the class waiting list instead of a spot."""
+
+    def __init__(self, message="Class is full, on its waiting list!"):
+        super().__init__(message)
+
+
+class ClassNotFoundError(RuntimeError):
+    """Custom exception raised when the class to register is not on the calendar week page."""
+
+
+class UnexpectedCalendarPageError(RuntimeError):
+    """Custom exception raised when the calendar page shown is not the expected week."""
+
+
+class BookingStepError(RuntimeError):
+    """Custom exception raised when a booking step (modal, confirm, alert) failed."""
+
+    def __init__(self, message: str, step: str | None = None):
+        super().__init__(message)
+        self.step = step
+
+
+class BookingTimeoutError(BookingStepError):
+    """Custom exception raised when a booking step (modal, confirm, alert) did not complete in time."""
+
+
+# Markers of the booking modal and alert messages by outcome, checked in this order: success before
+# error, a success message can mention an error (e.g. "contact us if you see any error")
+# Markers match from the start of a word ("error" not in "terror", "registered" not in "unregistered")
+booking_message_markers = {
+    "out_of_membership": ("new membership",),
+    "already_registered": ("already registered", "already booked", "déjà inscrit"),
+    "waitlisted": ("waiting list", "waitlist", "liste d'attente"),
+    "registered": ("success", "confirmed", "registered", "booked", "réservé", "inscrit"),
+    "booking_error": ("error", "erreur", "not allowed", "unable", "impossible"),
+}
+
+
+def _booking_message_text(message: str) -> str:
+    """Return the readable text of a booking message: JSON string values or HTML without its markup."""
+    try:
+        message_json = json.loads(message)
+    except ValueError:
+        message_json = None
+    if isinstance(message_json, dict):
+        # String values and the keys of the true flags, e.g. {"success": true, "message": "..."}
+        return " ".join(
+            value if isinstance(value, str) else key
+            for key, value in message_json.items()
+            if isinstance(value, str) or value is True
+        )
+    message = re.sub(
+        r"<(script|style)\b.*?</\1>", " ", message, flags=re.DOTALL | re.IGNORECASE
+    )
+    return html.unescape(re.sub(r"<[^>]+>", " ", message))
+
+
+def classify_booking_message(message: str) -> str | None:
+    """
+    Classify the message of a booking modal, alert or response.
+
+    :param message: Text, HTML or JSON of the message.
+    :return: Outcome of booking_message_markers, None if the message has no known marker.
+    """
+    message_text = _booking_message_text(message).lower()
+    for outcome, markers in booking_message_markers.items():
+        if re.search(
+            r"\b(?:" + "|".join(re.escape(marker) for marker in markers) + ")",
+            message_text,
+        ):
+            return outcome
+    return None
+
+
+# Object to hold one class cell parsed from a calendar week page
+@dataclass
+class CalendarClass(object):
+    element_id: str  # Id of the "table-chk" div, e.g. "764296,2024-12-24"
+    class_date: str  # "%Y-%m-%d"
+    start_time: str  # "%H:%M"
+    end_time: str | None
+    name: str
+    status_text: str  # "FULL", "Confirmed", "Waiting", "Canceled" or "X/Y"
+    register_onclick: str | None  # Onclick of the subscribe icon, None if no register icon
+
+    @property
+    def status(self) -> str:
+        """Normalized status: 'confirmed', 'waiting', 'canceled', 'full', 'open' or 'unknown'."""
+        status_text = self.status_text.lower()
+        if "confirm" in status_text:
+            return "confirmed"
+        elif "waiting" in status_text:
+            return "waiting"
+        elif "cancel" in status_text:
+            return "canceled"
+        elif "full" in status_text:
+            return "full"
+        elif self.spots is not None:
+            return "open"
+        return "unknown"
+
+    @property
+    def spots(self) -> tuple[int, int] | None:
+        """Return the (taken, total) spots of a "X/Y" status, None for other statuses."""
+        spots_match = re.search(r"(\d+)\s*/\s*(\d+)", self.status_text)
+        if spots_match is None:
+            return None
+        return int(spots_match.group(1)), int(spots_match.group(2))
+
+
+# Key of a class in the parsed calendar week: ("%Y-%m-%d", "%H:%M")
+def calendar_class_key(class_datetime: datetime) -> tuple[str, str]:
+    return class_datetime.strftime("%Y-%m-%d"), class_datetime.strftime("%H:%M")
+
+
+class _CalendarWeekPageParser(HTMLParser):
+    """Single pass parser of the td[data-classdate] / div.table-chk / span.class_time calendar cells."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.classes: dict[tuple[str, str], CalendarClass] = {}
+        self._class_date: str | None = None
+        self._td_depth = 0
+        self._class_div_id: str | None = None
+        self._class_div_depth = 0
+        self._class_texts: list[str] = []
+        self._class_time_text: str | None = None
+        self._in_class_time = False
+        self._register_onclick: str | None = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs_dict = dict(attrs)
+        css_classes = (attrs_dict.get("class") or "").split()
+        if tag == "td":
+            if self._class_date is not None:
+                self._td_depth += 1
+            elif attrs_dict.get("data-classdate"):
+                self._class_date = attrs_dict["data-classdate"]
+                self._td_depth = 1
+        elif tag == "div" and self._class_date is not None:
+            if self._class_div_id is not None:
+                self._class_div_depth += 1
+            elif "table-chk" in css_classes:
+                self._class_div_id = attrs_dict.get("id") or ""
+                self._class_div_depth = 1
+                self._class_texts = []
+                self._class_time_text = None
+                self._register_onclick = None
+        elif self._class_div_id is not None:
+            if tag == "span" and "class_time" in css_classes:
+                self._in_class_time = True
+                self._class_time_text = ""
+            elif (
+                tag == "i"
+                and "subscribe-class-icon" in css_classes
+                and "register" in (attrs_dict.get("onclick") or "")
+            ):
+                self._register_onclick = attrs_dict["onclick"]
+
+    def handle_endtag(self, tag):
+        if tag == "span" and self._in_class_time:
+            self._in_class_time = False
+        elif tag == "div" and self._class_div_id is not None:
+            self._class_div_depth -= 1
+            if self._class_div_depth == 0:
+                self._add_class()
+                self._class_div_id = None
+        elif tag == "td" and self._class_date is not None:
+            self._td_depth -= 1
+            if self._td_depth == 0:
+                self._class_date = None
+
+    def handle_data(self, data):
+        if self._class_div_id is None:
+            return
+        if self._in_class_time:
+            self._class_time_text += data
+        elif data.strip() != "":
+            self._class_texts.append(data.strip())
+
+    def _add_class(self):
+        times = re.findall(r"\d{1,2}:\d{2}", self._class_time_text or "")
+        if len(times) == 0:
+            return  # Not a class cell (e.g. no class for that day)
+        start_time = datetime.strptime(times[0], "%H:%M").strftime("%H:%M")
+        end_time = (
+            datetime.strptime(times[1], "%H:%M").strftime("%H:%M")
+            if len(times) > 1
+            else None
+        )
+        calendar_class = CalendarClass(
+            element_id=self._class_div_id,
+            class_date=self._class_date,
+            start_time=start_time,
+            end_time=end_time,
+            name=" ".join(self._class_texts[1:]),
+            status_text=self._class_texts[0] if len(self._class_texts) > 0 else "",
+            register_onclick=self._register_onclick,
+        )
+        self.classes[(calendar_class.class_date, calendar_class.start_time)] = (
+            calendar_class
+        )
+
+
+def parse_calendar_week_page(page_source: str) -> dict[tuple[str, str], CalendarClass]:
+    """
+    Parse all the classes of a calendar week page HTML in a single pass.
+
+    :param page_source: HTML of the calendar week page.
+    :return: Dict of the classes keyed by ("%Y-%m-%d", "%H:%M") class date and start time.
+    """
+    page_parser = _CalendarWeekPageParser()
+    page_parser.feed(page_source)
+    page_parser.close()
+    return page_parser.classes
+
+
+def parse_calendar_page_date(page_source: str) -> datetime | None:
+    """
+    Parse the date of the "current-date" header of a calendar week page HTML.
+
+    :param page_source: HTML of the calendar week page.
+    :return: The calendar page date or None if the header is not found.
+    """
+    current_date_match = re.search(
+        r'id=["\']current-date["\'][^>]*>\s*([^<]+?)\s*<', page_source
+    )
+    if current_date_match is None:
+        return None
+    _load_dateutil()
+    return dateutil_parser.parse(current_date_match.group(1))
+
+
+# Get the classes of the calendar week page currently loaded in the browser
+def get_calendar_week_classes(
+    web_handle: WebHandle,
+) -> dict[tuple[str, str], CalendarClass]:
+    return parse_calendar_week_page(web_handle.driver.page_source)
 
 
 # Register to class function
 # Datetime needs to have class day and hour.
 # Return true if just registered, false if already registered, none if skipped.
+# If week_classes (from get_calendar_week_classes) is given, the class is looked up in it instead of the DOM.
 def register_to_class(
     web_handle: WebHandle,
     datetime_to_register: datetime,
     max_hours_in_future_to_register: int = 31 * 24,  # Default to 31 days in hours
+    week_classes: dict[tuple[str, str], CalendarClass] | None = None,
+    batched_booking: bool = True,
 ) -> bool | None:
+    """
+    Register to the class at datetime_to_register on the calendar week page shown.
+    :param week_classes: Parsed classes of the week page shown (see get_calendar_week_classes), searched with XPath if None.
+    :param batched_booking: If True (and week_classes given), book with one in-browser script instead of one WebDriver command per step.
+    :return: True if registered, False if already registered, None if out of the registering window.
+    :raise ClassWaitlistedError: Already on (or booked onto) the class waiting list. Not returned as False
+        (already registered): the class is still reported in the run registered list, but checked again by
+        the next runs and by the FULL class watcher until the account gets a spot.
+    """
     if datetime_to_register < datetime.now():
         # Class in the past, return and skip
         return None
@@ -262,6 +1623,34 @@ def register_to_class(
     ).total_seconds() >= max_hours_in_future_to_register * 3600:
         # Too far in future to register yet, return and skip
         return None
+    if week_classes is not None:
+        calendar_class = week_classes.get(calendar_class_key(datetime_to_register))
+        if calendar_class is None:
+            raise ClassNotFoundError(
+                f"Can't find a noon class to register on {datetime_to_register}!"
+            )
+        if calendar_class.status == "confirmed":
+            # Already registered, returning
+            return False
+        elif calendar_class.status == "waiting":
+            # Already on the waiting list, not registered yet
+            raise ClassWaitlistedError("Already on the class waiting list!")
+        elif calendar_class.status == "canceled":
+            raise ClassCanceledError()
+        if batched_booking:
+            return _book_class_in_browser(
+                web_handle=web_handle,
+                element_id=calendar_class.element_id,
+                datetime_to_register=datetime_to_register,
+            )
+        with web_handle.metrics.span("booking_find_box"):
+            register_button = web_handle.driver.find_element(
+                By.CSS_SELECTOR,
+                f'div[id="{calendar_class.element_id}"] i.subscribe-class-icon[onclick*="register"]',
+            )
+            register_button.click()
+        return _confirm_class_registration(web_handle=web_handle)
+
     class_day_datetime_str = datetime_to_register.strftime(f"%Y-%m-%d")
     time_str = datetime_to_register.strftime(f"%H:%M")  # Class time to register.
     class_datetime_weekday_str = weekday_short_str(datetime_to_register)
@@ -274,22 +1663,25 @@ def register_to_class(
     )
 
     try:
-        register_box = web_handle.driver.find_element(
-            By.XPATH,
-            class_noon_xpath,
-        )
+        with web_handle.metrics.span("booking_find_box"):
+            register_box = web_handle.driver.find_element(
+                By.XPATH,
+                class_noon_xpath,
+            )
     except Exception as e:
         # TODO: Better handle the case if no class for that day (e.g. Christmas 2024 "//*[@id="764296,2024-12-24"]/p")
-        raise Exception(
+        raise ClassNotFoundError(
             f"Can't find a noon class to register on {datetime_to_register}! Original Exception: {e}"
         )
 
     # Expected text in register box is "{Status}\nCrossFit Régulier\n{class start hour}:00 - {class end hour}:00" where {Status} is "FULL", "Confirmed", "Canceled", or "X/Y" person suscribed.
-    if (
-        "confirm" in register_box.text.lower() or "waiting" in register_box.text.lower()
-    ):  # Other beginning of text in button is "FULL" or X/Y
+    if "confirm" in register_box.text.lower():
+        # Other beginning of text in button is "FULL" or X/Y
         # Already registered, returning
         return False
+    elif "waiting" in register_box.text.lower():
+        # Already on the waiting list, not registered yet
+        raise ClassWaitlistedError("Already on the class waiting list!")
     elif "cancel" in register_box.text.lower():
         raise ClassCanceledError()
 
@@ -298,14 +1690,151 @@ def register_to_class(
         ".//i[contains(@class, 'subscribe-class-icon') and contains(@onclick, 'register')]",
     )
     register_button.click()
+    return _confirm_class_registration(web_handle=web_handle)
 
-    # Register or Waiting List Modal Dialog
-    popup_window = web_handle.wait.until(
-        EC.any_of(
-            EC.visibility_of_element_located((By.ID, "book_confirm_modal")),
-            EC.visibility_of_element_located((By.ID, "book_confirm_error_modal")),
+
+# Whole booking sequence run inside the page: click the register icon, then go through the
+# confirm (or error) modal and the message alert. Returns {"outcome", "step", "message", "timings"}.
+_booking_script = """
+var elementId = arguments[0];
+var stepTimeoutMs = arguments[1];
+var done = arguments[arguments.length - 1];
+var timings = {};
+var stepStart = performance.now();
+function finish(outcome, step, message) {
+    done({outcome: outcome, step: step, message: message || "", timings: timings});
+}
+function isVisible(element) {
+    return element !== null && element.getClientRects().length > 0
+        && window.getComputedStyle(element).visibility !== "hidden";
+}
+function waitFor(step, condition, then) {
+    var startTime = performance.now();
+    (function poll() {
+        var result = condition();
+        if (result) {
+            timings[step] = performance.now() - stepStart;
+            stepStart = performance.now();
+            then(result);
+        } else if (performance.now() - startTime > stepTimeoutMs) {
+            finish("timeout", step);
+        } else {
+            setTimeout(poll, 10);
+        }
+    })();
+}
+var box = document.getElementById(elementId);
+if (box === null) { return finish("not_found", "booking_find_box"); }
+var boxText = box.innerText.toLowerCase();
+if (boxText.indexOf("confirm") !== -1) { return finish("already_registered", "booking_find_box"); }
+if (boxText.indexOf("waiting") !== -1) { return finish("waitlisted", "booking_find_box"); }
+if (boxText.indexOf("cancel") !== -1) { return finish("canceled", "booking_find_box"); }
+var registerIcon = box.querySelector("i.subscribe-class-icon[onclick*='register']");
+if (registerIcon === null) { return finish("not_found", "booking_find_box"); }
+registerIcon.click();
+timings["booking_find_box"] = performance.now() - stepStart;
+stepStart = performance.now();
+waitFor("booking_modal", function() {
+    var errorModal = document.getElementById("book_confirm_error_modal");
+    if (isVisible(errorModal)) { return errorModal; }
+    var confirmModal = document.getElementById("book_confirm_modal");
+    return isVisible(confirmModal) ? confirmModal : null;
+}, function(modal) {
+    if (modal.id === "book_confirm_error_modal") {
+        var errorText = modal.innerText;
+        var cancelButton = modal.querySelector(":scope > div > div > div:nth-of-type(2) > button");
+        if (cancelButton !== null) { cancelButton.click(); }
+        return finish(
+            errorText.toLowerCase().indexOf("new membership") !== -1 ? "out_of_membership" : "booking_error",
+            "booking_modal", errorText
+        );
+    }
+    waitFor("booking_confirm", function() {
+        var confirmButton = document.getElementById("confirm");
+        return isVisible(confirmButton) && !confirmButton.disabled ? confirmButton : null;
+    }, function(confirmButton) {
+        confirmButton.click();
+        waitFor("booking_alert", function() {
+            var title = document.querySelector("#modal_alert > div > div > div:nth-of-type(1) > h4");
+            return isVisible(title) && title.innerText.indexOf("Message") !== -1 ? title : null;
+        }, function(title) {
+            var alertModal = document.getElementById("modal_alert");
+            var exitButton = title.parentElement.querySelector("button");
+            var message = alertModal.innerText;
+            if (exitButton !== null) { exitButton.click(); }
+            finish("registered", "booking_alert", message);
+        });
+    });
+});
+"""
+
+
+# Book a class with one WebDriver round trip running _booking_script in the page
+def _book_class_in_browser(
+    web_handle: WebHandle, element_id: str, datetime_to_register: datetime
+) -> bool:
+    web_handle.booking_count += 1
+    start_time = time.time()
+    with web_handle.metrics.span(
+        "booking_script", class_datetime=str(datetime_to_register)
+    ):
+        try:
+            booking_result = web_handle.driver.execute_async_script(
+                _booking_script, element_id, int(web_handle.web_timeout * 1000)
+            )
+        except Exception as e:
+            # The script may have failed after its confirm click, only a reloaded page tells
+            raise BookingStepError(
+                f"Booking script of {datetime_to_register} failed: {e!r}",
+                step="booking_script",
+            ) from e
+    # Steps timed in the browser, same span names as the step by step booking
+    step_start_time = start_time
+    for step_name, step_duration_ms in booking_result["timings"].items():
+        web_handle.metrics.record_span(
+            step_name, step_start_time, step_duration_ms / 1000
         )
+        step_start_time += step_duration_ms / 1000
+    logger.debug(
+        f"Booking script outcome for {datetime_to_register}: {booking_result['outcome']} (step {booking_result['step']})"
     )
+
+    outcome = booking_result["outcome"]
+    if outcome == "registered":
+        return _booking_alert_outcome(booking_result["message"])
+    elif outcome == "already_registered":
+        return False
+    elif outcome == "waitlisted":
+        raise ClassWaitlistedError("Already on the class waiting list!")
+    elif outcome == "canceled":
+        raise ClassCanceledError()
+    elif outcome == "out_of_membership":
+        raise OutOfMembershipError()
+    elif outcome == "not_found":
+        raise ClassNotFoundError(
+            f"Can't find a noon class to register on {datetime_to_register}!"
+        )
+    elif outcome == "timeout":
+        raise BookingTimeoutError(
+            f"Booking of {datetime_to_register} timed out at step {booking_result['step']}!",
+            step=booking_result["step"],
+        )
+    raise Exception(
+        f"Booking of {datetime_to_register} failed at step {booking_result['step']}: {booking_result['message']}"
+    )
+
+
+# Go through the registration modals after a click on the class register button
+def _confirm_class_registration(web_handle: WebHandle) -> bool:
+    web_handle.booking_count += 1
+    # Register or Waiting List Modal Dialog
+    with web_handle.metrics.span("booking_modal"):
+        popup_window = web_handle.wait.until(
+            EC.any_of(
+                EC.visibility_of_element_located((By.ID, "book_confirm_modal")),
+                EC.visibility_of_element_located((By.ID, "book_confirm_error_modal")),
+            )
+        )
     if (
         "new membership"
         in web_handle.driver.find_element(
@@ -324,211 +1853,4086 @@ def register_to_class(
         raise OutOfMembershipError()
 
     # Click on the class confirm button
-    confirm_button = web_handle.wait.until(
-        EC.element_to_be_clickable((By.XPATH, '//*[@id="confirm"]'))
-    )
-    confirm_button.click()
-
-    # Wait for the success message pop up
-    alert = web_handle.wait.until(
-        EC.text_to_be_present_in_element(
-            (By.XPATH, '//*[@id="modal_alert"]/div/div/div[1]/h4'), "Message"
-        )
-    )
-    # Click on the exit on the success message
-    exit_button = web_handle.wait.until(
-        EC.element_to_be_clickable(
-            (By.XPATH, '//*[@id="modal_alert"]/div/div/div[1]/button')
+    with web_handle.metrics.span("booking_confirm"):
+        confirm_button = web_handle.wait.until(
+            EC.element_to_be_clickable((By.XPATH, '//*[@id="confirm"]'))
         )
-    )
-    exit_button.click()
+        try:
+            confirm_button.click()
+        except Exception as e:
+            # The click may have gone through, only a reloaded page tells
+            raise BookingStepError(
+                f"Confirm click failed: {e!r}", step="booking_confirm"
+            ) from e
+
+    with web_handle.metrics.span("booking_alert"):
+        # Wait for the success message pop up
+        try:
+            alert = web_handle.wait.until(
+                EC.text_to_be_present_in_element(
+                    (By.XPATH, '//*[@id="modal_alert"]/div/div/div[1]/h4'), "Message"
+                )
+            )
+        except TimeoutException:
+            raise BookingTimeoutError(
+                "No booking message after the confirm click!", step="booking_alert"
+            )
+        try:
+            booking_message = web_handle.driver.find_element(By.ID, "modal_alert").text
+            # Click on the exit on the success message
+            exit_button = web_handle.wait.until(
+                EC.element_to_be_clickable(
+                    (By.XPATH, '//*[@id="modal_alert"]/div/div/div[1]/button')
+                )
+            )
+            exit_button.click()
+        except Exception as e:
+            raise BookingStepError(
+                f"Booking message exit failed: {e!r}", step="booking_alert"
+            ) from e
+    return _booking_alert_outcome(booking_message)
+
+
+# Return of a booking from its alert message (shown after the confirm click, booked unless it says otherwise)
+def _booking_alert_outcome(booking_message: str) -> bool:
+    outcome = classify_booking_message(booking_message) or "registered"
+    if outcome == "waitlisted":
+        raise ClassWaitlistedError()
+    elif outcome == "already_registered":
+        return False
+    elif outcome == "out_of_membership":
+        raise OutOfMembershipError()
+    elif outcome == "booking_error":
+        raise Exception(f"Booking failed: {booking_message.strip()}")
     return True
 
 
-def send_log_file_via_email(
-    log_file_path: Path,
-    recipient_email: str,
-    sender_email: str,
-    sender_password: str,
-):
-    """
-    Send the log file via email.
+## HTTP Backend
+# Fliip web page paths used by the HTTP backend, same requests as the ones done by the browser
+fliip_login_path = "/home/login"
+fliip_calendar_path = "/home/calendar"  # Week to show given with "date" query parameter
+# Booking requests sent by the register icon and the confirm button, learned from a recorded
+# browser booking (see learn_http_booking_steps, default_http_booking_steps until then), the site
+# has no documented booking API
+http_booking_steps_file_path = (
+    Path(__file__).parent.joinpath("fliip_http_booking.json").resolve()
+)
+# Request headers kept in the recordings and sent by the HTTP booking (AJAX and CSRF headers)
+booking_request_header_patterns = ("x-requested-with", "csrf", "xsrf")
+# Placeholders of the booking request templates, filled with the values of the class to book
+_booking_placeholder_regex = re.compile(
+    r"\{(element_id|class_date|start_time|arg\d+|token:[^{}]+)\}"
+)
 
-    :param log_file_path: Path to the log file.
-    :param recipient_email: Email address to send the log file to.
-    :param sender_email: Sender's email address.
-    :param sender_password: Sender's email password.
-    """
-    if not sender_email.endswith("@gmail.com"):
-        error_msg = f"Sender email {sender_email} is not a Gmail address. Email sending aborted."
-        logger.error(error_msg)
-        raise ValueError(error_msg)
-    try:
-        # Create the email
-        subject = "Fliip Registering Errors Log"
-        body = "Please find attached the log file containing errors during the registration process."
 
-        msg = MIMEMultipart()
-        msg["From"] = sender_email
-        msg["To"] = recipient_email
-        msg["Subject"] = subject
+class _FormInputsParser(HTMLParser):
+    """Collect the login form action and its named inputs (e.g. hidden CSRF token)."""
 
-        msg.attach(MIMEText(body, "plain"))
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.form_action: str | None = None
+        self.inputs: dict[str, str] = {}
+        self._in_form = False
 
-        # Attach the log file
-        with open(log_file_path, "rb") as attachment:
-            part = MIMEBase("application", "octet-stream")
-            part.set_payload(attachment.read())
-        encoders.encode_base64(part)
-        part.add_header(
-            "Content-Disposition",
-            f"attachment; filename={os.path.basename(log_file_path)}",
-        )
-        msg.attach(part)
+    def handle_starttag(self, tag, attrs):
+        attrs_dict = dict(attrs)
+        if tag == "form" and self.form_action is None:
+            self._in_form = True
+            self.form_action = attrs_dict.get("action") or fliip_login_path
+        elif tag == "input" and self._in_form and attrs_dict.get("name"):
+            self.inputs[attrs_dict["name"]] = attrs_dict.get("value") or ""
 
-        # Send the email
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
-            server.starttls()
-            server.login(sender_email, sender_password)
-            server.sendmail(sender_email, recipient_email, msg.as_string())
+    def handle_endtag(self, tag):
+        if tag == "form":
+            self._in_form = False
 
-        logger.info("Log file sent via email successfully.")
-    except Exception as e:
-        logger.error(
-            f"Failed to send log file via email from {sender_email} to {recipient_email}: {e}"
-        )
 
+class _PageTokensParser(HTMLParser):
+    """Collect the hidden inputs and token meta tags of a page (e.g. CSRF token of the booking requests)."""
 
-def main(
-    fliip_gym_name: str,
-    fliip_username: str,
-    fliip_password: str,
-    max_hours_in_future_to_register: int,
-    weekday_classes_to_register: dict[str, list[int]],
-    recipient_email: str | None = None,
-    sender_email: str | None = None,
-    sender_password: str | None = None,
-    headless: bool = True,
-    web_timeout: float = 5.0,
-    force_send_log_email: bool = False,
-):
-    # Get the browser handle
-    web_handle = get_web_web_handle(headless=headless, web_timeout=web_timeout)
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tokens: dict[str, str] = {}
 
-    # Login to Fliip Gym Web Page
-    fliip_web_page_login(
-        web_handle=web_handle,
-        fliip_gym_name=fliip_gym_name,
-        fliip_username=fliip_username,
-        fliip_password=fliip_password,
-    )
+    def handle_starttag(self, tag, attrs):
+        attrs_dict = dict(attrs)
+        if (
+            tag == "input"
+            and (attrs_dict.get("type") or "").lower() == "hidden"
+            and attrs_dict.get("name")
+        ):
+            self.tokens.setdefault(attrs_dict["name"], attrs_dict.get("value") or "")
+        elif tag == "meta" and "token" in (attrs_dict.get("name") or "").lower():
+            self.tokens.setdefault(attrs_dict["name"], attrs_dict.get("content") or "")
 
-    # Registering Loop
-    logger.info("Starting Registering loop...")
-    # Date in week scrolling header should be today at calendar page first loading
-    expected_date = datetime.now().date()
 
-    registered_return_list: list[tuple[datetime | None, bool]] = []
-    error_date_list: list[tuple[datetime, Exception]] = []
-    # Loop for the max number of week in advance you can register too
-    max_weeks_in_future_to_register = int(
-        (max_hours_in_future_to_register / 24 / 7) + 1
-    )
-    for week_ind in range(0, max_weeks_in_future_to_register):
-        # Check current calendar week page date against expected date
-        # Format the expected date to the expected format
-        expected_date_str = expected_date.strftime(f"%A %#d %b, %Y")
-        # Wait for the proper week page load in the calendar
-        try:
-            current_date_correct = web_handle.wait.until(
-                EC.text_to_be_present_in_element(
-                    (By.ID, "current-date"), expected_date_str
-                )
-            )
-        except:
-            current_date_correct = False
-        if not current_date_correct:
-            raise RuntimeError(
-                f"Unexpected calendar page! (expected {expected_date_str})"
-            )
-        logger.debug(f"Registering for week: {expected_date_str}...")
-        # Get current calendar page date
-        current_calendar_page_date = web_handle.driver.find_element(
-            By.ID, "current-date"
-        )
-        current_calendar_page_date = parser.parse(current_calendar_page_date.text)
+def parse_page_tokens(page_source: str) -> dict[str, str]:
+    """Return the hidden input values and token meta tag contents of a page HTML by name."""
+    tokens_parser = _PageTokensParser()
+    tokens_parser.feed(page_source)
+    tokens_parser.close()
+    return tokens_parser.tokens
 
-        for weekday_str, classes_hour_list in weekday_classes_to_register.items():
-            for class_hour in classes_hour_list:
-                logger.debug(f"Registering for {weekday_str} {class_hour}:00 class...")
-                datetime_to_register = get_datetime_from_weekday_str(
-                    weekday_to_register_str=weekday_str,
-                    hour_to_register=class_hour,
-                    current_calendar_page_date=current_calendar_page_date,
+
+# Arguments of a register icon onclick, e.g. ["764296", "2024-12-24"] for "register(764296,'2024-12-24')"
+def _onclick_args(register_onclick: str | None) -> list[str]:
+    onclick_args = re.search(r"\((.*)\)", register_onclick or "")
+    if onclick_args is None:
+        return []
+    return [
+        arg.strip().strip("'\"")
+        for arg in onclick_args.group(1).split(",")
+        if arg.strip() != ""
+    ]
+
+
+def get_booking_template_values(
+    calendar_class: CalendarClass, page_tokens: dict[str, str]
+) -> dict[str, str]:
+    """
+    Return the values of the booking request placeholders for a class.
+
+    :param calendar_class: Class to book, parsed from its calendar week page.
+    :param page_tokens: Tokens of the calendar week page (see parse_page_tokens).
+    :return: Dict of the values by placeholder name, class values first then the page tokens.
+    """
+    template_values = {
+        "element_id": calendar_class.element_id,
+        "class_date": calendar_class.class_date,
+        "start_time": calendar_class.start_time,
+    }
+    for arg_ind, arg in enumerate(_onclick_args(calendar_class.register_onclick)):
+        template_values[f"arg{arg_ind}"] = arg
+    for token_name, token_value in page_tokens.items():
+        template_values[f"token:{token_name}"] = token_value
+    return template_values
+
+
+def _to_booking_template(value: str, template_values: dict[str, str]) -> str:
+    for placeholder_name, template_value in template_values.items():
+        if template_value != "" and value == template_value:
+            return f"{{{placeholder_name}}}"
+    return value
+
+
+def _fill_booking_template(
+    template: str, template_values: dict[str, str], url_quote: bool = False
+) -> str:
+    def fill_placeholder(placeholder_match: re.Match) -> str:
+        placeholder_name = placeholder_match.group(1)
+        if placeholder_name not in template_values:
+            raise RuntimeError(
+                f"Booking request needs {placeholder_name}, not found on the calendar page!"
+            )
+        value = template_values[placeholder_name]
+        return urllib.parse.quote(value, safe="") if url_quote else value
+
+    return _booking_placeholder_regex.sub(fill_placeholder, template)
+
+
+# One request of the booking sequence, its values templated with the class placeholders
+@dataclass
+class HttpBookingStep(object):
+    method: str
+    path: str  # Path template, e.g. "/home/book/{arg0}"
+    query: list[list[str]] = field(default_factory=list)  # [name, value template] pairs
+    headers: dict[str, str] = field(default_factory=dict)
+    body_format: str | None = None  # "form", "json" (value templates of JSON values) or None
+    body: list[list[str]] = field(default_factory=list)  # [name, value template] pairs
+
+
+# Booking requests used until a browser booking is recorded, learned from the sample_booking
+# recording of tests/fixtures (register icon booking check, then confirm button booking)
+default_http_booking_steps = [
+    HttpBookingStep(
+        method="POST",
+        path="/home/check_booking",
+        headers={
+            "X-Requested-With": "XMLHttpRequest",
+            "X-CSRF-TOKEN": "{token:csrf-token}",
+        },
+        body_format="form",
+        body=[["class_id", "{arg0}"], ["date", "{class_date}"]],
+    ),
+    HttpBookingStep(
+        method="POST",
+        path="/home/book_class",
+        headers={
+            "X-Requested-With": "XMLHttpRequest",
+            "X-CSRF-TOKEN": "{token:csrf-token}",
+        },
+        body_format="form",
+        body=[
+            ["class_id", "{arg0}"],
+            ["date", "{class_date}"],
+            ["_token", "{token:csrf-token}"],
+        ],
+    ),
+]
+
+
+def _booking_request_headers(headers: dict[str, str] | None) -> dict[str, str] | None:
+    """Return the AJAX and CSRF headers of a request, None if it has none."""
+    kept_headers = {
+        header_name: header_value
+        for header_name, header_value in (headers or {}).items()
+        if any(
+            pattern in header_name.lower() for pattern in booking_request_header_patterns
+        )
+    }
+    return kept_headers if len(kept_headers) > 0 else None
+
+
+def _parse_request_body(request_body: str | None) -> tuple[str | None, list[tuple[str, object]]]:
+    """Return the format ("form", "json" or None) and the fields of a recorded request body."""
+    if not request_body:
+        return None, []
+    try:
+        body_json = json.loads(request_body)
+    except ValueError:
+        body_json = None
+    if isinstance(body_json, dict):
+        return "json", list(body_json.items())
+    return "form", urllib.parse.parse_qsl(request_body, keep_blank_values=True)
+
+
+def _to_booking_step(exchange: dict, template_values: dict[str, str]) -> HttpBookingStep:
+    path_segments = []
+    for path_segment in exchange["path"].split("/"):
+        path_segment_template = _to_booking_template(
+            urllib.parse.unquote(path_segment), template_values
+        )
+        path_segments.append(
+            path_segment_template
+            if _booking_placeholder_regex.fullmatch(path_segment_template)
+            else path_segment
+        )
+    body_format, body_fields = _parse_request_body(exchange["request_body"])
+    body_templates = []
+    for field_name, field_value in body_fields:
+        if body_format == "json":
+            raw_value = field_value if isinstance(field_value, str) else json.dumps(field_value)
+            value_template = _to_booking_template(raw_value, template_values)
+            if value_template == raw_value:
+                value_template = json.dumps(field_value)
+            elif isinstance(field_value, str):
+                value_template = json.dumps(value_template)  # Quoted placeholder
+        else:
+            value_template = _to_booking_template(field_value, template_values)
+        body_templates.append([field_name, value_template])
+    return HttpBookingStep(
+        method=exchange["method"],
+        path="/".join(path_segments),
+        query=[
+            [query_name, _to_booking_template(query_value, template_values)]
+            for query_name, query_value in urllib.parse.parse_qsl(
+                exchange["query"], keep_blank_values=True
+            )
+        ],
+        headers={
+            header_name: _to_booking_template(header_value, template_values)
+            for header_name, header_value in (
+                exchange.get("request_headers") or {}
+            ).items()
+        },
+        body_format=body_format,
+        body=body_templates,
+    )
+
+
+def _exchange_values(exchange: dict) -> set[str]:
+    """Return the path segments, query values and body values sent by a recorded request."""
+    exchange_values = {
+        urllib.parse.unquote(path_segment) for path_segment in exchange["path"].split("/")
+    }
+    exchange_values.update(
+        query_value
+        for _, query_value in urllib.parse.parse_qsl(
+            exchange["query"], keep_blank_values=True
+        )
+    )
+    exchange_values.update(
+        field_value if isinstance(field_value, str) else json.dumps(field_value)
+        for _, field_value in _parse_request_body(exchange["request_body"])[1]
+    )
+    return exchange_values
+
+
+def find_recorded_booking(
+    manifest: dict,
+) -> tuple[CalendarClass, dict[str, str], list[dict]] | None:
+    """
+    Find the first class booking of a browser recording.
+
+    The booking starts at the first XHR/Fetch request after a calendar week page sending a value
+    identifying one of its classes (element id or onclick argument) and ends at the next page load.
+
+    :param manifest: Fixture bundle manifest (see load_fixture_bundle).
+    :return: The booked class, the tokens of its calendar page and the booking exchanges, None if no booking.
+    """
+    week_classes: dict[tuple[str, str], CalendarClass] = {}
+    page_tokens: dict[str, str] = {}
+    booked_class = None
+    booking_exchanges = []
+    for exchange in manifest["exchanges"]:
+        resource_type = exchange.get("resource_type")
+        is_calendar_page = (
+            exchange["method"] == "GET"
+            and exchange["body"] is not None
+            and parse_calendar_page_date(exchange["body"]) is not None
+        )
+        if is_calendar_page or resource_type == "Document":
+            if booked_class is not None:
+                break  # Page reloaded after the booking
+            if is_calendar_page:
+                week_classes = parse_calendar_week_page(exchange["body"])
+                page_tokens = parse_page_tokens(exchange["body"])
+            continue
+        if resource_type not in (None, "XHR", "Fetch"):
+            continue  # Scripts and styles of the page
+        if booked_class is None:
+            exchange_values = _exchange_values(exchange)
+            booked_class = next(
+                (
+                    calendar_class
+                    for calendar_class in week_classes.values()
+                    if calendar_class.register_onclick is not None
+                    and any(
+                        class_value in exchange_values
+                        for class_value in [calendar_class.element_id]
+                        + _onclick_args(calendar_class.register_onclick)
+                        # Date and hour arguments are shared with other classes
+                        if len(class_value) >= 3
+                        and class_value != calendar_class.class_date
+                    )
+                ),
+                None,
+            )
+            if booked_class is None:
+                continue
+        booking_exchanges.append(exchange)
+    if booked_class is None:
+        return None
+    return booked_class, page_tokens, booking_exchanges
+
+
+def learn_http_booking_steps(manifest: dict) -> list[HttpBookingStep]:
+    """
+    Learn the booking requests of the HTTP backend from the first booking of a browser recording.
+
+    The values of the booked class and the page tokens are replaced by placeholders, filled with the
+    values of the class to book by the HTTP backend (see FliipHttpSession.book_class).
+
+    :param manifest: Fixture bundle manifest (see load_fixture_bundle).
+    :raise ValueError: No class booking in the recording.
+    """
+    recorded_booking = find_recorded_booking(manifest)
+    if recorded_booking is None:
+        raise ValueError("No class booking in the recording!")
+    booked_class, page_tokens, booking_exchanges = recorded_booking
+    template_values = get_booking_template_values(booked_class, page_tokens)
+    return [
+        _to_booking_step(exchange, template_values) for exchange in booking_exchanges
+    ]
+
+
+def save_http_booking_steps(
+    booking_steps: list[HttpBookingStep],
+    learned_from: str,
+    booking_steps_file_path: Path = http_booking_steps_file_path,
+) -> None:
+    with open(booking_steps_file_path, "w") as booking_steps_file:
+        json.dump(
+            {
+                "learned_from": learned_from,
+                "learned_at": datetime.now().isoformat(),
+                "steps": [asdict(booking_step) for booking_step in booking_steps],
+            },
+            booking_steps_file,
+            indent=2,
+        )
+
+
+def load_http_booking_steps(
+    booking_steps_file_path: Path = http_booking_steps_file_path,
+) -> list[HttpBookingStep] | None:
+    """Return the learned booking requests, None if none were learned yet."""
+    if not booking_steps_file_path.exists():
+        return None
+    with open(booking_steps_file_path) as booking_steps_file:
+        booking_steps_dict = json.load(booking_steps_file)
+    return [
+        HttpBookingStep(**booking_step_dict)
+        for booking_step_dict in booking_steps_dict["steps"]
+    ]
+
+
+# Object to hold a requests session logged in on a Fliip gym web page
+class FliipHttpSession(object):
+    """Fliip login, calendar week fetch and class booking over HTTP, without Selenium/Chrome."""
+
+    def __init__(
+        self,
+        fliip_gym_name: str,
+        web_timeout: float = 5.0,
+        pool_maxsize: int = 4,
+        base_url: str | None = None,
+        metrics: RunMetrics | None = None,
+        session_recorder: SessionRecorder | None = None,
+        booking_steps: list[HttpBookingStep] | None = None,
+    ):
+        """
+        :param fliip_gym_name: Fliip gym name (subdomain of fliipapp.com).
+        :param web_timeout: The timeout of each HTTP request.
+        :param pool_maxsize: Max number of pooled connections kept alive to the gym web page.
+        :param base_url: Override of the gym web page URL (e.g. for a local stand-in server).
+        :param metrics: Run metrics of the session, a new one if None.
+        :param session_recorder: Recorder of the requests and responses, None to not record.
+        :param booking_steps: Booking requests (see learn_http_booking_steps), loaded from
+            http_booking_steps_file_path at the first booking if None (default_http_booking_steps
+            if none were learned).
+        """
+        self.metrics = metrics if metrics is not None else RunMetrics()
+        self.session_recorder = session_recorder
+        self.booking_steps = booking_steps
+        self.page_tokens: dict[str, str] = {}  # Tokens of the last calendar week page fetched
+        self.fliip_gym_name = fliip_gym_name
+        self.web_timeout = web_timeout
+        self.base_url = (
+            base_url
+            if base_url is not None
+            else get_fliip_base_url(fliip_gym_name)
+        ).rstrip("/")
+        _load_requests()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        self.metrics.count("http_requests")
+        start_time = time.time()
+        response = self.session.request(
+            method, f"{self.base_url}{path}", timeout=self.web_timeout, **kwargs
+        )
+        if self.session_recorder is not None:
+            self.session_recorder.record_http_response(response, start_time)
+        response.raise_for_status()
+        return response
+
+    def _get(self, path: str, **kwargs) -> requests.Response:
+        return self._request("GET", path, **kwargs)
+
+    def _post(self, path: str, **kwargs) -> requests.Response:
+        return self._request("POST", path, **kwargs)
+
+    def _restore_cached_session(
+        self, fliip_username: str, fliip_password: str
+    ) -> bool:
+        session_cache = load_session_cache(
+            self.fliip_gym_name, fliip_username, fliip_password
+        )
+        if session_cache is None or session_cache.get("language") != "en":
+            return False
+        for cookie in session_cache["cookies"]:
+            self.session.cookies.set(
+                cookie["name"],
+                cookie["value"],
+                domain=cookie.get("domain", ""),
+                path=cookie.get("path", "/"),
+            )
+        # One request to check the session: calendar page only shows up when logged in
+        try:
+            calendar_page = self._get(fliip_calendar_path)
+        except requests.HTTPError as e:
+            # E.g. 401/403 for a revoked session, or an error page for its stale cookies
+            logger.info(
+                f"Cached session of {fliip_username} rejected ({e}), logging in..."
+            )
+            calendar_page = None
+        if calendar_page is None or parse_calendar_page_date(calendar_page.text) is None:
+            if calendar_page is not None:
+                logger.info(f"Cached session of {fliip_username} expired, logging in...")
+            invalidate_session_cache(self.fliip_gym_name, fliip_username)
+            self.session.cookies.clear()
+            return False
+        return True
+
+    def login(
+        self,
+        fliip_username: str,
+        fliip_password: str,
+        use_session_cache: bool = False,
+    ) -> None:
+        """
+        Login to the Fliip gym web page and set the language to English for proper parsing of date strings.
+
+        :param fliip_username: Fliip account username.
+        :param fliip_password: Fliip account password.
+        :param use_session_cache: If True, reuse a still valid cached session instead of logging in.
+        """
+        with self.metrics.span("login"):
+            self._login(
+                fliip_username=fliip_username,
+                fliip_password=fliip_password,
+                use_session_cache=use_session_cache,
+            )
+
+    def _login(
+        self,
+        fliip_username: str,
+        fliip_password: str,
+        use_session_cache: bool,
+    ) -> None:
+        logger.info(
+            f"Connecting {fliip_username} to {self.fliip_gym_name} Fliip Gym Web Page (HTTP)..."
+        )
+        if use_session_cache and self._restore_cached_session(
+            fliip_username=fliip_username, fliip_password=fliip_password
+        ):
+            logger.debug("Connected with cached session!")
+            return
+        login_page = self._get(fliip_login_path)
+        form_parser = _FormInputsParser()
+        form_parser.feed(login_page.text)
+        form_data = dict(form_parser.inputs)  # Keep hidden inputs (e.g. CSRF token)
+        form_data["username"] = fliip_username
+        form_data["password"] = fliip_password
+        form_action = form_parser.form_action or fliip_login_path
+        if form_action.startswith("http"):
+            form_action = "/" + form_action.split("/", 3)[-1]
+        logged_in_page = self._post(form_action, data=form_data)
+        if 'id="change_language"' not in logged_in_page.text:
+            raise RuntimeError(
+                f"Fliip login failed for {fliip_username} on {self.fliip_gym_name}!"
+            )
+
+        logger.debug("Logged in, changing language to english...")
+        # First entry of the language menu is English, same as the browser click
+        language_match = re.search(
+            r'id="change_language".*?<li[^>]*>\s*<a[^>]*href="([^"]+)"',
+            logged_in_page.text,
+            flags=re.DOTALL,
+        )
+        if language_match is not None and not language_match.group(1).startswith(
+            ("#", "javascript")
+        ):
+            language_path = language_match.group(1)
+            if language_path.startswith("http"):
+                language_path = "/" + language_path.split("/", 3)[-1]
+            self._get(language_path)
+        if use_session_cache:
+            save_session_cache(
+                fliip_gym_name=self.fliip_gym_name,
+                fliip_username=fliip_username,
+                fliip_password=fliip_password,
+                cookies=[
+                    {
+                        "name": cookie.name,
+                        "value": cookie.value,
+                        "domain": cookie.domain,
+                        "path": cookie.path,
+                        "secure": cookie.secure,
+                    }
+                    for cookie in self.session.cookies
+                ],
+                language="en",
+            )
+        logger.debug("Connected!")
+
+    def get_calendar_week(
+        self,
+        week_date: date,
+    ) -> tuple[datetime, dict[tuple[str, str], CalendarClass]]:
+        """
+        Fetch and parse the calendar week page of a date.
+
+        :param week_date: Date of the calendar week page to fetch.
+        :return: The calendar page date and the classes of the week page.
+        """
+        with self.metrics.span("week_page_load", week=str(week_date)):
+            week_page = self._get(
+                fliip_calendar_path, params={"date": week_date.strftime("%Y-%m-%d")}
+            )
+        current_calendar_page_date = parse_calendar_page_date(week_page.text)
+        if current_calendar_page_date is None:
+            raise UnexpectedCalendarPageError(
+                f"Unexpected calendar page! (expected {week_date})"
+            )
+        self.page_tokens = parse_page_tokens(week_page.text)
+        return current_calendar_page_date, parse_calendar_week_page(week_page.text)
+
+    # Same return and exceptions as register_to_class.
+    def register_to_class(
+        self,
+        datetime_to_register: datetime,
+        week_classes: dict[tuple[str, str], CalendarClass],
+        max_hours_in_future_to_register: int = 31 * 24,  # Default to 31 days in hours
+    ) -> bool | None:
+        if datetime_to_register < datetime.now():
+            # Class in the past, return and skip
+            return None
+        if (
+            datetime_to_register - datetime.now()
+        ).total_seconds() >= max_hours_in_future_to_register * 3600:
+            # Too far in future to register yet, return and skip
+            return None
+        calendar_class = week_classes.get(calendar_class_key(datetime_to_register))
+        if calendar_class is None:
+            raise ClassNotFoundError(
+                f"Can't find a noon class to register on {datetime_to_register}!"
+            )
+        if calendar_class.status == "confirmed":
+            # Already registered, returning
+            return False
+        elif calendar_class.status == "waiting":
+            # Already on the waiting list, not registered yet
+            raise ClassWaitlistedError("Already on the class waiting list!")
+        elif calendar_class.status == "canceled":
+            raise ClassCanceledError()
+        if calendar_class.register_onclick is None:
+            raise Exception(
+                f"No register button for the class on {datetime_to_register}!"
+            )
+        return self.book_class(calendar_class)
+
+    def book_class(self, calendar_class: CalendarClass) -> bool:
+        """
+        Send the booking requests of the browser register icon and confirm button for a class.
+
+        :param calendar_class: Class to book, parsed from the last calendar week page fetched.
+        :return: True if registered, False if already registered.
+        :raise ClassWaitlistedError: Booked on the class waiting list.
+        """
+        booking_steps = (
+            self.booking_steps
+            if self.booking_steps is not None
+            else load_http_booking_steps(http_booking_steps_file_path)
+        )
+        if booking_steps is None:
+            logger.debug(
+                "No booking requests learned yet, using the default HTTP booking requests."
+            )
+            booking_steps = default_http_booking_steps
+        template_values = get_booking_template_values(calendar_class, self.page_tokens)
+        booking_response = None
+        for step_ind, booking_step in enumerate(booking_steps):
+            request_kwargs = {
+                "params": [
+                    (query_name, _fill_booking_template(value_template, template_values))
+                    for query_name, value_template in booking_step.query
+                ],
+                "headers": {
+                    header_name: _fill_booking_template(value_template, template_values)
+                    for header_name, value_template in booking_step.headers.items()
+                },
+            }
+            if booking_step.body_format == "json":
+                request_kwargs["json"] = {
+                    field_name: json.loads(
+                        _fill_booking_template(value_template, template_values)
+                    )
+                    for field_name, value_template in booking_step.body
+                }
+            elif booking_step.body_format == "form":
+                request_kwargs["data"] = [
+                    (field_name, _fill_booking_template(value_template, template_values))
+                    for field_name, value_template in booking_step.body
+                ]
+            try:
+                with self.metrics.span("booking_request", step=str(step_ind)):
+                    booking_response = self._request(
+                        booking_step.method,
+                        _fill_booking_template(
+                            booking_step.path, template_values, url_quote=True
+                        ),
+                        **request_kwargs,
+                    )
+            except OSError as e:
+                if step_ind < len(booking_steps) - 1:
+                    raise  # Before the confirm request, nothing booked yet
+                # The confirm request may have been handled, only a reloaded page tells
+                raise BookingStepError(
+                    f"Booking confirm request failed: {e!r}", step="booking_confirm"
+                ) from e
+            if classify_booking_message(booking_response.text) == "out_of_membership":
+                raise OutOfMembershipError()  # Error modal instead of the confirm modal
+        return self._booking_response_outcome(booking_response.text, calendar_class)
+
+    @staticmethod
+    def _booking_response_outcome(
+        response_text: str, calendar_class: CalendarClass
+    ) -> bool:
+        # A reloaded calendar page tells by the class status, other responses by their message
+        if parse_calendar_page_date(response_text) is not None:
+            booked_class = parse_calendar_week_page(response_text).get(
+                (calendar_class.class_date, calendar_class.start_time)
+            )
+            outcome = {"confirmed": "registered", "waiting": "waitlisted"}.get(
+                booked_class.status if booked_class is not None else None
+            )
+        else:
+            outcome = classify_booking_message(response_text)
+        if outcome == "registered":
+            return True
+        elif outcome == "waitlisted":
+            raise ClassWaitlistedError()
+        elif outcome == "already_registered":
+            return False
+        raise Exception(
+            f"Booking failed, {outcome or 'unrecognized'} booking response: "
+            f"{' '.join(_booking_message_text(response_text).split())[:200]}"
+        )
+
+
+## Session Recording
+fixtures_dir_path = (
+    Path(__file__).parent.joinpath("fliip_fixtures").resolve()
+)  # Default folder of the recorded fixture bundles
+fixture_format_version = 1  # Bumped on manifest layout changes, checked by load_fixture_bundle
+
+# Browser exchanges kept in the fixtures: pages, their scripts and styles and the booking requests
+recorded_resource_types = ("Document", "XHR", "Fetch", "Script", "Stylesheet")
+redacted_str = "REDACTED"
+
+
+# Pages and network exchanges of one run, saved as an offline fixture bundle
+class SessionRecorder(object):
+    """Record the gym web page exchanges of a run (browser or HTTP backend) with the credentials redacted."""
+
+    def __init__(
+        self,
+        fliip_gym_name: str,
+        backend: str,
+        secrets: list[str],
+        base_url: str | None = None,
+    ):
+        """
+        :param fliip_gym_name: Fliip gym name (subdomain of fliipapp.com).
+        :param backend: "selenium" or "http", saved in the bundle manifest.
+        :param secrets: Strings replaced by REDACTED everywhere in the bundle (e.g. username and password).
+        :param base_url: Gym web page URL, exchanges with other hosts are not recorded.
+        """
+        self.fliip_gym_name = fliip_gym_name
+        self.backend = backend
+        self.base_url = (
+            base_url if base_url is not None else get_fliip_base_url(fliip_gym_name)
+        ).rstrip("/")
+        self.secrets = [secret for secret in secrets if secret]
+        self._secret_regexes = [self._secret_regex(secret) for secret in self.secrets]
+        self.start_time = time.time()
+        self.exchanges: list[dict] = []
+        self._pending_requests: dict[str, dict] = {}  # Browser requests by id, until loaded
+        # Held while draining: drains of other threads and of the draining commands are skipped
+        self._drain_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _secret_regex(secret: str) -> re.Pattern:
+        # As is, URL encoded, HTML escaped (page values) and JSON escaped (AJAX bodies), longest first
+        secret_forms = {
+            secret,
+            urllib.parse.quote_plus(secret),
+            urllib.parse.quote(secret),
+            html.escape(secret),
+            html.escape(secret, quote=False),
+            json.dumps(secret)[1:-1],
+            json.dumps(secret, ensure_ascii=False)[1:-1],
+        }
+        return re.compile(
+            "|".join(
+                re.escape(secret_form)
+                for secret_form in sorted(secret_forms, key=len, reverse=True)
+            ),
+            # Email addresses are case insensitive (e.g. lowercased by the gym pages)
+            flags=re.IGNORECASE if "@" in secret else 0,
+        )
+
+    def redact(self, text: str) -> str:
+        """Replace the secrets (as is, URL encoded, HTML or JSON escaped) in text."""
+        for secret_regex in self._secret_regexes:
+            text = secret_regex.sub(redacted_str, text)
+        return text
+
+    def record_exchange(
+        self,
+        method: str,
+        url: str,
+        status: int,
+        start_time: float,
+        duration_s: float,
+        content_type: str | None = None,
+        request_body: str | None = None,
+        response_body: str | None = None,
+        location: str | None = None,
+        resource_type: str | None = None,
+        request_headers: dict[str, str] | None = None,
+    ) -> None:
+        """
+        Add one request and its response.
+
+        No cookie nor header is kept other than the content type, the redirect location and the
+        AJAX and CSRF request headers (see booking_request_header_patterns).
+
+        :param resource_type: Browser resource type ("Document", "XHR", "Fetch"...), None for the HTTP backend.
+        """
+        if not url.startswith(self.base_url):
+            return  # Third party
+        split_url = urllib.parse.urlsplit(url)
+        exchange = {
+            "method": method.upper(),
+            "path": split_url.path or "/",
+            "query": self.redact(split_url.query),
+            "request_body": self.redact(request_body) if request_body else None,
+            "request_headers": _booking_request_headers(
+                {
+                    header_name: self.redact(header_value)
+                    for header_name, header_value in (request_headers or {}).items()
+                }
+            ),
+            "resource_type": resource_type,
+            "status": status,
+            "content_type": content_type,
+            "location": self.redact(location) if location else None,
+            "start_s": start_time - self.start_time,
+            "duration_s": duration_s,
+            "body": self.redact(response_body) if response_body is not None else None,
+        }
+        with self._lock:
+            self.exchanges.append(exchange)
+
+    def record_http_response(
+        self, response: requests.Response, start_time: float
+    ) -> None:
+        """Add the exchanges of a requests response, its redirects included."""
+        for redirect_ind, exchange_response in enumerate(response.history + [response]):
+            request_body = exchange_response.request.body
+            if isinstance(request_body, bytes):
+                request_body = request_body.decode(errors="replace")
+            is_redirect = redirect_ind < len(response.history)
+            self.record_exchange(
+                method=exchange_response.request.method,
+                url=exchange_response.url,
+                status=exchange_response.status_code,
+                start_time=start_time,
+                duration_s=exchange_response.elapsed.total_seconds(),
+                content_type=exchange_response.headers.get("Content-Type"),
+                request_body=request_body,
+                response_body=None if is_redirect else exchange_response.text,
+                location=exchange_response.headers.get("Location"),
+                request_headers=dict(exchange_response.request.headers),
+            )
+            start_time += exchange_response.elapsed.total_seconds()
+
+    def attach_browser(self, web_handle: WebHandle) -> None:
+        """Drain the browser network log around the commands loading pages or sending requests."""
+        driver_execute = web_handle.driver.execute
+        driver = web_handle.driver
+        # Response bodies of a page are gone once the browser navigates away
+        draining_commands = (
+            "get",
+            "refresh",
+            "clickElement",
+            "sendKeysToElement",
+            "executeScript",
+            "executeAsyncScript",
+            "w3cExecuteScript",
+            "w3cExecuteScriptAsync",
+            "switchToWindow",
+            "close",
+            "quit",
+        )
+
+        def recorded_execute(driver_command, params=None):
+            if driver_command in draining_commands:
+                self.drain_browser_log(driver)
+            result = driver_execute(driver_command, params)
+            if driver_command in draining_commands and driver_command not in (
+                "close",
+                "quit",
+            ):
+                self.drain_browser_log(driver)
+            return result
+
+        driver.execute = recorded_execute
+
+    def drain_browser_log(self, driver: WebDriver) -> None:
+        """Move the finished exchanges of the browser performance log to the recording."""
+        if not self._drain_lock.acquire(blocking=False):
+            return  # Commands of the draining itself, or drained by another thread
+        try:
+            self._drain_browser_log(driver)
+        except Exception as e:
+            logger.debug(f"Browser network log drain failed: {e!r}")
+        finally:
+            self._drain_lock.release()
+
+    def _drain_browser_log(self, driver: WebDriver) -> None:
+        for log_entry in driver.get_log("performance"):
+            message = json.loads(log_entry["message"])["message"]
+            params = message.get("params", {})
+            request_id = params.get("requestId")
+            if message["method"] == "Network.requestWillBeSent":
+                redirect_response = params.get("redirectResponse")
+                redirected_request = self._pending_requests.pop(request_id, None)
+                if redirect_response is not None and redirected_request is not None:
+                    # Same request id for the redirected request, the redirect is an exchange of its own
+                    redirect_headers = {
+                        name.lower(): value
+                        for name, value in redirect_response.get("headers", {}).items()
+                    }
+                    self.record_exchange(
+                        method=redirected_request["method"],
+                        url=redirected_request["url"],
+                        status=redirect_response["status"],
+                        start_time=redirected_request["wall_time"],
+                        duration_s=params["timestamp"] - redirected_request["timestamp"],
+                        content_type=redirect_headers.get("content-type"),
+                        request_body=redirected_request["post_data"],
+                        location=redirect_headers.get("location"),
+                        resource_type=redirected_request["type"],
+                        request_headers=redirected_request["headers"],
+                    )
+                self._pending_requests[request_id] = {
+                    "method": params["request"]["method"],
+                    "url": params["request"]["url"],
+                    "post_data": params["request"].get("postData"),
+                    "headers": params["request"].get("headers"),
+                    "type": params.get("type"),
+                    "timestamp": params["timestamp"],
+                    "wall_time": params.get("wallTime", time.time()),
+                }
+            elif message["method"] == "Network.responseReceived":
+                pending_request = self._pending_requests.get(request_id)
+                if pending_request is not None:
+                    pending_request["status"] = params["response"]["status"]
+                    pending_request["content_type"] = params["response"].get("mimeType")
+                    pending_request["type"] = params.get("type", pending_request["type"])
+            elif message["method"] == "Network.loadingFinished":
+                pending_request = self._pending_requests.pop(request_id, None)
+                if (
+                    pending_request is None
+                    or "status" not in pending_request
+                    or pending_request["type"] not in recorded_resource_types
+                    or not pending_request["url"].startswith(self.base_url)
+                ):
+                    continue
+                response_body = None
+                try:
+                    body_result = driver.execute_cdp_cmd(
+                        "Network.getResponseBody", {"requestId": request_id}
+                    )
+                    if not body_result.get("base64Encoded"):
+                        response_body = body_result["body"]
+                except Exception as e:
+                    # Evicted from the browser buffers (e.g. page navigated away)
+                    logger.debug(f"No body recorded for {pending_request['url']}: {e!r}")
+                self.record_exchange(
+                    method=pending_request["method"],
+                    url=pending_request["url"],
+                    status=pending_request["status"],
+                    start_time=pending_request["wall_time"],
+                    duration_s=params["timestamp"] - pending_request["timestamp"],
+                    content_type=pending_request.get("content_type"),
+                    request_body=pending_request["post_data"],
+                    response_body=response_body,
+                    resource_type=pending_request["type"],
+                    request_headers=pending_request["headers"],
+                )
+            elif message["method"] == "Network.loadingFailed":
+                self._pending_requests.pop(request_id, None)
+
+    def save(self, fixtures_dir_path: Path = fixtures_dir_path) -> Path:
+        """
+        Write the bundle to fixtures_dir_path/{gym}_{start}/ (numbered if taken) and return its path.
+
+        The bundle is a manifest.json of the exchanges in request order and one file per response body.
+        """
+        bundle_name = f"{self.fliip_gym_name}_{datetime.fromtimestamp(self.start_time).strftime('%Y%m%d_%H%M%S')}"
+        bundle_dir_path = fixtures_dir_path.joinpath(bundle_name)
+        # Accounts of a gym registering concurrently can start their recording in the same second
+        bundle_ind = 1
+        while True:
+            try:
+                bundle_dir_path.mkdir(parents=True)
+                break
+            except FileExistsError:
+                bundle_ind += 1
+                bundle_dir_path = fixtures_dir_path.joinpath(f"{bundle_name}_{bundle_ind}")
+        bodies_dir_path = bundle_dir_path.joinpath("bodies")
+        bodies_dir_path.mkdir()
+        with self._lock:
+            exchanges = sorted(self.exchanges, key=lambda exchange: exchange["start_s"])
+        manifest_exchanges = []
+        for exchange_ind, exchange in enumerate(exchanges):
+            manifest_exchange = {
+                key: value for key, value in exchange.items() if key != "body"
+            }
+            manifest_exchange["body_file"] = None
+            if exchange["body"] is not None:
+                content_type = exchange["content_type"] or ""
+                body_suffix = next(
+                    (
+                        suffix
+                        for type_part, suffix in (
+                            ("html", ".html"),
+                            ("javascript", ".js"),
+                            ("css", ".css"),
+                            ("json", ".json"),
+                        )
+                        if type_part in content_type
+                    ),
+                    ".txt",
+                )
+                body_file_name = f"{exchange_ind:04d}{body_suffix}"
+                bodies_dir_path.joinpath(body_file_name).write_text(
+                    exchange["body"], encoding="utf-8"
+                )
+                manifest_exchange["body_file"] = f"bodies/{body_file_name}"
+            manifest_exchanges.append(manifest_exchange)
+        manifest = {
+            "format_version": fixture_format_version,
+            "fliip_gym_name": self.fliip_gym_name,
+            "backend": self.backend,
+            "base_url": self.base_url,
+            "recorded_at": datetime.fromtimestamp(self.start_time).isoformat(),
+            "exchanges": manifest_exchanges,
+        }
+        with open(bundle_dir_path.joinpath("manifest.json"), "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        return bundle_dir_path
+
+
+def load_fixture_bundle(bundle_dir_path: Path) -> dict:
+    """Return the manifest of a fixture bundle with the response bodies loaded in each exchange "body"."""
+    with open(bundle_dir_path.joinpath("manifest.json")) as manifest_file:
+        manifest = json.load(manifest_file)
+    if manifest.get("format_version") != fixture_format_version:
+        raise ValueError(
+            f"Unsupported fixture bundle format version {manifest.get('format_version')} "
+            f"(expected {fixture_format_version}): {bundle_dir_path}"
+        )
+    for exchange in manifest["exchanges"]:
+        exchange["body"] = (
+            bundle_dir_path.joinpath(exchange["body_file"]).read_text(encoding="utf-8")
+            if exchange["body_file"] is not None
+            else None
+        )
+    return manifest
+
+
+# Save the run recording, never failing the run
+def _save_session_recording(
+    session_recorder: SessionRecorder,
+    fixtures_dir_path: Path,
+    web_handle: WebHandle | None = None,
+) -> None:
+    try:
+        if web_handle is not None and not web_handle._closed:
+            session_recorder.drain_browser_log(web_handle.driver)  # Last page exchanges
+        bundle_dir_path = session_recorder.save(fixtures_dir_path)
+        logger.info(
+            f"Session recorded to {bundle_dir_path} ({len(session_recorder.exchanges)} exchanges)."
+        )
+    except Exception as e:
+        logger.error(f"Failed to save the session recording: {e}")
+        return
+    if session_recorder.backend == "selenium":
+        # A browser booking teaches the HTTP backend its booking requests
+        try:
+            learn_http_booking_steps_from_bundle(bundle_dir_path)
+        except ValueError as e:
+            logger.debug(f"No HTTP booking requests learned: {e}")
+        except Exception as e:
+            logger.error(f"Failed to learn the HTTP booking requests: {e}")
+
+
+def learn_http_booking_steps_from_bundle(
+    bundle_dir_path: Path,
+    booking_steps_file_path: Path = http_booking_steps_file_path,
+) -> list[HttpBookingStep]:
+    """
+    Learn the HTTP backend booking requests from a fixture bundle and save them.
+
+    :raise ValueError: No class booking in the bundle.
+    """
+    booking_steps = learn_http_booking_steps(load_fixture_bundle(bundle_dir_path))
+    save_http_booking_steps(
+        booking_steps,
+        learned_from=bundle_dir_path.name,
+        booking_steps_file_path=booking_steps_file_path,
+    )
+    logger.info(
+        f"HTTP backend booking requests learned from {bundle_dir_path} ({len(booking_steps)} requests)."
+    )
+    return booking_steps
+
+
+## Email Reporting
+email_smtp_host = "smtp.gmail.com"  # SMTP server of the emails (e.g. a local stand-in server for tests)
+email_smtp_port = 587
+email_use_starttls = True  # Not supported by most local stand-in servers
+
+
+# Open an authenticated SMTP connection
+def _smtp_connect(
+    smtp_host: str,
+    smtp_port: int,
+    use_starttls: bool,
+    sender_email: str,
+    sender_password: str,
+) -> smtplib.SMTP:
+    _load_email()
+    server = smtplib.SMTP(smtp_host, smtp_port)
+    try:
+        if use_starttls:
+            server.starttls()
+        server.login(sender_email, sender_password)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+# Size of the log file, used as the start offset of the current run log excerpt
+def get_log_file_offset(log_file_path: Path) -> int:
+    try:
+        return os.path.getsize(log_file_path)
+    except OSError:
+        return 0
+
+
+# Read the log file from an offset (start of the run), whole file if it was rewritten or rotated since
+def read_log_excerpt(log_file_path: Path, start_offset: int = 0) -> bytes:
+    flush_logs()
+    with open(log_file_path, "rb") as log_file:
+        if start_offset <= get_log_file_offset(log_file_path):
+            log_file.seek(start_offset)
+        return log_file.read()
+
+
+# Rotated files of a log file (e.g. ".1" or ".2025-01-14" suffixes), oldest first
+def get_rotated_log_file_paths(log_file_path: Path) -> list[Path]:
+    log_file_path = Path(log_file_path)
+    return sorted(
+        (
+            rotated_file_path
+            for rotated_file_path in log_file_path.parent.glob(f"{log_file_path.name}.*")
+            if rotated_file_path.suffix not in (".json", ".tmp")
+        ),
+        key=lambda rotated_file_path: rotated_file_path.stat().st_mtime,
+    )
+
+
+# Read the log lines of one run, from its offsets in the run log index (whole files scanned if not indexed)
+def read_run_log(run_id: str, log_file_path: Path = logging_file_path) -> bytes:
+    flush_logs()
+    run_offsets = (
+        run_log_index.get(run_id)
+        if Path(log_file_path).resolve() == Path(logging_file_handler.baseFilename)
+        else None
+    )
+    if run_offsets is not None:
+        try:
+            with open(log_file_path, "rb") as log_file:
+                log_file.seek(run_offsets[0])
+                log_lines = log_file.read(run_offsets[1] - run_offsets[0])
+        except FileNotFoundError:
+            return b""
+    else:
+        # Not indexed (e.g. logging when the log file rotated): its lines can be in the rotated files too
+        log_lines = b""
+        for run_log_file_path in get_rotated_log_file_paths(log_file_path) + [
+            Path(log_file_path)
+        ]:
+            try:
+                log_lines += run_log_file_path.read_bytes()
+            except FileNotFoundError:
+                continue
+    # Lines of the other runs logging at the same time (e.g. other accounts) are dropped
+    return b"".join(
+        line
+        for line in log_lines.splitlines(keepends=True)
+        if _log_line_run_id(line) == run_id
+    )
+
+
+# Background sender reusing one authenticated SMTP connection for all its emails
+class EmailReporter(object):
+    """Send emails from a background thread so callers never wait on SMTP."""
+
+    def __init__(
+        self,
+        sender_email: str,
+        sender_password: str,
+        smtp_host: str | None = None,
+        smtp_port: int | None = None,
+        use_starttls: bool | None = None,
+    ):
+        """
+        :param sender_email: Sender's email address.
+        :param sender_password: Sender's email password.
+        :param smtp_host: SMTP server, email_smtp_host if None.
+        :param smtp_port: SMTP server port, email_smtp_port if None.
+        :param use_starttls: If True, switch the connection to TLS, email_use_starttls if None.
+        """
+        self.sender_email = sender_email
+        self.sender_password = sender_password
+        self.smtp_host = smtp_host if smtp_host is not None else email_smtp_host
+        self.smtp_port = smtp_port if smtp_port is not None else email_smtp_port
+        self.use_starttls = (
+            use_starttls if use_starttls is not None else email_use_starttls
+        )
+        self._email_queue: queue.Queue[MIMEMultipart | None] = queue.Queue()
+        self._server: smtplib.SMTP | None = None
+        self._thread = threading.Thread(
+            target=self._send_loop, name="fliip_email_reporter", daemon=True
+        )
+        self._thread.start()
+
+    def _connect(self) -> smtplib.SMTP:
+        return _smtp_connect(
+            self.smtp_host,
+            self.smtp_port,
+            self.use_starttls,
+            self.sender_email,
+            self.sender_password,
+        )
+
+    def _disconnect(self) -> None:
+        """Close the SMTP connection (its socket too if the server is gone)."""
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            try:
+                self._server.close()
+            except Exception:
+                pass
+        self._server = None
+
+    def _send(self, msg: MIMEMultipart) -> None:
+        _load_email()
+        if self._server is None:
+            self._server = self._connect()
+        try:
+            self._server.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # Server closed the idle connection, reconnect once
+            self._disconnect()
+            self._server = self._connect()
+            self._server.send_message(msg)
+
+    def _send_loop(self) -> None:
+        while True:
+            msg = self._email_queue.get()
+            try:
+                if msg is None:
+                    return
+                self._send(msg)
+                logger.info(f"Email \"{msg['Subject']}\" sent to {msg['To']} successfully.")
+            except Exception as e:
+                logger.error(
+                    f"Failed to send email from {self.sender_email} to {msg['To']}: {e}"
+                )
+                self._disconnect()  # Fresh connection for the next email
+            finally:
+                self._email_queue.task_done()
+
+    def send(self, msg: MIMEMultipart) -> None:
+        """Queue an email to send, returns immediately."""
+        self._email_queue.put(msg)
+
+    def flush(self) -> None:
+        """Wait for all the queued emails to be sent."""
+        self._email_queue.join()
+
+    def close(self) -> None:
+        """Send the queued emails and close the SMTP connection."""
+        self._email_queue.put(None)
+        self._thread.join()
+        self._disconnect()
+
+
+def send_log_file_via_email(
+    log_file_path: Path,
+    recipient_email: str,
+    sender_email: str,
+    sender_password: str,
+    body: str | None = None,
+    log_start_offset: int = 0,
+    email_reporter: EmailReporter | None = None,
+    log_run_id: str | None = None,
+):
+    """
+    Send the log file via email.
+
+    The log of the run log_run_id, or else the log excerpt from log_start_offset, is attached gzipped.
+
+    :param log_file_path: Path to the log file.
+    :param recipient_email: Email address to send the log file to.
+    :param sender_email: Sender's email address.
+    :param sender_password: Sender's email password.
+    :param body: Optional text added to the email body (e.g. registration summary).
+    :param log_start_offset: Offset in the log file of the first log line to send (see get_log_file_offset).
+    :param email_reporter: Background reporter to send the email with, sent synchronously if None
+        (with the email_smtp_host, email_smtp_port and email_use_starttls settings of the reporters).
+    :param log_run_id: Run id of the log lines to send (see log_context and read_run_log).
+    """
+    smtp_host = (
+        email_reporter.smtp_host if email_reporter is not None else email_smtp_host
+    )
+    if smtp_host == "smtp.gmail.com" and not sender_email.endswith("@gmail.com"):
+        error_msg = f"Sender email {sender_email} is not a Gmail address. Email sending aborted."
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    _load_email()
+    try:
+        # Create the email
+        subject = "Fliip Registering Errors Log"
+        email_body = "Please find attached the log file containing errors during the registration process."
+        if body is not None:
+            email_body = f"{email_body}\n\n{body}"
+
+        msg = MIMEMultipart()
+        msg["From"] = sender_email
+        msg["To"] = recipient_email
+        msg["Subject"] = subject
+
+        msg.attach(MIMEText(email_body, "plain"))
+
+        # Attach the log excerpt gzipped
+        part = MIMEBase("application", "gzip")
+        part.set_payload(
+            gzip.compress(
+                read_run_log(log_run_id, log_file_path)
+                if log_run_id is not None
+                else read_log_excerpt(log_file_path, start_offset=log_start_offset)
+            )
+        )
+        encoders.encode_base64(part)
+        part.add_header(
+            "Content-Disposition",
+            f"attachment; filename={os.path.basename(log_file_path)}.gz",
+        )
+        msg.attach(part)
+
+        if email_reporter is not None:
+            email_reporter.send(msg)
+            return
+
+        # Send the email
+        with _smtp_connect(
+            email_smtp_host,
+            email_smtp_port,
+            email_use_starttls,
+            sender_email,
+            sender_password,
+        ) as server:
+            server.send_message(msg)
+
+        logger.info("Log file sent via email successfully.")
+    except Exception as e:
+        logger.error(
+            f"Failed to send log file via email from {sender_email} to {recipient_email}: {e}"
+        )
+
+
+# Wait for the calendar week page of the expected date and return the calendar page date
+def wait_calendar_page_date(web_handle: WebHandle, expected_date: date) -> datetime:
+    # Format the expected date to the expected format
+    expected_date_str = expected_date.strftime(f"%A %#d %b, %Y")
+    # Wait for the proper week page load in the calendar, or the login page if the session expired
+    try:
+        page_outcome, _ = race_wait(
+            web_handle,
+            "calendar_page_date_wait",
+            {
+                "expected_date": EC.text_to_be_present_in_element(
+                    (By.ID, "current-date"), expected_date_str
+                ),
+                "login_page": EC.presence_of_element_located((By.ID, "password")),
+            },
+        )
+    except TimeoutException:
+        page_outcome = None
+    if page_outcome != "expected_date":
+        raise UnexpectedCalendarPageError(
+            f"Unexpected calendar page! (expected {expected_date_str})"
+        )
+    # Get current calendar page date
+    current_calendar_page_date = web_handle.driver.find_element(By.ID, "current-date")
+    _load_dateutil()
+    return dateutil_parser.parse(current_calendar_page_date.text)
+
+
+# Change the calendar week page to next week
+def click_next_week(web_handle: WebHandle) -> None:
+    # Find and click the next week button
+    _, next_week_button = race_wait(
+        web_handle,
+        "next_week_button_wait",
+        {"next_week_button": EC.element_to_be_clickable((By.ID, "next_week"))},
+    )
+    next_week_button.click()
+    try:
+        # Wait for button staleness (page refresh)
+        race_wait(
+            web_handle,
+            "next_week_refresh_wait",
+            {"page_refreshed": EC.staleness_of(next_week_button)},
+        )
+    except TimeoutException:
+        # Page not refreshed yet, the calendar page date wait catches a wrong week
+        logger.debug("Next week page refresh not detected, checking the page date...")
+
+
+# Index of the calendar week page of a datetime, 0 being the current week page (weeks go Monday to Sunday)
+def get_calendar_week_index(class_datetime: datetime, now: datetime | None = None) -> int:
+    if now is None:
+        now = datetime.now()
+    class_week_monday = class_datetime.date() - timedelta(days=class_datetime.weekday())
+    current_week_monday = now.date() - timedelta(days=now.weekday())
+    return (class_week_monday - current_week_monday).days // 7
+
+
+def plan_target_datetimes(
+    weekday_classes_to_register: dict[str, list[int]],
+    max_hours_in_future_to_register: int,
+    now: datetime | None = None,
+) -> dict[int, list[datetime]]:
+    """
+    Compute the classes that can be registered now, grouped by calendar week page.
+
+    :param weekday_classes_to_register: Weekday classes to register (see main).
+    :param max_hours_in_future_to_register: Max hours in future a class can be registered.
+    :param now: Current datetime, datetime.now() if None.
+    :return: Dict of the sorted class datetimes keyed by calendar week index (see get_calendar_week_index).
+    """
+    if now is None:
+        now = datetime.now()
+    max_datetime = now + timedelta(hours=max_hours_in_future_to_register)
+    week_target_datetimes: dict[int, list[datetime]] = {}
+    for weekday_str, classes_hour_list in weekday_classes_to_register.items():
+        weekday_number = time.strptime(weekday_str, "%A").tm_wday
+        for class_hour in classes_hour_list:
+            class_datetime = (
+                now + timedelta(days=weekday_number - now.weekday())
+            ).replace(hour=class_hour, minute=0, second=0, microsecond=0)
+            # Same window as register_to_class: not in the past and not too far in future
+            while class_datetime < max_datetime:
+                if class_datetime >= now:
+                    week_target_datetimes.setdefault(
+                        get_calendar_week_index(class_datetime, now=now), []
+                    ).append(class_datetime)
+                class_datetime += timedelta(days=7)
+    return {
+        week_ind: sorted(week_target_datetimes[week_ind])
+        for week_ind in sorted(week_target_datetimes)
+    }
+
+
+# Go to a calendar week page from the current one, directly with the page date parameter if possible
+# Return false if the direct navigation is not supported (clicking through the weeks was used).
+def go_to_calendar_week(
+    web_handle: WebHandle,
+    fliip_gym_name: str,
+    current_week_ind: int,
+    target_week_ind: int,
+    direct_week_navigation: bool = True,
+) -> bool:
+    week_date = datetime.now().date() + timedelta(days=7 * target_week_ind)
+    if target_week_ind == current_week_ind:
+        return direct_week_navigation
+    if direct_week_navigation:
+        web_handle.driver.get(get_calendar_week_url(fliip_gym_name, week_date))
+        try:
+            wait_calendar_page_date(web_handle=web_handle, expected_date=week_date)
+            return True
+        except RuntimeError:
+            logger.warning(
+                "Direct calendar week navigation not supported, clicking through the weeks..."
+            )
+            # Page date parameter ignored, back on the current week page
+            wait_calendar_page_date(
+                web_handle=web_handle, expected_date=datetime.now().date()
+            )
+            current_week_ind = 0
+    for _ in range(target_week_ind - current_week_ind):
+        click_next_week(web_handle=web_handle)
+    return False
+
+
+# Register classes of a calendar week page with a register function (one of the backends)
+def register_calendar_week(
+    register_function: Callable[[datetime], bool | None],
+    datetime_to_register_list: list[datetime],
+    registered_return_list: list[datetime],
+    error_date_list: list[tuple[datetime, Exception]],
+) -> None:
+    for datetime_to_register in datetime_to_register_list:
+        with log_context(class_datetime=datetime_to_register.isoformat(timespec="minutes")):
+            logger.debug(
+                f"Registering for {datetime_to_register.strftime('%A %H:%M')} class..."
+            )
+            try:
+                registered_return = register_function(datetime_to_register)
+            except ClassWaitlistedError:
+                logger.info(
+                    f"Registration done for {datetime_to_register.strftime(f'%Y-%m-%d %H:%M')} noon class - On Waiting List."
+                )
+                registered_return_list.append(datetime_to_register)
+                continue
+            except Exception as e:
+                error_date_list.append(
+                    (
+                        datetime_to_register,
+                        e,
+                    )
+                )
+                logger.error(
+                    f"Registration failed for {datetime_to_register.strftime(f'%Y-%m-%d %H:%M')} - Exception: {e}."
+                )
+                continue
+            if registered_return is not None:
+                logger.info(
+                    f"Registration done for {datetime_to_register.strftime(f'%Y-%m-%d %H:%M')} noon class - {'New Registration' if registered_return else 'Already Registered'}."
+                )
+                registered_return_list.append(datetime_to_register)
+
+
+## Retry Engine
+# Booking steps that may have passed the confirm click: the booking may be done, only a reloaded page tells
+booking_steps_after_confirm = ("booking_confirm", "booking_alert", "booking_script")
+
+
+def classify_failure(error: Exception) -> str:
+    """
+    Classify a registering failure for the retry engine.
+
+    :return: "terminal" (never retried), "page" (retried on a reloaded week page) or "retryable" (retried in place).
+    """
+    if isinstance(
+        error, (OutOfMembershipError, ClassCanceledError, ClassWaitlistedError)
+    ):
+        return "terminal"
+    if isinstance(error, BookingStepError):
+        return "page" if error.step in booking_steps_after_confirm else "retryable"
+    if isinstance(error, (ClassNotFoundError, UnexpectedCalendarPageError)):
+        return "page"
+    if "selenium" in sys.modules:
+        _load_selenium()
+        if isinstance(error, InvalidSessionIdException):
+            return "terminal"  # Browser gone, nothing to retry in place
+        if isinstance(error, WebDriverException):
+            return "retryable"  # Stale element, timeout, click intercepted by a modal...
+    if isinstance(error, OSError):
+        return "retryable"  # Connection errors and timeouts (requests exceptions included)
+    return "terminal"
+
+
+# Object to hold the retry limits of a run
+@dataclass
+class RetryPolicy(object):
+    max_attempts: int = 3  # Attempts of each class booking or week page load
+    base_delay_s: float = 0.2
+    max_delay_s: float = 3.0
+    max_retries_per_run: int = 10  # Retries shared by all the classes and pages of a run
+
+    def get_delay_s(self, retry_ind: int) -> float:
+        """Full jitter exponential backoff delay before the retry_ind-th retry (0 for the first)."""
+        return random.uniform(0, min(self.max_delay_s, self.base_delay_s * 2**retry_ind))
+
+
+# Run registering steps with in place retries of their transient failures
+class RetryEngine(object):
+    """Retry retryable failures in place and page failures on a reloaded page, within the run retry budget."""
+
+    def __init__(self, policy: RetryPolicy | None = None, metrics: RunMetrics | None = None):
+        self.policy = policy if policy is not None else RetryPolicy()
+        self.metrics = metrics if metrics is not None else RunMetrics()
+        self.retries_left = self.policy.max_retries_per_run
+        self._lock = threading.Lock()
+
+    def _take_retry(self) -> bool:
+        with self._lock:
+            if self.retries_left <= 0:
+                return False
+            self.retries_left -= 1
+            return True
+
+    def call(
+        self,
+        function: Callable[[], object],
+        description: str,
+        reload_page: Callable[[], None] | None = None,
+    ):
+        """
+        Call function until it succeeds, a terminal failure or the attempts/budget are exhausted.
+
+        :param description: Step description for the logs.
+        :param reload_page: Reload of the page used by function, page failures are not retried without it.
+            Also used from the second retry of a retryable failure on.
+        :return: The function return.
+        """
+        class_not_found_reloaded = False
+        for retry_ind in range(self.policy.max_attempts):
+            try:
+                return function()
+            except Exception as e:
+                failure_class = classify_failure(e)
+                if (
+                    failure_class == "terminal"
+                    or (failure_class == "page" and reload_page is None)
+                    # Still missing from a reloaded page: not on the calendar (e.g. holiday)
+                    or (isinstance(e, ClassNotFoundError) and class_not_found_reloaded)
+                    or retry_ind + 1 >= self.policy.max_attempts
+                    or not self._take_retry()
+                ):
+                    raise
+                if isinstance(e, ClassNotFoundError):
+                    class_not_found_reloaded = True
+                delay_s = self.policy.get_delay_s(retry_ind)
+                logger.warning(
+                    f"{description} failed ({failure_class}): {e!r}, retrying in {delay_s:.2f}s..."
+                )
+                self.metrics.count(f"retries.{failure_class}")
+                time.sleep(delay_s)
+            if reload_page is not None and (failure_class == "page" or retry_ind > 0):
+                try:
+                    reload_page()
+                except Exception as e:
+                    logger.warning(f"Page reload for {description} failed: {e!r}")
+
+
+## Multi-Tab Engine
+# Script reading the calendar page state in one round trip: current-date text and login form presence
+_calendar_page_state_script = """
+var currentDate = document.getElementById("current-date");
+return [currentDate === null ? null : currentDate.textContent, document.getElementById("password") !== null];
+"""
+
+
+# Run the WebDriver commands of the week tabs from asyncio on the shared driver of one account
+class _AsyncTabDriver(object):
+    """One WebDriver command sequence at a time (switching to its tab first), the tabs load in parallel in the browser."""
+
+    def __init__(self, web_handle: WebHandle):
+        self.web_handle = web_handle
+        self.main_window_handle = web_handle.driver.current_window_handle
+        self._current_window_handle = self.main_window_handle
+        # Held only for the tab switch and its WebDriver commands, taken from the worker threads
+        self._lock = threading.Lock()
+
+    def _switch_to(self, window_handle: str) -> None:
+        if window_handle != self._current_window_handle:
+            self.web_handle.driver.switch_to.window(window_handle)
+            self._current_window_handle = window_handle
+
+    async def open_tab(self, url: str) -> str:
+        """Open a tab loading url without waiting for the page and return its window handle."""
+
+        def open_tab() -> str:
+            with self._lock:
+                self.web_handle.driver.switch_to.new_window("tab")
+                self._current_window_handle = self.web_handle.driver.current_window_handle
+                self.web_handle.driver.execute_script(
+                    "window.location.href = arguments[0];", url
+                )
+                return self._current_window_handle
+
+        return await asyncio.to_thread(open_tab)
+
+    def call_in_tab(self, window_handle: str, function: Callable, *args, **kwargs):
+        """Call function (WebDriver commands of the web handle) in the tab of window_handle, blocking."""
+        with self._lock:
+            self._switch_to(window_handle)
+            return function(*args, **kwargs)
+
+    async def run(self, window_handle: str, function: Callable, *args, **kwargs):
+        """Run function (WebDriver commands of the web handle) in the tab of window_handle."""
+        return await asyncio.to_thread(
+            self.call_in_tab, window_handle, function, *args, **kwargs
+        )
+
+    async def close_tab(self, window_handle: str) -> None:
+        def close_tab() -> None:
+            with self._lock:
+                self._switch_to(window_handle)
+                self.web_handle.driver.close()
+                self._switch_to(self.main_window_handle)
+
+        await asyncio.to_thread(close_tab)
+
+    async def wait_calendar_page_date(
+        self, window_handle: str, expected_date: date
+    ) -> None:
+        """Poll the page date of a tab, releasing the driver to the other tabs between polls."""
+        expected_date_str = expected_date.strftime(f"%A %#d %b, %Y")
+        timeout_s = adaptive_timeouts.timeout(
+            "tab_week_page_wait", self.web_handle.web_timeout
+        )
+        start_counter = time.perf_counter()
+        while True:
+            current_date_text, login_page = await self.run(
+                window_handle,
+                self.web_handle.driver.execute_script,
+                _calendar_page_state_script,
+            )
+            if current_date_text is not None and expected_date_str in current_date_text:
+                adaptive_timeouts.observe(
+                    "tab_week_page_wait", time.perf_counter() - start_counter
+                )
+                return
+            if login_page or time.perf_counter() - start_counter > timeout_s:
+                if not login_page:
+                    adaptive_timeouts.observe_timeout("tab_week_page_wait", timeout_s)
+                raise UnexpectedCalendarPageError(
+                    f"Unexpected calendar page! (expected {expected_date_str}, got {current_date_text})"
+                )
+            await asyncio.sleep(wait_poll_frequency_s)
+
+
+# Load a target week in its own tab and register its classes
+async def _register_week_in_tab(
+    tab_driver: _AsyncTabDriver,
+    tab_semaphore: asyncio.Semaphore,
+    fliip_gym_name: str,
+    week_ind: int,
+    datetime_to_register_list: list[datetime],
+    week_register_function: Callable[..., Callable[[datetime], bool | None]],
+    registered_return_list: list[datetime],
+    error_date_list: list[tuple[datetime, Exception]],
+    window_handle: str | None = None,
+) -> None:
+    web_handle = tab_driver.web_handle
+    week_date = datetime.now().date() + timedelta(days=7 * week_ind)
+    async with tab_semaphore:
+        if window_handle is None:
+            window_handle = await tab_driver.open_tab(
+                get_calendar_week_url(fliip_gym_name, week_date)
+            )
+        try:
+            with web_handle.metrics.span("week_page_load", week=str(week_date)):
+                await tab_driver.wait_calendar_page_date(window_handle, week_date)
+                week_classes = await tab_driver.run(
+                    window_handle, get_calendar_week_classes, web_handle=web_handle
+                )
+            logger.debug(f"Registering for week: {week_date}...")
+            # Classes registered from a worker thread, the driver is only held by each booking
+            # and page reload of the week tab (retry delays leave it to the other tabs)
+            await asyncio.to_thread(
+                register_calendar_week,
+                register_function=week_register_function(
+                    week_classes,
+                    week_ind,
+                    lambda function: tab_driver.call_in_tab(window_handle, function),
+                ),
+                datetime_to_register_list=datetime_to_register_list,
+                registered_return_list=registered_return_list,
+                error_date_list=error_date_list,
+            )
+        except Exception as e:
+            logger.error(f"Registration of week {week_date} failed - Exception: {e}.")
+            error_date_list.extend(
+                (datetime_to_register, e)
+                for datetime_to_register in datetime_to_register_list
+            )
+        finally:
+            await tab_driver.close_tab(window_handle)
+
+
+async def register_weeks_in_tabs(
+    web_handle: WebHandle,
+    fliip_gym_name: str,
+    week_target_datetimes: dict[int, list[datetime]],
+    week_register_function: Callable[..., Callable[[datetime], bool | None]],
+    registered_return_list: list[datetime],
+    error_date_list: list[tuple[datetime, Exception]],
+    max_tabs: int = 4,
+) -> bool:
+    """
+    Register the target weeks concurrently, one tab per week page loaded with the date query parameter.
+
+    The first tab of a future week is checked alone first: if the page ignores the date query parameter,
+    nothing is registered and False is returned for the caller to navigate the weeks one by one.
+
+    :param web_handle: Logged in browser handle, back on its first tab at the end.
+    :param week_target_datetimes: Class datetimes to register by calendar week index (see plan_target_datetimes).
+    :param week_register_function: Return the register function of a week from its parsed classes, its
+        week index and its tab call (runs a function of WebDriver commands in the week tab).
+    :param max_tabs: Max tabs open at once (memory of the browser).
+    :return: True if the weeks were registered in tabs, False if the direct week navigation is not supported.
+    """
+    tab_driver = _AsyncTabDriver(web_handle=web_handle)
+    tab_semaphore = asyncio.Semaphore(max_tabs)
+    window_handles = {}
+    # Current week page shows without the date parameter, a future week tells if it is supported
+    probe_week_ind = min(
+        (week_ind for week_ind in week_target_datetimes if week_ind > 0), default=None
+    )
+    if probe_week_ind is not None:
+        probe_week_date = datetime.now().date() + timedelta(days=7 * probe_week_ind)
+        probe_window_handle = await tab_driver.open_tab(
+            get_calendar_week_url(fliip_gym_name, probe_week_date)
+        )
+        try:
+            await tab_driver.wait_calendar_page_date(
+                probe_window_handle, probe_week_date
+            )
+        except UnexpectedCalendarPageError as e:
+            await tab_driver.close_tab(probe_window_handle)
+            logger.warning(
+                f"Direct calendar week navigation not supported ({e}), registering the weeks one by one..."
+            )
+            return False
+        # Registered from its loaded tab, first in line for the semaphore (FIFO)
+        window_handles[probe_week_ind] = probe_window_handle
+    await asyncio.gather(
+        *(
+            _register_week_in_tab(
+                tab_driver=tab_driver,
+                tab_semaphore=tab_semaphore,
+                fliip_gym_name=fliip_gym_name,
+                week_ind=week_ind,
+                datetime_to_register_list=datetime_to_register_list,
+                week_register_function=week_register_function,
+                registered_return_list=registered_return_list,
+                error_date_list=error_date_list,
+                window_handle=window_handles.get(week_ind),
+            )
+            for week_ind, datetime_to_register_list in sorted(
+                week_target_datetimes.items(),
+                key=lambda week_item: week_item[0] not in window_handles,
+            )
+        )
+    )
+    return True
+
+
+## Registration State Store
+registration_state_db_path = (
+    Path(__file__).parent.joinpath("fliip_register_state.db").resolve()
+)  # Default registration state database path
+# Stored statuses for which the class is not registered again ("waitlisted" is checked again for a spot)
+registration_state_done_statuses = ("registered", "already_registered")
+
+
+# SQLite store of the registration outcomes keyed by (gym, user, class datetime)
+class RegistrationStateStore(object):
+    """Registration outcomes to skip already confirmed classes and keep history for reporting."""
+
+    def __init__(self, db_path: Path = registration_state_db_path):
+        """
+        :param db_path: Path to the SQLite database file (":memory:" for an in-memory store).
+        """
+        self._lock = threading.Lock()
+        # Shared by the account worker threads, accesses are serialized by the lock
+        self._connection = sqlite3.connect(str(db_path), check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS registration_state ("
+                "gym TEXT NOT NULL, "
+                "username TEXT NOT NULL, "
+                "class_datetime TEXT NOT NULL, "
+                "status TEXT NOT NULL, "
+                "updated TEXT NOT NULL, "
+                "last_error TEXT, "
+                "PRIMARY KEY (gym, username, class_datetime))"
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def record(
+        self,
+        fliip_gym_name: str,
+        fliip_username: str,
+        class_datetime: datetime,
+        status: str,
+        error: Exception | None = None,
+    ) -> None:
+        """
+        Record the registration outcome of a class.
+
+        :param status: "registered", "already_registered", "waitlisted", "canceled", "out_of_membership" or "error".
+        :param error: Exception of a failed registration, kept as the last error.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO registration_state VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (gym, username, class_datetime) DO UPDATE SET "
+                "status = excluded.status, updated = excluded.updated, "
+                "last_error = COALESCE(excluded.last_error, last_error)",
+                (
+                    fliip_gym_name,
+                    fliip_username,
+                    class_datetime.isoformat(),
+                    status,
+                    datetime.now().isoformat(),
+                    None if error is None else repr(error),
+                ),
+            )
+
+    def get(
+        self,
+        fliip_gym_name: str,
+        fliip_username: str,
+        class_datetime: datetime,
+    ) -> dict | None:
+        """Return the stored state of a class (status, updated, last_error), None if unknown."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT status, updated, last_error FROM registration_state "
+                "WHERE gym = ? AND username = ? AND class_datetime = ?",
+                (fliip_gym_name, fliip_username, class_datetime.isoformat()),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "status": row[0],
+            "updated": datetime.fromisoformat(row[1]),
+            "last_error": row[2],
+        }
+
+    def is_done(
+        self,
+        fliip_gym_name: str,
+        fliip_username: str,
+        class_datetime: datetime,
+        reverify_after_hours: float | None = None,
+    ) -> bool:
+        """
+        Return true if the class is known as registered and does not need to be checked again.
+
+        :param reverify_after_hours: Hours after which a registered class is verified again on the page, never if None.
+        """
+        state = self.get(fliip_gym_name, fliip_username, class_datetime)
+        if state is None or state["status"] not in registration_state_done_statuses:
+            return False
+        return (
+            reverify_after_hours is None
+            or datetime.now() - state["updated"] < timedelta(hours=reverify_after_hours)
+        )
+
+    def history(
+        self,
+        fliip_gym_name: str | None = None,
+        fliip_username: str | None = None,
+    ) -> list[dict]:
+        """Return the stored states, optionally of one gym and/or user, ordered by class datetime."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT gym, username, class_datetime, status, updated, last_error "
+                "FROM registration_state "
+                "WHERE (? IS NULL OR gym = ?) AND (? IS NULL OR username = ?) "
+                "ORDER BY class_datetime",
+                (fliip_gym_name, fliip_gym_name, fliip_username, fliip_username),
+            ).fetchall()
+        return [
+            {
+                "gym": row[0],
+                "username": row[1],
+                "class_datetime": datetime.fromisoformat(row[2]),
+                "status": row[3],
+                "updated": datetime.fromisoformat(row[4]),
+                "last_error": row[5],
+            }
+            for row in rows
+        ]
+
+
+# Wrap a register function to record its outcomes in the state store
+def _recorded_register_function(
+    register_function: Callable[[datetime], bool | None],
+    state_store: RegistrationStateStore,
+    fliip_gym_name: str,
+    fliip_username: str,
+) -> Callable[[datetime], bool | None]:
+    def recorded_register_function(datetime_to_register: datetime) -> bool | None:
+        try:
+            registered_return = register_function(datetime_to_register)
+        except ClassWaitlistedError:
+            state_store.record(
+                fliip_gym_name, fliip_username, datetime_to_register, "waitlisted"
+            )
+            raise
+        except Exception as e:
+            if isinstance(e, ClassCanceledError):
+                status = "canceled"
+            elif isinstance(e, OutOfMembershipError):
+                status = "out_of_membership"
+            else:
+                status = "error"
+            state_store.record(
+                fliip_gym_name, fliip_username, datetime_to_register, status, error=e
+            )
+            raise
+        if registered_return is not None:
+            state_store.record(
+                fliip_gym_name,
+                fliip_username,
+                datetime_to_register,
+                "registered" if registered_return else "already_registered",
+            )
+        return registered_return
+
+    return recorded_register_function
+
+
+# Pre-flight planner: classes to register now, grouped by calendar week page
+def get_due_class_datetimes(
+    fliip_gym_name: str,
+    fliip_username: str,
+    weekday_classes_to_register: dict[str, list[int]],
+    max_hours_in_future_to_register: int,
+    state_store: RegistrationStateStore | None = None,
+    reverify_after_hours: float | None = 24.0,
+    now: datetime | None = None,
+) -> dict[int, list[datetime]]:
+    """
+    Plan the target classes in the registering window (see plan_target_datetimes), without the ones already registered.
+
+    :param state_store: Registration state store of the known registrations, None to keep all the planned classes.
+    :param reverify_after_hours: See RegistrationStateStore.is_done.
+    :return: Dict of the sorted class datetimes keyed by calendar week index, empty if nothing is due.
+    """
+    week_target_datetimes = plan_target_datetimes(
+        weekday_classes_to_register=weekday_classes_to_register,
+        max_hours_in_future_to_register=max_hours_in_future_to_register,
+        now=now,
+    )
+    if state_store is not None:
+        # Skip the classes already known as registered
+        for week_ind in list(week_target_datetimes):
+            week_target_datetimes[week_ind] = [
+                datetime_to_register
+                for datetime_to_register in week_target_datetimes[week_ind]
+                if not state_store.is_done(
+                    fliip_gym_name,
+                    fliip_username,
+                    datetime_to_register,
+                    reverify_after_hours=reverify_after_hours,
+                )
+            ]
+            if len(week_target_datetimes[week_ind]) == 0:
+                del week_target_datetimes[week_ind]
+    return week_target_datetimes
+
+
+# Object to hold the registration configuration of one Fliip account
+@dataclass
+class FliipAccountConfig(object):
+    fliip_gym_name: str
+    fliip_username: str
+    fliip_password: str
+    max_hours_in_future_to_register: int
+    # Key is the weekday name, value is the list of class hours to register (12 for noon class)
+    weekday_classes_to_register: dict[str, list[int]]
+
+
+# Object to hold the registration results of one Fliip account
+@dataclass
+class RegistrationReport(object):
+    fliip_gym_name: str
+    fliip_username: str
+    registered_date_list: list[datetime] = field(default_factory=list)
+    error_date_list: list[tuple[datetime, Exception]] = field(default_factory=list)
+    run_error: Exception | None = None  # Error that stopped the account run
+    metrics: RunMetrics | None = None
+
+    @property
+    def has_errors(self) -> bool:
+        return len(self.error_date_list) > 0 or self.run_error is not None
+
+    def summary(self) -> str:
+        """Return a short text summary of the account registrations."""
+        summary_lines = [
+            f"{self.fliip_username} @ {self.fliip_gym_name}: {len(self.registered_date_list)} registered, {len(self.error_date_list)} failed."
+        ]
+        for error_date, error in self.error_date_list:
+            summary_lines.append(
+                f"    {error_date.strftime('%Y-%m-%d %H:%M')} failed: {error}"
+            )
+        if self.run_error is not None:
+            summary_lines.append(f"    Run failed: {self.run_error}")
+        return "\n".join(summary_lines)
+
+
+# Write the run metrics JSON trace and optional Prometheus textfile, never failing the run
+def _export_run_metrics(
+    metrics: RunMetrics,
+    metrics_dir_path: Path | None,
+    prometheus_textfile_dir_path: Path | None,
+) -> None:
+    try:
+        if metrics_dir_path is not None:
+            trace_file_path = metrics.write_json_trace(metrics_dir_path)
+            logger.debug(f"Run metrics trace written to {trace_file_path}.")
+            clean_old_metrics_traces(metrics_dir_path)
+        if prometheus_textfile_dir_path is not None:
+            labels_str = "_".join(
+                re.sub(r"\W", "_", str(value)) for value in metrics.labels.values()
+            )
+            metrics.write_prometheus_textfile(
+                prometheus_textfile_dir_path.joinpath(f"fliip_{labels_str}.prom")
+            )
+    except Exception as e:
+        logger.error(f"Failed to export run metrics: {e}")
+
+
+# Register all the configured classes of one account
+def register_account(
+    fliip_gym_name: str,
+    fliip_username: str,
+    fliip_password: str,
+    max_hours_in_future_to_register: int,
+    weekday_classes_to_register: dict[str, list[int]],
+    headless: bool = True,
+    web_timeout: float = 5.0,
+    http_backend: bool = False,
+    use_session_cache: bool = True,
+    web_handle: WebHandle | None = None,
+    direct_week_navigation: bool = True,
+    state_store: RegistrationStateStore | None = None,
+    reverify_after_hours: float | None = 24.0,
+    metrics_dir_path: Path | None = run_metrics_dir_path,
+    prometheus_textfile_dir_path: Path | None = None,
+    multi_tab: bool = False,
+    max_tabs: int = 4,
+    retry_policy: RetryPolicy | None = None,
+    record_fixtures_dir_path: Path | None = None,
+    timetable_cache: TimetableCache | None = None,
+    report: RegistrationReport | None = None,
+) -> RegistrationReport:
+    if report is None:
+        report = RegistrationReport(
+            fliip_gym_name=fliip_gym_name,
+            fliip_username=fliip_username,
+            metrics=RunMetrics(gym=fliip_gym_name, username=fliip_username),
+        )
+    metrics = report.metrics
+    # Lines logged by the run (its tabs and retries included) are tagged with the account
+    with log_context(account=f"{fliip_gym_name}/{fliip_username}"):
+        # Only the weeks with at least one class to register are visited
+        week_target_datetimes = get_due_class_datetimes(
+            fliip_gym_name=fliip_gym_name,
+            fliip_username=fliip_username,
+            weekday_classes_to_register=weekday_classes_to_register,
+            max_hours_in_future_to_register=max_hours_in_future_to_register,
+            state_store=state_store,
+            reverify_after_hours=reverify_after_hours,
+        )
+        if len(week_target_datetimes) == 0:
+            # Nothing due, no browser launch nor login
+            logger.info(f"No class of {fliip_username} to register now.")
+            return report
+
+        own_web_handle = None  # Browser launched (and closed) by this run
+        http_session = None
+        # Pages and exchanges of the run saved as an offline fixture bundle (own browser or HTTP session only)
+        session_recorder = (
+            SessionRecorder(
+                fliip_gym_name=fliip_gym_name,
+                backend="http" if http_backend else "selenium",
+                secrets=[fliip_username, fliip_password],
+            )
+            if record_fixtures_dir_path is not None
+            else None
+        )
+        try:
+            if http_backend:
+                # HTTP only backend, no browser
+                http_session = FliipHttpSession(
+                    fliip_gym_name=fliip_gym_name,
+                    web_timeout=web_timeout,
+                    metrics=metrics,
+                    session_recorder=session_recorder,
+                )
+                http_session.login(
+                    fliip_username=fliip_username,
+                    fliip_password=fliip_password,
+                    use_session_cache=use_session_cache,
+                )
+            elif web_handle is not None:
+                # Warm browser already logged in (e.g. from a WebHandlePool), back to the current week page
+                web_handle.metrics = metrics
+                web_handle.driver.get(
+                    f"{get_fliip_base_url(fliip_gym_name)}{fliip_calendar_path}"
+                )
+            else:
+                # Get the browser handle
+                web_handle = get_web_web_handle(
+                    headless=headless,
+                    web_timeout=web_timeout,
+                    metrics=metrics,
+                    session_recorder=session_recorder,
+                )
+                own_web_handle = web_handle
+
+                # Login to Fliip Gym Web Page
+                fliip_web_page_login(
+                    web_handle=web_handle,
+                    fliip_gym_name=fliip_gym_name,
+                    fliip_username=fliip_username,
+                    fliip_password=fliip_password,
+                    use_session_cache=use_session_cache,
+                )
+
+            # Registering Loop
+            logger.info("Starting Registering loop...")
+            registered_return_list = report.registered_date_list
+            error_date_list = report.error_date_list
+            retry_engine = RetryEngine(policy=retry_policy, metrics=metrics)
+
+            # Calendar page shows the current week at first loading
+            current_week_ind = 0
+
+            def load_week_classes(week_ind: int) -> dict[tuple[str, str], CalendarClass]:
+                week_classes = _load_week_classes(week_ind)
+                if timetable_cache is not None:
+                    # Every class seen, for the timetable queries (see query_timetable)
+                    timetable_cache.store_week(
+                        fliip_gym_name,
+                        fliip_username,
+                        datetime.now().date() + timedelta(days=7 * week_ind),
+                        week_classes,
+                    )
+                return week_classes
+
+            def _load_week_classes(week_ind: int) -> dict[tuple[str, str], CalendarClass]:
+                nonlocal current_week_ind, direct_week_navigation
+                # Date in week scrolling header is today plus the number of weeks
+                expected_date = datetime.now().date() + timedelta(days=7 * week_ind)
+                if http_backend:
+                    current_calendar_page_date, week_classes = http_session.get_calendar_week(
+                        week_date=expected_date
+                    )
+                    if current_calendar_page_date.date() != expected_date:
+                        raise UnexpectedCalendarPageError(
+                            f"Unexpected calendar page! (expected {expected_date}, got {current_calendar_page_date.date()})"
+                        )
+                    return week_classes
+                with metrics.span("week_page_load", week=str(expected_date)):
+                    direct_week_navigation = go_to_calendar_week(
+                        web_handle=web_handle,
+                        fliip_gym_name=fliip_gym_name,
+                        current_week_ind=current_week_ind,
+                        target_week_ind=week_ind,
+                        direct_week_navigation=direct_week_navigation,
+                    )
+                    current_week_ind = week_ind
+                    # Check current calendar week page date against expected date
+                    wait_calendar_page_date(
+                        web_handle=web_handle, expected_date=expected_date
+                    )
+                    # Parse the whole week page once, registering is then done from lookups
+                    return get_calendar_week_classes(web_handle=web_handle)
+
+            def reload_calendar_page() -> None:
+                # Back to a known page: the current week page
+                nonlocal current_week_ind
+                if not http_backend:
+                    web_handle.driver.get(
+                        f"{get_fliip_base_url(fliip_gym_name)}{fliip_calendar_path}"
+                    )
+                    current_week_ind = 0
+
+            def week_register_function(
+                week_classes: dict[tuple[str, str], CalendarClass],
+                week_ind: int | None = None,
+                tab_call: Callable[[Callable], object] | None = None,
+            ) -> Callable[[datetime], bool | None]:
+                # Week classes replaced by the ones of the reloaded page on page failures
+                week_state = {"week_classes": week_classes}
+
+                def reload_week_tab() -> dict[tuple[str, str], CalendarClass]:
+                    web_handle.driver.refresh()
+                    wait_calendar_page_date(
+                        web_handle=web_handle,
+                        expected_date=datetime.now().date() + timedelta(days=7 * week_ind),
+                    )
+                    return get_calendar_week_classes(web_handle=web_handle)
+
+                def reload_week() -> None:
+                    if tab_call is not None:
+                        # Week tab page reloaded in place
+                        week_state["week_classes"] = tab_call(reload_week_tab)
+                        return
+                    reload_calendar_page()
+                    week_state["week_classes"] = load_week_classes(week_ind)
+
+                def book_class(datetime_to_register: datetime) -> bool | None:
+                    if http_backend:
+                        return http_session.register_to_class(
+                            datetime_to_register=datetime_to_register,
+                            week_classes=week_state["week_classes"],
+                            max_hours_in_future_to_register=max_hours_in_future_to_register,
+                        )
+                    book = lambda: register_to_class(
+                        web_handle=web_handle,
+                        datetime_to_register=datetime_to_register,
+                        max_hours_in_future_to_register=max_hours_in_future_to_register,
+                        week_classes=week_state["week_classes"],
+                    )
+                    return tab_call(book) if tab_call is not None else book()
+
+                register_function = lambda datetime_to_register: retry_engine.call(
+                    lambda: book_class(datetime_to_register),
+                    description=f"Registration of {datetime_to_register.strftime('%Y-%m-%d %H:%M')}",
+                    reload_page=reload_week if week_ind is not None else None,
+                )
+                if state_store is not None:
+                    register_function = _recorded_register_function(
+                        register_function, state_store, fliip_gym_name, fliip_username
+                    )
+                return register_function
+
+            if multi_tab and direct_week_navigation and not http_backend:
+                # All the target weeks at once, one tab per week (page failures retried on the reloaded tab)
+                if asyncio.run(
+                    register_weeks_in_tabs(
+                        web_handle=web_handle,
+                        fliip_gym_name=fliip_gym_name,
+                        week_target_datetimes=week_target_datetimes,
+                        week_register_function=week_register_function,
+                        registered_return_list=registered_return_list,
+                        error_date_list=error_date_list,
+                        max_tabs=max_tabs,
+                    )
+                ):
+                    week_target_datetimes = {}  # Nothing left for the sequential loop
+                else:
+                    # Date query parameter ignored: weeks clicked through by the sequential loop
+                    direct_week_navigation = False
+            for week_ind, datetime_to_register_list in week_target_datetimes.items():
+                expected_date = datetime.now().date() + timedelta(days=7 * week_ind)
+                try:
+                    week_classes = retry_engine.call(
+                        lambda: load_week_classes(week_ind),
+                        description=f"Calendar week {expected_date} load",
+                        reload_page=reload_calendar_page,
+                    )
+                except Exception as e:
+                    # Only the classes of this week are lost, next weeks are still registered
+                    logger.error(f"Calendar week {expected_date} load failed - Exception: {e}.")
+                    error_date_list.extend(
+                        (datetime_to_register, e)
+                        for datetime_to_register in datetime_to_register_list
+                    )
+                    continue
+                logger.debug(f"Registering for week: {expected_date}...")
+                register_calendar_week(
+                    register_function=week_register_function(week_classes, week_ind),
+                    datetime_to_register_list=datetime_to_register_list,
+                    registered_return_list=registered_return_list,
+                    error_date_list=error_date_list,
+                )
+        finally:
+            if http_session is not None:
+                http_session.close()
+            if timetable_cache is not None:
+                # Cached pages of the weeks with a new booking no longer show its status
+                for registered_datetime in report.registered_date_list:
+                    timetable_cache.invalidate_week(
+                        fliip_gym_name, fliip_username, registered_datetime.date()
+                    )
+            if session_recorder is not None:
+                _save_session_recording(
+                    session_recorder=session_recorder,
+                    fixtures_dir_path=record_fixtures_dir_path,
+                    web_handle=own_web_handle,
+                )
+            if own_web_handle is not None:
+                own_web_handle.close()
+            _export_run_metrics(
+                metrics=metrics,
+                metrics_dir_path=metrics_dir_path,
+                prometheus_textfile_dir_path=prometheus_textfile_dir_path,
+            )
+
+    return report
+
+
+# Send the log file if there are errors (or forced) and the email infos are given
+def send_log_file_if_needed(
+    has_errors: bool,
+    force_send_log_email: bool,
+    recipient_email: str | None,
+    sender_email: str | None,
+    sender_password: str | None,
+    body: str | None = None,
+    log_start_offset: int = 0,
+    email_reporter: EmailReporter | None = None,
+    log_run_id: str | None = None,
+) -> None:
+    if (
+        (has_errors or force_send_log_email)
+        and recipient_email is not None
+        and sender_email is not None
+        and sender_password is not None
+    ):
+        if has_errors:
+            logger.info(
+                f"At least one date failed to register, sending log to {recipient_email} from {sender_email}..."
+            )
+        else:
+            logger.info(
+                f"Force sending log file to {recipient_email} from {sender_email}."
+            )
+        send_log_file_via_email(
+            log_file_path=logging_file_path,
+            recipient_email=recipient_email,
+            sender_email=sender_email,
+            sender_password=sender_password,
+            body=body,
+            log_start_offset=log_start_offset,
+            email_reporter=email_reporter,
+            log_run_id=log_run_id,
+        )
+
+
+def main(
+    fliip_gym_name: str,
+    fliip_username: str,
+    fliip_password: str,
+    max_hours_in_future_to_register: int,
+    weekday_classes_to_register: dict[str, list[int]],
+    recipient_email: str | None = None,
+    sender_email: str | None = None,
+    sender_password: str | None = None,
+    headless: bool = True,
+    web_timeout: float = 5.0,
+    force_send_log_email: bool = False,
+    http_backend: bool = False,
+    use_session_cache: bool = True,
+    direct_week_navigation: bool = True,
+    use_state_store: bool = True,
+    reverify_after_hours: float | None = 24.0,
+    email_reporter: EmailReporter | None = None,
+    metrics_dir_path: Path | None = run_metrics_dir_path,
+    prometheus_textfile_dir_path: Path | None = None,
+    multi_tab: bool = False,
+    record_fixtures_dir_path: Path | None = None,
+    use_timetable_cache: bool = True,
+) -> RegistrationReport:
+    # Only the log of this run is sent, its lines are tagged with its id
+    log_run_id = uuid.uuid4().hex[:12]
+    with log_context(run_id=log_run_id):
+        state_store = RegistrationStateStore() if use_state_store else None
+        timetable_cache = TimetableCache() if use_timetable_cache else None
+        try:
+            report = register_account(
+                fliip_gym_name=fliip_gym_name,
+                fliip_username=fliip_username,
+                fliip_password=fliip_password,
+                max_hours_in_future_to_register=max_hours_in_future_to_register,
+                weekday_classes_to_register=weekday_classes_to_register,
+                headless=headless,
+                web_timeout=web_timeout,
+                http_backend=http_backend,
+                use_session_cache=use_session_cache,
+                direct_week_navigation=direct_week_navigation,
+                state_store=state_store,
+                reverify_after_hours=reverify_after_hours,
+                metrics_dir_path=metrics_dir_path,
+                prometheus_textfile_dir_path=prometheus_textfile_dir_path,
+                multi_tab=multi_tab,
+                record_fixtures_dir_path=record_fixtures_dir_path,
+                timetable_cache=timetable_cache,
+            )
+        finally:
+            if state_store is not None:
+                state_store.close()
+            if timetable_cache is not None:
+                timetable_cache.close()
+
+        send_log_file_if_needed(
+            has_errors=report.has_errors,
+            force_send_log_email=force_send_log_email,
+            recipient_email=recipient_email,
+            sender_email=sender_email,
+            sender_password=sender_password,
+            email_reporter=email_reporter,
+            log_run_id=log_run_id,
+        )
+
+        return report
+
+
+# Register one account in a worker thread, errors are kept in its report
+# Other register_account options (metrics, tabs, recording, timetable cache...) are passed through
+def _register_account_worker(
+    account_config: FliipAccountConfig,
+    headless: bool,
+    web_timeout: float,
+    http_backend: bool,
+    use_session_cache: bool,
+    web_handle_pool: "WebHandlePool | None" = None,
+    state_store: RegistrationStateStore | None = None,
+    reverify_after_hours: float | None = 24.0,
+    **register_account_kwargs,
+) -> RegistrationReport:
+    threading.current_thread().name = (
+        f"{account_config.fliip_username}@{account_config.fliip_gym_name}"
+    )
+    web_handle = None
+    # Filled by the run, the classes registered before a failure are still reported
+    report = RegistrationReport(
+        fliip_gym_name=account_config.fliip_gym_name,
+        fliip_username=account_config.fliip_username,
+        metrics=RunMetrics(
+            gym=account_config.fliip_gym_name, username=account_config.fliip_username
+        ),
+    )
+    try:
+        if web_handle_pool is not None and not http_backend:
+            web_handle = web_handle_pool.acquire(account_config)
+        return register_account(
+            fliip_gym_name=account_config.fliip_gym_name,
+            fliip_username=account_config.fliip_username,
+            fliip_password=account_config.fliip_password,
+            max_hours_in_future_to_register=account_config.max_hours_in_future_to_register,
+            weekday_classes_to_register=account_config.weekday_classes_to_register,
+            headless=headless,
+            web_timeout=web_timeout,
+            http_backend=http_backend,
+            use_session_cache=use_session_cache,
+            web_handle=web_handle,
+            state_store=state_store,
+            reverify_after_hours=reverify_after_hours,
+            report=report,
+            **register_account_kwargs,
+        )
+    except Exception as e:
+        logger.error(
+            f"Failed to register {account_config.fliip_username} on {account_config.fliip_gym_name}: {e}."
+        )
+        report.run_error = e
+        return report
+    finally:
+        if web_handle is not None:
+            web_handle_pool.release(account_config, web_handle)
+
+
+def run_accounts(
+    account_config_list: list[FliipAccountConfig],
+    max_workers: int = 4,
+    recipient_email: str | None = None,
+    sender_email: str | None = None,
+    sender_password: str | None = None,
+    headless: bool = True,
+    web_timeout: float = 5.0,
+    force_send_log_email: bool = False,
+    http_backend: bool = False,
+    use_session_cache: bool = True,
+    web_handle_pool: "WebHandlePool | None" = None,
+    use_state_store: bool = True,
+    reverify_after_hours: float | None = 24.0,
+    email_reporter: EmailReporter | None = None,
+    direct_week_navigation: bool = True,
+    metrics_dir_path: Path | None = run_metrics_dir_path,
+    prometheus_textfile_dir_path: Path | None = None,
+    multi_tab: bool = False,
+    record_fixtures_dir_path: Path | None = None,
+    use_timetable_cache: bool = True,
+) -> list[RegistrationReport]:
+    """
+    Register several accounts concurrently and send one aggregated email report.
+
+    :param account_config_list: Registration configuration of each account.
+    :param max_workers: Max number of accounts (browsers) registering at the same time.
+    :param web_handle_pool: Optional pool of warm logged in browsers to use instead of launching new ones.
+    :param use_state_store: If True, skip the classes already registered in the registration state store.
+    :param reverify_after_hours: Hours after which a stored registered class is verified again.
+    :param email_reporter: Background email reporter to send the report with (e.g. shared by the daemon jobs).
+    :param direct_week_navigation: If True, go to the calendar week pages with their date parameter.
+    :param metrics_dir_path: Folder of the JSON run trace of each account, None to not write them.
+    :param prometheus_textfile_dir_path: Folder of the Prometheus textfile of each account, None to not write them.
+    :param multi_tab: If True, register the target weeks of each account in parallel tabs.
+    :param record_fixtures_dir_path: Folder of the fixture bundle recorded for each account, None to not record.
+    :param use_timetable_cache: If True, keep the loaded week pages in a timetable cache shared by the accounts.
+    :return: The registration report of each account, in the order of the configs.
+    """
+    # Only the log of this run is sent, its lines are tagged with its id
+    log_run_id = uuid.uuid4().hex[:12]
+    with log_context(run_id=log_run_id):
+        state_store = RegistrationStateStore() if use_state_store else None
+        timetable_cache = TimetableCache() if use_timetable_cache else None
+        logger.info(
+            f"Registering {len(account_config_list)} accounts with {max_workers} workers..."
+        )
+        try:
+            with ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="fliip_account"
+            ) as executor:
+                report_list = list(
+                    executor.map(
+                        # Worker threads log with the run id of the context copied here
+                        lambda account_config_context: account_config_context[1].run(
+                            _register_account_worker,
+                            account_config=account_config_context[0],
+                            headless=headless,
+                            web_timeout=web_timeout,
+                            http_backend=http_backend,
+                            use_session_cache=use_session_cache,
+                            web_handle_pool=web_handle_pool,
+                            state_store=state_store,
+                            reverify_after_hours=reverify_after_hours,
+                            direct_week_navigation=direct_week_navigation,
+                            metrics_dir_path=metrics_dir_path,
+                            prometheus_textfile_dir_path=prometheus_textfile_dir_path,
+                            multi_tab=multi_tab,
+                            record_fixtures_dir_path=record_fixtures_dir_path,
+                            timetable_cache=timetable_cache,
+                        ),
+                        [
+                            (account_config, contextvars.copy_context())
+                            for account_config in account_config_list
+                        ],
+                    )
+                )
+        finally:
+            if state_store is not None:
+                state_store.close()
+            if timetable_cache is not None:
+                timetable_cache.close()
+
+        reports_summary = "\n".join(report.summary() for report in report_list)
+        logger.info(f"Accounts registration summary:\n{reports_summary}")
+        send_log_file_if_needed(
+            has_errors=any(report.has_errors for report in report_list),
+            force_send_log_email=force_send_log_email,
+            recipient_email=recipient_email,
+            sender_email=sender_email,
+            sender_password=sender_password,
+            body=reports_summary,
+            email_reporter=email_reporter,
+            log_run_id=log_run_id,
+        )
+        return report_list
+
+
+def load_account_configs(account_configs_file_path: Path) -> list[FliipAccountConfig]:
+    """
+    Load the account configs from a JSON file.
+
+    The file holds a list of objects with the FliipAccountConfig fields. The password can be
+    given directly with "fliip_password" or with the name of an environment variable in "fliip_password_env".
+
+    :param account_configs_file_path: Path to the JSON file.
+    :return: List of account configs.
+    """
+    with open(account_configs_file_path, "r") as account_configs_file:
+        account_configs_json = json.load(account_configs_file)
+    account_config_list = []
+    for account_json in account_configs_json:
+        account_json = dict(account_json)
+        if "fliip_password_env" in account_json:
+            account_json["fliip_password"] = os.getenv(
+                account_json.pop("fliip_password_env")
+            )
+        if not account_json.get("fliip_password"):
+            raise ConnectionAbortedError(
+                f"Password Missing for {account_json.get('fliip_username')}!"
+            )
+        account_config = FliipAccountConfig(**account_json)
+        validate_account_config(account_config)
+        account_config_list.append(account_config)
+    return account_config_list
+
+
+## Daemon
+# Local address of the daemon accepting registration jobs
+daemon_address = ("localhost", 6001)
+
+
+daemon_authkey_file_path = (
+    Path(__file__).parent.joinpath("fliip_daemon.key").resolve()
+)  # Key generated on first use when FLIIP_DAEMON_AUTHKEY is not set
+daemon_commands = ("register", "stop")
+
+
+def _daemon_authkey() -> bytes:
+    """
+    Return the daemon authentication key: FLIIP_DAEMON_AUTHKEY, else the key of daemon_authkey_file_path.
+
+    The key file is created with a random key on first use, readable by its owner only.
+    """
+    authkey = os.getenv("FLIIP_DAEMON_AUTHKEY")
+    if authkey:
+        return authkey.encode()
+    try:
+        # Owner only permissions, the key is written once by whichever of the daemon or client comes first
+        file_descriptor = os.open(
+            daemon_authkey_file_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600
+        )
+    except FileExistsError:
+        if os.name == "posix" and daemon_authkey_file_path.stat().st_mode & 0o077:
+            raise PermissionError(
+                f"Daemon key file {daemon_authkey_file_path} is readable by other users, "
+                f"restrict it (chmod 600) or set FLIIP_DAEMON_AUTHKEY!"
+            )
+        authkey = daemon_authkey_file_path.read_bytes().strip()
+        if len(authkey) == 0:
+            raise PermissionError(
+                f"Daemon key file {daemon_authkey_file_path} is empty, delete it or set FLIIP_DAEMON_AUTHKEY!"
+            )
+        return authkey
+    authkey = os.urandom(32).hex().encode()
+    with os.fdopen(file_descriptor, "wb") as authkey_file:
+        authkey_file.write(authkey)
+    logger.info(f"Daemon key generated in {daemon_authkey_file_path}.")
+    return authkey
+
+
+def validate_account_config(account_config: FliipAccountConfig) -> None:
+    """
+    Check the fields of an account config.
+
+    :raise ValueError: Missing credentials, unknown weekday or invalid class hour or registering window.
+    """
+    for field_name in ("fliip_gym_name", "fliip_username", "fliip_password"):
+        if not isinstance(getattr(account_config, field_name), str) or not getattr(
+            account_config, field_name
+        ):
+            raise ValueError(
+                f"Account config of {account_config.fliip_username!r} has no {field_name}!"
+            )
+    if (
+        not isinstance(account_config.max_hours_in_future_to_register, int)
+        or account_config.max_hours_in_future_to_register <= 0
+    ):
+        raise ValueError(
+            f"Account config of {account_config.fliip_username} has an invalid "
+            f"max_hours_in_future_to_register: {account_config.max_hours_in_future_to_register!r}!"
+        )
+    if not isinstance(account_config.weekday_classes_to_register, dict):
+        raise ValueError(
+            f"Account config of {account_config.fliip_username} has no weekday_classes_to_register dict!"
+        )
+    for weekday_str, class_hours in account_config.weekday_classes_to_register.items():
+        if weekday_str not in calendar.day_name:
+            raise ValueError(
+                f"Account config of {account_config.fliip_username} has an unknown weekday: {weekday_str!r}!"
+            )
+        if not isinstance(class_hours, list) or not all(
+            isinstance(class_hour, int) and 0 <= class_hour <= 23
+            for class_hour in class_hours
+        ):
+            raise ValueError(
+                f"Account config of {account_config.fliip_username} has invalid {weekday_str} class hours: {class_hours!r}!"
+            )
+
+
+def _parse_daemon_job(job: object) -> tuple[str, list[str] | None]:
+    """
+    Return the command and usernames of a job received by the daemon.
+
+    :raise ValueError: Not a job dict, unknown command or usernames not a list of strings.
+    """
+    if not isinstance(job, dict):
+        raise ValueError(f"Daemon job is not a dict: {type(job).__name__}!")
+    command = job.get("command")
+    if command not in daemon_commands:
+        raise ValueError(f"Unknown daemon command: {command!r}!")
+    usernames = job.get("usernames")
+    if usernames is not None and (
+        not isinstance(usernames, list)
+        or not all(isinstance(username, str) for username in usernames)
+    ):
+        raise ValueError(f"Daemon job usernames is not a list of strings: {usernames!r}!")
+    return command, usernames
+
+
+# Object to hold a pooled WebHandle and its metadata
+@dataclass
+class _PooledWebHandle(object):
+    web_handle: WebHandle
+    launched_time: float
+    in_use: bool = False
+
+
+# Pool of pre-launched and pre-logged in WebHandles, one per account
+class WebHandlePool(object):
+    """Keep warm logged in browsers per (gym, username), recycling dead or stale ones."""
+
+    def __init__(
+        self,
+        headless: bool = True,
+        web_timeout: float = 5.0,
+        max_handle_age_s: float = 30 * 60,
+        use_session_cache: bool = True,
+        max_bookings_per_browser: int | None = 50,
+        max_browser_rss_mb: float | None = 1024.0,
+    ):
+        """
+        :param headless: If True, run the browsers in headless mode.
+        :param web_timeout: The timeout for the webdrivers.
+        :param max_handle_age_s: Age after which an idle browser is relaunched (session may be expired).
+        :param use_session_cache: If True, use the session cache on browser logins.
+        :param max_bookings_per_browser: Bookings after which an idle browser is relaunched, never if None.
+        :param max_browser_rss_mb: Resident memory of a browser process tree above which it is relaunched, never if None.
+        """
+        self.headless = headless
+        self.web_timeout = web_timeout
+        self.max_handle_age_s = max_handle_age_s
+        self.use_session_cache = use_session_cache
+        self.max_bookings_per_browser = max_bookings_per_browser
+        self.max_browser_rss_mb = max_browser_rss_mb
+        self._pooled_handles: dict[tuple[str, str], _PooledWebHandle] = {}
+        self._lock = threading.Lock()
+
+    def _launch(self, account_config: FliipAccountConfig) -> _PooledWebHandle:
+        web_handle = get_web_web_handle(
+            headless=self.headless, web_timeout=self.web_timeout
+        )
+        fliip_web_page_login(
+            web_handle=web_handle,
+            fliip_gym_name=account_config.fliip_gym_name,
+            fliip_username=account_config.fliip_username,
+            fliip_password=account_config.fliip_password,
+            use_session_cache=self.use_session_cache,
+        )
+        return _PooledWebHandle(web_handle=web_handle, launched_time=time.monotonic())
+
+    def _is_healthy(self, pooled_handle: _PooledWebHandle) -> bool:
+        if time.monotonic() - pooled_handle.launched_time > self.max_handle_age_s:
+            return False
+        try:
+            pooled_handle.web_handle.driver.current_url  # Fails if the browser died
+        except Exception:
+            return False
+        # Memory watchdog: long lived browsers grow with each booking
+        recycling_reason = pooled_handle.web_handle.needs_recycling(
+            max_bookings=self.max_bookings_per_browser,
+            max_rss_mb=self.max_browser_rss_mb,
+        )
+        if recycling_reason is not None:
+            logger.info(f"Browser to recycle: {recycling_reason}.")
+            return False
+        return True
+
+    def prelaunch(self, account_config: FliipAccountConfig) -> None:
+        """Launch and log in the browser of an account if not already in the pool."""
+        account_key = (account_config.fliip_gym_name, account_config.fliip_username)
+        with self._lock:
+            if account_key in self._pooled_handles:
+                return
+        pooled_handle = self._launch(account_config)
+        with self._lock:
+            kept_handle = self._pooled_handles.setdefault(account_key, pooled_handle)
+        if kept_handle is not pooled_handle:
+            pooled_handle.web_handle.close()  # Launched meanwhile by another thread
+
+    def acquire(self, account_config: FliipAccountConfig) -> WebHandle:
+        """Get the warm browser of an account, launching a new one if missing, busy or unhealthy."""
+        account_key = (account_config.fliip_gym_name, account_config.fliip_username)
+        with self._lock:
+            pooled_handle = self._pooled_handles.get(account_key)
+            if pooled_handle is not None and not pooled_handle.in_use:
+                pooled_handle.in_use = True  # Reserved while checked, out of the lock
+            else:
+                pooled_handle = None
+        if pooled_handle is not None:
+            # WebDriver round trip and process tree memory, other accounts are not blocked meanwhile
+            if self._is_healthy(pooled_handle):
+                return pooled_handle.web_handle
+            self._pop(account_key, pooled_handle)
+            pooled_handle.web_handle.close()
+        logger.info(f"No warm browser for {account_config.fliip_username}, launching...")
+        pooled_handle = self._launch(account_config)
+        pooled_handle.in_use = True
+        with self._lock:
+            self._pooled_handles.setdefault(account_key, pooled_handle)
+        return pooled_handle.web_handle
+
+    def release(self, account_config: FliipAccountConfig, web_handle: WebHandle) -> None:
+        """Give back a browser from acquire to the pool."""
+        account_key = (account_config.fliip_gym_name, account_config.fliip_username)
+        with self._lock:
+            pooled_handle = self._pooled_handles.get(account_key)
+            if pooled_handle is not None and pooled_handle.web_handle is web_handle:
+                pooled_handle.in_use = False
+                return
+        web_handle.close()  # Extra browser launched while the pooled one was busy
+
+    def _pop(self, account_key: tuple[str, str], pooled_handle: _PooledWebHandle) -> None:
+        # Remove a reserved handle from the pool, closed by the caller out of the lock
+        with self._lock:
+            if self._pooled_handles.get(account_key) is pooled_handle:
+                del self._pooled_handles[account_key]
+
+    def health_check(self, account_config_list: list[FliipAccountConfig]) -> None:
+        """Drop dead or stale idle browsers and relaunch the missing ones."""
+        with self._lock:
+            idle_pooled_handles = [
+                (account_key, pooled_handle)
+                for account_key, pooled_handle in self._pooled_handles.items()
+                if not pooled_handle.in_use
+            ]
+            for _, pooled_handle in idle_pooled_handles:
+                pooled_handle.in_use = True  # Reserved while checked, out of the lock
+        for account_key, pooled_handle in idle_pooled_handles:
+            if self._is_healthy(pooled_handle):
+                with self._lock:
+                    pooled_handle.in_use = False
+                continue
+            logger.info(f"Recycling browser of {account_key[1]}...")
+            self._pop(account_key, pooled_handle)
+            pooled_handle.web_handle.close()
+        for account_config in account_config_list:
+            try:
+                self.prelaunch(account_config)
+            except Exception as e:
+                logger.error(
+                    f"Failed to prelaunch browser of {account_config.fliip_username}: {e}."
                 )
+
+    def close(self) -> None:
+        with self._lock:
+            pooled_handle_list = list(self._pooled_handles.values())
+            self._pooled_handles.clear()
+        for pooled_handle in pooled_handle_list:
+            pooled_handle.web_handle.close()
+
+
+def run_daemon(
+    account_config_list: list[FliipAccountConfig],
+    headless: bool = True,
+    web_timeout: float = 5.0,
+    health_check_period_s: float = 60.0,
+    **run_accounts_kwargs,
+) -> None:
+    """
+    Keep warm browsers of the accounts and run registration jobs received on daemon_address.
+
+    :param account_config_list: Registration configuration of each account.
+    :param health_check_period_s: Period of the browsers health check and relaunch.
+    :param run_accounts_kwargs: Other run_accounts arguments (emails, max_workers...).
+    :raise ValueError: Invalid account config (see validate_account_config).
+    """
+    for account_config in account_config_list:
+        validate_account_config(account_config)
+    daemon_authkey = _daemon_authkey()  # Refuse to start without a usable key
+    web_handle_pool = WebHandlePool(headless=headless, web_timeout=web_timeout)
+    # One SMTP connection reused by the reports of all the jobs
+    email_reporter = None
+    if (
+        run_accounts_kwargs.get("sender_email") is not None
+        and run_accounts_kwargs.get("sender_password") is not None
+    ):
+        email_reporter = EmailReporter(
+            sender_email=run_accounts_kwargs["sender_email"],
+            sender_password=run_accounts_kwargs["sender_password"],
+        )
+    stop_event = threading.Event()
+
+    def health_check_loop():
+        while not stop_event.is_set():
+            web_handle_pool.health_check(account_config_list)
+            stop_event.wait(health_check_period_s)
+
+    threading.Thread(
+        target=health_check_loop, name="fliip_daemon_health", daemon=True
+    ).start()
+    logger.info(f"Fliip daemon listening on {daemon_address[0]}:{daemon_address[1]}...")
+    with Listener(daemon_address, authkey=daemon_authkey) as listener:
+        while not stop_event.is_set():
+            try:
+                connection = listener.accept()
+            except Exception as e:
+                # E.g. client with a wrong key or gone during the handshake
+                logger.warning(f"Daemon connection refused: {e!r}")
+                continue
+            with connection:
+                # A bad job or a failed run is answered and logged, the daemon keeps serving
                 try:
-                    registered_return = register_to_class(
-                        web_handle=web_handle,
-                        datetime_to_register=datetime_to_register,
-                        max_hours_in_future_to_register=max_hours_in_future_to_register,
+                    command, usernames = _parse_daemon_job(connection.recv())
+                    if command == "stop":
+                        stop_event.set()
+                        connection.send({"summary": "Daemon stopped."})
+                        continue
+                    # Only the requested usernames, all accounts by default
+                    unknown_usernames = set(usernames or []) - {
+                        account_config.fliip_username
+                        for account_config in account_config_list
+                    }
+                    if len(unknown_usernames) > 0:
+                        raise ValueError(
+                            f"Unknown daemon accounts: {', '.join(sorted(unknown_usernames))}!"
+                        )
+                    job_account_config_list = [
+                        account_config
+                        for account_config in account_config_list
+                        if usernames is None or account_config.fliip_username in usernames
+                    ]
+                    report_list = run_accounts(
+                        account_config_list=job_account_config_list,
+                        headless=headless,
+                        web_timeout=web_timeout,
+                        web_handle_pool=web_handle_pool,
+                        email_reporter=email_reporter,
+                        **run_accounts_kwargs,
+                    )
+                    connection.send(
+                        {
+                            "summary": "\n".join(
+                                report.summary() for report in report_list
+                            ),
+                            "has_errors": any(
+                                report.has_errors for report in report_list
+                            ),
+                        }
                     )
                 except Exception as e:
-                    error_date_list.append(
-                        (
-                            datetime_to_register,
-                            e,
+                    logger.error(f"Daemon job failed: {e!r}")
+                    try:
+                        connection.send(
+                            {"summary": f"Daemon job failed: {e}", "has_errors": True}
                         )
+                    except Exception:
+                        pass  # Client gone
+    web_handle_pool.close()
+    if email_reporter is not None:
+        email_reporter.close()
+
+
+def submit_daemon_job(
+    usernames: list[str] | None = None,
+    command: str = "register",
+) -> dict:
+    """
+    Send a job to the running daemon and wait for its result.
+
+    :param usernames: Usernames to register, all the daemon accounts if None.
+    :param command: "register" or "stop".
+    :return: Dict with the "summary" of the job.
+    """
+    with Client(daemon_address, authkey=_daemon_authkey()) as connection:
+        connection.send({"command": command, "usernames": usernames})
+        return connection.recv()
+
+
+## Release Time Scheduler
+# Object to hold the outcome of a booking fired at a class registration opening
+@dataclass
+class ReleaseBookingResult(object):
+    class_datetime: datetime
+    release_datetime: datetime  # Instant the class registration opens
+    submit_latency_s: float | None = None  # First booking request relative to the release
+    done_latency_s: float | None = None  # Booking end relative to the release
+    registered: bool | None = None
+    error: Exception | None = None
+
+
+def get_class_release_datetimes(
+    weekday_classes_to_register: dict[str, list[int]],
+    max_hours_in_future_to_register: int,
+    horizon_hours: float = 24,
+    now: datetime | None = None,
+) -> list[tuple[datetime, datetime]]:
+    """
+    Get the registration opening instants of the configured classes.
+
+    A class opens max_hours_in_future_to_register hours before it starts.
+
+    :param weekday_classes_to_register: Weekday classes to register (see main).
+    :param max_hours_in_future_to_register: Hours before a class its registration opens.
+    :param horizon_hours: Only the openings in the next horizon_hours are returned.
+    :param now: Current datetime, datetime.now() if None.
+    :return: Sorted list of (release datetime, class datetime).
+    """
+    if now is None:
+        now = datetime.now()
+    release_list = []
+    last_release = now + timedelta(hours=horizon_hours)
+    for weekday_str, classes_hour_list in weekday_classes_to_register.items():
+        weekday_number = time.strptime(weekday_str, "%A").tm_wday
+        for class_hour in classes_hour_list:
+            class_datetime = (now + timedelta(days=weekday_number - now.weekday())).replace(
+                hour=class_hour, minute=0, second=0, microsecond=0
+            )
+            release_datetime = class_datetime - timedelta(
+                hours=max_hours_in_future_to_register
+            )
+            while release_datetime <= last_release:
+                if release_datetime > now:
+                    release_list.append((release_datetime, class_datetime))
+                class_datetime += timedelta(days=7)
+                release_datetime += timedelta(days=7)
+    return sorted(release_list)
+
+
+# Sleep until a datetime with sub-second precision, busy-waiting the last busy_wait_s seconds
+def wait_until(target_datetime: datetime, busy_wait_s: float = 0.05) -> None:
+    remaining_s = (target_datetime - datetime.now()).total_seconds()
+    if remaining_s > busy_wait_s:
+        time.sleep(remaining_s - busy_wait_s)
+    while datetime.now() < target_datetime:
+        pass
+
+
+# Start time of the first booking request span (booking script, register click or HTTP request)
+def _booking_submit_time(metrics: RunMetrics, after_time: float) -> float | None:
+    submit_span_names = ("booking_script", "booking_modal", "booking_request")
+    return min(
+        (
+            span["start"]
+            for span in metrics.to_dict()["spans"]
+            if span["name"] in submit_span_names and span["start"] >= after_time
+        ),
+        default=None,
+    )
+
+
+def register_at_release(
+    account_config: FliipAccountConfig,
+    release_datetime: datetime,
+    class_datetime: datetime,
+    prelaunch_lead_s: float = 60.0,
+    headless: bool = True,
+    web_timeout: float = 5.0,
+    http_backend: bool = False,
+    use_session_cache: bool = True,
+) -> ReleaseBookingResult:
+    """
+    Launch and log in shortly before a class registration opens and book it at the opening instant.
+
+    The class week page is loaded before the release, only its refresh and the booking are left
+    after the opening instant.
+
+    :param account_config: Account registering the class.
+    :param release_datetime: Instant the class registration opens.
+    :param class_datetime: Class datetime.
+    :param prelaunch_lead_s: Seconds before the release to launch the browser and log in.
+    :return: The booking result with its latency relative to the release.
+    """
+    result = ReleaseBookingResult(
+        class_datetime=class_datetime, release_datetime=release_datetime
+    )
+    wait_until(release_datetime - timedelta(seconds=prelaunch_lead_s))
+    logger.info(
+        f"Preparing {class_datetime.strftime('%Y-%m-%d %H:%M')} class booking opening at {release_datetime}..."
+    )
+    # Calendar week page of the class, weeks are counted from the current week page
+    weeks_ahead = get_calendar_week_index(class_datetime)
+    week_date = datetime.now().date() + timedelta(days=7 * weeks_ahead)
+    metrics = RunMetrics(gym=account_config.fliip_gym_name)  # Times the booking requests
+    web_handle = None
+    http_session = None
+    try:
+        if http_backend:
+            http_session = FliipHttpSession(
+                fliip_gym_name=account_config.fliip_gym_name,
+                web_timeout=web_timeout,
+                metrics=metrics,
+            )
+            http_session.login(
+                fliip_username=account_config.fliip_username,
+                fliip_password=account_config.fliip_password,
+                use_session_cache=use_session_cache,
+            )
+        else:
+            web_handle = get_web_web_handle(
+                headless=headless, web_timeout=web_timeout, metrics=metrics
+            )
+            fliip_web_page_login(
+                web_handle=web_handle,
+                fliip_gym_name=account_config.fliip_gym_name,
+                fliip_username=account_config.fliip_username,
+                fliip_password=account_config.fliip_password,
+                use_session_cache=use_session_cache,
+            )
+            # Class week page loaded ahead, directly with its date parameter if supported
+            direct_week_navigation = go_to_calendar_week(
+                web_handle=web_handle,
+                fliip_gym_name=account_config.fliip_gym_name,
+                current_week_ind=0,
+                target_week_ind=weeks_ahead,
+            )
+            wait_calendar_page_date(web_handle=web_handle, expected_date=week_date)
+
+        wait_until(release_datetime)
+        if http_backend:
+            _, week_classes = http_session.get_calendar_week(week_date=week_date)
+            result.registered = http_session.register_to_class(
+                datetime_to_register=class_datetime,
+                week_classes=week_classes,
+                max_hours_in_future_to_register=account_config.max_hours_in_future_to_register,
+            )
+        else:
+            # Fresh week page, the class was not open on the page loaded before the release
+            web_handle.driver.refresh()
+            if not direct_week_navigation:
+                # Weeks clicked through, the refreshed page is the current week one
+                wait_calendar_page_date(
+                    web_handle=web_handle, expected_date=datetime.now().date()
+                )
+                for _ in range(weeks_ahead):
+                    click_next_week(web_handle=web_handle)
+            wait_calendar_page_date(web_handle=web_handle, expected_date=week_date)
+            result.registered = register_to_class(
+                web_handle=web_handle,
+                datetime_to_register=class_datetime,
+                max_hours_in_future_to_register=account_config.max_hours_in_future_to_register,
+                week_classes=get_calendar_week_classes(web_handle=web_handle),
+            )
+    except Exception as e:
+        result.error = e
+    finally:
+        result.done_latency_s = (datetime.now() - release_datetime).total_seconds()
+        submit_time = _booking_submit_time(
+            metrics, after_time=release_datetime.timestamp()
+        )
+        if submit_time is not None:
+            result.submit_latency_s = submit_time - release_datetime.timestamp()
+        if http_session is not None:
+            http_session.close()
+        if web_handle is not None:
+            web_handle.close()
+    logger.info(
+        f"Release booking of {class_datetime.strftime('%Y-%m-%d %H:%M')} class: "
+        f"registered={result.registered}, error={result.error}, "
+        f"submit latency {result.submit_latency_s}s, done latency {result.done_latency_s:.3f}s."
+    )
+    return result
+
+
+def run_release_scheduler(
+    account_config: FliipAccountConfig,
+    horizon_hours: float = 24,
+    **register_at_release_kwargs,
+) -> list[ReleaseBookingResult]:
+    """
+    Book each configured class of an account at the instant its registration opens.
+
+    :param account_config: Account registering the classes.
+    :param horizon_hours: Only the openings in the next horizon_hours are booked.
+    :param register_at_release_kwargs: Other register_at_release arguments.
+    :return: The booking result of each class.
+    """
+    release_list = get_class_release_datetimes(
+        weekday_classes_to_register=account_config.weekday_classes_to_register,
+        max_hours_in_future_to_register=account_config.max_hours_in_future_to_register,
+        horizon_hours=horizon_hours,
+    )
+    logger.info(f"{len(release_list)} class registration openings scheduled.")
+    return [
+        register_at_release(
+            account_config=account_config,
+            release_datetime=release_datetime,
+            class_datetime=class_datetime,
+            **register_at_release_kwargs,
+        )
+        for release_datetime, class_datetime in release_list
+    ]
+
+
+## Waitlist Watcher
+# Script fetching a calendar week page from the logged in page (cookies of the browser), no page reload
+_fetch_page_script = """
+var done = arguments[arguments.length - 1];
+fetch(arguments[0], {credentials: "same-origin"})
+    .then(function(response) { return response.text(); })
+    .then(function(text) { done(text); }, function(error) { done(null); });
+"""
+
+
+# Object to hold a watched FULL (or waiting list) class
+@dataclass
+class WatchedClass(object):
+    class_datetime: datetime
+    cell_hash: str | None = None  # Hash of the class cell at the last poll
+    status_text: str | None = None
+    status: str | None = None  # Normalized status at the last poll (see CalendarClass.status)
+    unchanged_polls: int = 0  # Polls in a row without a change of the class cell
+
+
+def get_calendar_class_hash(calendar_class: CalendarClass | None) -> str:
+    """Hash of the class cell content (status, spots and register icon) for change detection."""
+    if calendar_class is None:
+        return ""
+    return hashlib.sha1(
+        f"{calendar_class.status_text}|{calendar_class.register_onclick}".encode()
+    ).hexdigest()
+
+
+def get_watch_poll_period_s(
+    seconds_to_class: float,
+    unchanged_polls: int,
+    min_poll_period_s: float = 15.0,
+    max_poll_period_s: float = 600.0,
+    backoff_factor: float = 1.5,
+) -> float:
+    """
+    Poll period of a watched class: backs off while the class does not change, shorter as the class gets closer.
+
+    :param seconds_to_class: Seconds before the class starts.
+    :param unchanged_polls: Polls in a row without a change of the class.
+    :return: Seconds until the next poll of the class.
+    """
+    backoff_period_s = min_poll_period_s * backoff_factor**unchanged_polls
+    # At least 20 polls left before the class, whatever the backoff
+    class_period_s = max(min_poll_period_s, seconds_to_class / 20)
+    return min(backoff_period_s, class_period_s, max_poll_period_s)
+
+
+def watch_full_classes(
+    account_config: FliipAccountConfig,
+    class_datetime_list: list[datetime] | None = None,
+    http_backend: bool = False,
+    headless: bool = True,
+    web_timeout: float = 5.0,
+    use_session_cache: bool = True,
+    state_store: RegistrationStateStore | None = None,
+    min_poll_period_s: float = 15.0,
+    max_poll_period_s: float = 600.0,
+    backoff_factor: float = 1.5,
+    stop_event: threading.Event | None = None,
+    max_browser_rss_mb: float | None = 1024.0,
+    timetable_cache: TimetableCache | None = None,
+) -> RegistrationReport:
+    """
+    Watch FULL (or waiting list) classes and book them as soon as a spot frees up.
+
+    Each poll fetches the week page of the classes due (HTTP request, or fetch from the logged in browser page)
+    and compares the hash of the class cells. A spot is freed up when:
+    - a FULL class (account not on its waiting list) shows X/Y spots with a register icon: it is booked,
+    - a waiting list class shows X/Y spots with a register icon: it is booked the same way,
+    - a waiting list class turns Confirmed: the gym moved the account from its waiting list into the class,
+      it is reported as registered (nothing to book).
+    A class is no longer watched once confirmed, canceled or started.
+
+    :param account_config: Account registering the classes.
+    :param class_datetime_list: Classes to watch, the account configured classes (see plan_target_datetimes)
+        that are FULL (or on the waiting list) at the first poll if None.
+    :param state_store: Registration state store recording the bookings, None to not record them.
+    :param stop_event: Event stopping the watcher when set, runs until no class is left if None.
+    :param max_browser_rss_mb: Resident memory of the browser process tree above which it is relaunched, never if None.
+    :param timetable_cache: Timetable cache refreshed with the polled week pages, None to not cache them.
+    :return: The registration report of the booked classes.
+    """
+    # Configured classes not FULL at the first poll are left to the registering runs
+    watch_full_only = class_datetime_list is None
+    if class_datetime_list is None:
+        class_datetime_list = [
+            class_datetime
+            for week_datetimes in plan_target_datetimes(
+                weekday_classes_to_register=account_config.weekday_classes_to_register,
+                max_hours_in_future_to_register=account_config.max_hours_in_future_to_register,
+            ).values()
+            for class_datetime in week_datetimes
+        ]
+    if stop_event is None:
+        stop_event = threading.Event()
+    report = RegistrationReport(
+        fliip_gym_name=account_config.fliip_gym_name,
+        fliip_username=account_config.fliip_username,
+        metrics=RunMetrics(
+            gym=account_config.fliip_gym_name, username=account_config.fliip_username
+        ),
+    )
+    watched_class_list = [
+        WatchedClass(class_datetime=class_datetime)
+        for class_datetime in class_datetime_list
+    ]
+    # Next poll of each calendar week (monotonic time) keyed by its Monday, all the weeks are polled at start
+    # Absolute dates, a watch running over a Monday still polls the weeks of its classes
+    week_next_poll_time = {
+        get_week_monday(watched_class.class_datetime.date()): 0.0
+        for watched_class in watched_class_list
+    }
+    login_kwargs = dict(
+        fliip_username=account_config.fliip_username,
+        fliip_password=account_config.fliip_password,
+        use_session_cache=use_session_cache,
+    )
+    http_session = None
+    web_handle = None
+
+    def launch_browser() -> WebHandle:
+        launched_web_handle = get_web_web_handle(
+            headless=headless, web_timeout=web_timeout, metrics=report.metrics
+        )
+        try:
+            fliip_web_page_login(
+                web_handle=launched_web_handle,
+                fliip_gym_name=account_config.fliip_gym_name,
+                **login_kwargs,
+            )
+        except BaseException:
+            launched_web_handle.close()
+            raise
+        return launched_web_handle
+
+    def fetch_week_classes(week_date: date) -> dict[tuple[str, str], CalendarClass]:
+        week_classes = _fetch_week_classes(week_date)
+        if timetable_cache is not None:
+            timetable_cache.store_week(
+                account_config.fliip_gym_name,
+                account_config.fliip_username,
+                week_date,
+                week_classes,
+            )
+        return week_classes
+
+    def _fetch_week_classes(week_date: date) -> dict[tuple[str, str], CalendarClass]:
+        if http_backend:
+            try:
+                return http_session.get_calendar_week(week_date=week_date)[1]
+            except RuntimeError:
+                # Session expired, log in again
+                http_session.login(**login_kwargs)
+                return http_session.get_calendar_week(week_date=week_date)[1]
+        week_url = get_calendar_week_url(account_config.fliip_gym_name, week_date)
+        with report.metrics.span("week_page_fetch", week=str(week_date)):
+            week_page = web_handle.driver.execute_async_script(
+                _fetch_page_script, week_url
+            )
+        if week_page is None or parse_calendar_page_date(week_page) is None:
+            # Session expired, log in again
+            fliip_web_page_login(
+                web_handle=web_handle,
+                fliip_gym_name=account_config.fliip_gym_name,
+                **login_kwargs,
+            )
+            week_page = web_handle.driver.execute_async_script(
+                _fetch_page_script, week_url
+            )
+        return parse_calendar_week_page(week_page)
+
+    def book_class(
+        class_datetime: datetime, week_classes: dict[tuple[str, str], CalendarClass]
+    ) -> bool | None:
+        if http_backend:
+            return http_session.register_to_class(
+                datetime_to_register=class_datetime,
+                week_classes=week_classes,
+                max_hours_in_future_to_register=account_config.max_hours_in_future_to_register,
+            )
+        # Booking from the week page itself, always reloaded (not the current week index) as its classes changed
+        week_ind = get_calendar_week_index(class_datetime)
+        go_to_calendar_week(
+            web_handle=web_handle,
+            fliip_gym_name=account_config.fliip_gym_name,
+            current_week_ind=-1,
+            target_week_ind=week_ind,
+        )
+        week_date = datetime.now().date() + timedelta(days=7 * week_ind)
+        wait_calendar_page_date(web_handle=web_handle, expected_date=week_date)
+        return register_to_class(
+            web_handle=web_handle,
+            datetime_to_register=class_datetime,
+            max_hours_in_future_to_register=account_config.max_hours_in_future_to_register,
+            week_classes=get_calendar_week_classes(web_handle=web_handle),
+        )
+
+    def book_watched_class(
+        class_datetime: datetime, week_classes: dict[tuple[str, str], CalendarClass]
+    ) -> bool | None:
+        register_function = lambda class_datetime: book_class(
+            class_datetime, week_classes
+        )
+        if state_store is not None:
+            register_function = _recorded_register_function(
+                register_function,
+                state_store,
+                account_config.fliip_gym_name,
+                account_config.fliip_username,
+            )
+        return register_function(class_datetime)
+
+    logger.info(f"Watching {len(watched_class_list)} classes for a free spot...")
+    try:
+        if http_backend:
+            http_session = FliipHttpSession(
+                fliip_gym_name=account_config.fliip_gym_name,
+                web_timeout=web_timeout,
+                metrics=report.metrics,
+            )
+            http_session.login(**login_kwargs)
+        else:
+            web_handle = launch_browser()
+        while len(watched_class_list) > 0 and not stop_event.is_set():
+            if web_handle is not None:
+                # Memory watchdog: the browser grows over hours of week page fetches
+                recycling_reason = web_handle.needs_recycling(
+                    max_rss_mb=max_browser_rss_mb
+                )
+                if recycling_reason is not None:
+                    logger.info(f"Relaunching the watcher browser: {recycling_reason}.")
+                    web_handle.close()
+                    web_handle = launch_browser()
+            now_time = time.monotonic()
+            for week_monday in sorted(week_next_poll_time):
+                if week_next_poll_time[week_monday] > now_time:
+                    continue
+                # Page of the current week shown from today, as the registering loop
+                week_date = max(week_monday, datetime.now().date())
+                report.metrics.count("watch_polls")
+                try:
+                    week_classes = fetch_week_classes(week_date)
+                except Exception as e:
+                    logger.warning(f"Watch poll of week {week_date} failed: {e}.")
+                    week_next_poll_time[week_monday] = now_time + min_poll_period_s
+                    continue
+                week_poll_period_s = max_poll_period_s
+                for watched_class in list(watched_class_list):
+                    if get_week_monday(watched_class.class_datetime.date()) != week_monday:
+                        continue
+                    calendar_class = week_classes.get(
+                        calendar_class_key(watched_class.class_datetime)
                     )
-                    logger.error(
-                        f"Registration failed for {datetime_to_register.strftime(f'%Y-%m-%d %H:%M')} - Exception: {e}."
+                    cell_hash = get_calendar_class_hash(calendar_class)
+                    if cell_hash == watched_class.cell_hash:
+                        watched_class.unchanged_polls += 1
+                    else:
+                        if watched_class.cell_hash is not None:
+                            report.metrics.count("watch_changes")
+                            logger.info(
+                                f"Class {watched_class.class_datetime.strftime('%Y-%m-%d %H:%M')} changed: "
+                                f"{watched_class.status_text} -> {calendar_class.status_text if calendar_class is not None else None}."
+                            )
+                        watched_class.cell_hash = cell_hash
+                        watched_class.unchanged_polls = 0
+                    watched_class.status_text = (
+                        calendar_class.status_text if calendar_class is not None else None
                     )
-                    continue
-                if registered_return is not None:
-                    logger.info(
-                        f"Registration done for {datetime_to_register.strftime(f'%Y-%m-%d %H:%M')} noon class - {'New Registration' if registered_return else 'Already Registered'}."
+                    class_status = (
+                        calendar_class.status if calendar_class is not None else None
+                    )
+                    previous_class_status = watched_class.status
+                    watched_class.status = class_status
+                    if (
+                        watch_full_only
+                        and previous_class_status is None
+                        and class_status not in ("full", "waiting")
+                    ):
+                        logger.info(
+                            f"Not watching {watched_class.class_datetime.strftime('%Y-%m-%d %H:%M')} class ({class_status}), it is not FULL."
+                        )
+                        watched_class_list.remove(watched_class)
+                        continue
+                    if previous_class_status == "waiting" and class_status == "confirmed":
+                        # Spot freed up for the waiting list: the gym moved the account into the class
+                        logger.info(
+                            f"Registration done for {watched_class.class_datetime.strftime('%Y-%m-%d %H:%M')} class from the waiting list."
+                        )
+                        report.registered_date_list.append(watched_class.class_datetime)
+                        if state_store is not None:
+                            state_store.record(
+                                account_config.fliip_gym_name,
+                                account_config.fliip_username,
+                                watched_class.class_datetime,
+                                "registered",
+                            )
+                        if timetable_cache is not None:
+                            timetable_cache.invalidate_week(
+                                account_config.fliip_gym_name,
+                                account_config.fliip_username,
+                                watched_class.class_datetime.date(),
+                            )
+                        watched_class_list.remove(watched_class)
+                        continue
+                    if class_status == "open" and calendar_class.register_onclick is not None:
+                        # Spot freed up, book it right away
+                        try:
+                            registered_return = book_watched_class(
+                                watched_class.class_datetime, week_classes
+                            )
+                        except ClassWaitlistedError:
+                            # Spot taken meanwhile: keep watching until the gym moves the account into the class
+                            logger.info(
+                                f"Class {watched_class.class_datetime.strftime('%Y-%m-%d %H:%M')} booked on its waiting list, still watching."
+                            )
+                            watched_class.status = "waiting"
+                            continue
+                        except Exception as e:
+                            report.error_date_list.append((watched_class.class_datetime, e))
+                            logger.error(
+                                f"Registration failed for {watched_class.class_datetime.strftime('%Y-%m-%d %H:%M')} - Exception: {e}."
+                            )
+                            watched_class_list.remove(watched_class)
+                            continue
+                        if registered_return is not None:
+                            logger.info(
+                                f"Registration done for {watched_class.class_datetime.strftime('%Y-%m-%d %H:%M')} freed up class."
+                            )
+                            report.registered_date_list.append(watched_class.class_datetime)
+                            if timetable_cache is not None:
+                                timetable_cache.invalidate_week(
+                                    account_config.fliip_gym_name,
+                                    account_config.fliip_username,
+                                    watched_class.class_datetime.date(),
+                                )
+                            watched_class_list.remove(watched_class)
+                            continue
+                    if (
+                        class_status in ("confirmed", "canceled", None)
+                        or watched_class.class_datetime <= datetime.now()
+                    ):
+                        logger.info(
+                            f"Stop watching {watched_class.class_datetime.strftime('%Y-%m-%d %H:%M')} class ({class_status})."
+                        )
+                        watched_class_list.remove(watched_class)
+                        continue
+                    week_poll_period_s = min(
+                        week_poll_period_s,
+                        get_watch_poll_period_s(
+                            seconds_to_class=(
+                                watched_class.class_datetime - datetime.now()
+                            ).total_seconds(),
+                            unchanged_polls=watched_class.unchanged_polls,
+                            min_poll_period_s=min_poll_period_s,
+                            max_poll_period_s=max_poll_period_s,
+                            backoff_factor=backoff_factor,
+                        ),
                     )
-                    registered_return_list.append(datetime_to_register)
+                week_next_poll_time[week_monday] = time.monotonic() + week_poll_period_s
+                if not any(
+                    get_week_monday(watched_class.class_datetime.date()) == week_monday
+                    for watched_class in watched_class_list
+                ):
+                    del week_next_poll_time[week_monday]  # No class left to watch in the week
+            if len(watched_class_list) > 0 and len(week_next_poll_time) > 0:
+                stop_event.wait(max(0.0, min(week_next_poll_time.values()) - time.monotonic()))
 
-        # Change the calendar week page to next week
-        # Find and click the next week button
-        next_week_button = web_handle.wait.until(
-            EC.element_to_be_clickable((By.ID, "next_week"))
-        )
-        next_week_button.click()
-        try:
-            # Wait for button staleness (page refresh)
-            web_handle.wait.until(EC.staleness_of(next_week_button))
-        except:
-            pass
-        # Add a week for the next expected date
-        expected_date = expected_date + timedelta(days=7)
+    finally:
+        if http_session is not None:
+            http_session.close()
+        if web_handle is not None:
+            web_handle.close()
+    return report
 
-    if (
-        (len(error_date_list) > 0 or force_send_log_email)
-        and recipient_email is not None
-        and sender_email is not None
-        and sender_password is not None
+
+## Timetable Cache
+timetable_cache_db_path = (
+    Path(__file__).parent.joinpath("fliip_timetable.db").resolve()
+)  # Default timetable cache database path
+timetable_cache_ttl_hours = 6.0  # Age after which a cached week page is fetched again
+
+
+def get_week_monday(week_date: date) -> date:
+    """Return the Monday of the calendar week page of a date."""
+    return week_date - timedelta(days=week_date.weekday())
+
+
+# SQLite cache of the classes seen on the calendar week pages, keyed by (gym, user, class date and time)
+class TimetableCache(object):
+    """Classes of the scraped calendar week pages, to answer timetable queries without loading the pages again."""
+
+    def __init__(
+        self,
+        db_path: Path = timetable_cache_db_path,
+        ttl_hours: float = timetable_cache_ttl_hours,
     ):
-        if len(error_date_list) > 0:
-            logger.info(
-                f"At least one date failed to register, sending log to {recipient_email} from {sender_email}..."
+        """
+        :param db_path: Path to the SQLite database file (":memory:" for an in-memory cache).
+        :param ttl_hours: Age in hours after which a cached week is stale.
+        """
+        self.ttl_hours = ttl_hours
+        self._lock = threading.Lock()
+        # Shared by the account worker threads, accesses are serialized by the lock
+        self._connection = sqlite3.connect(str(db_path), check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS timetable_week ("
+                "gym TEXT NOT NULL, "
+                "username TEXT NOT NULL, "
+                "week_monday TEXT NOT NULL, "
+                "fetched TEXT NOT NULL, "
+                "PRIMARY KEY (gym, username, week_monday))"
             )
-        else:
+            # Status is the one shown to the user (e.g. "Confirmed" instead of the spots once registered)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS timetable_class ("
+                "gym TEXT NOT NULL, "
+                "username TEXT NOT NULL, "
+                "week_monday TEXT NOT NULL, "
+                "class_date TEXT NOT NULL, "
+                "start_time TEXT NOT NULL, "
+                "end_time TEXT, "
+                "name TEXT NOT NULL, "
+                "status_text TEXT NOT NULL, "
+                "element_id TEXT NOT NULL, "
+                "register_onclick TEXT, "
+                "PRIMARY KEY (gym, username, class_date, start_time))"
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def store_week(
+        self,
+        fliip_gym_name: str,
+        fliip_username: str,
+        week_date: date,
+        week_classes: dict[tuple[str, str], CalendarClass],
+        fetched: datetime | None = None,
+    ) -> None:
+        """
+        Replace the cached classes of the calendar week of week_date by the ones of its parsed page.
+
+        :param week_classes: Classes of the week page (see parse_calendar_week_page).
+        :param fetched: Datetime the page was fetched at, now if None.
+        """
+        week_monday = get_week_monday(week_date).isoformat()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM timetable_class WHERE gym = ? AND username = ? AND week_monday = ?",
+                (fliip_gym_name, fliip_username, week_monday),
+            )
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO timetable_class VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        fliip_gym_name,
+                        fliip_username,
+                        week_monday,
+                        calendar_class.class_date,
+                        calendar_class.start_time,
+                        calendar_class.end_time,
+                        calendar_class.name,
+                        calendar_class.status_text,
+                        calendar_class.element_id,
+                        calendar_class.register_onclick,
+                    )
+                    for calendar_class in week_classes.values()
+                ],
+            )
+            self._connection.execute(
+                "INSERT OR REPLACE INTO timetable_week VALUES (?, ?, ?, ?)",
+                (
+                    fliip_gym_name,
+                    fliip_username,
+                    week_monday,
+                    (fetched if fetched is not None else datetime.now()).isoformat(),
+                ),
+            )
+
+    def invalidate_week(
+        self, fliip_gym_name: str, fliip_username: str, week_date: date
+    ) -> None:
+        """Make the cached week of week_date stale (e.g. after a booking changed its page)."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM timetable_week WHERE gym = ? AND username = ? AND week_monday = ?",
+                (fliip_gym_name, fliip_username, get_week_monday(week_date).isoformat()),
+            )
+
+    def get_stale_week_dates(
+        self,
+        fliip_gym_name: str,
+        fliip_username: str,
+        week_date_list: list[date],
+        now: datetime | None = None,
+    ) -> list[date]:
+        """Return the dates of week_date_list whose calendar week is not cached or older than the TTL."""
+        if now is None:
+            now = datetime.now()
+        with self._lock:
+            fetched_by_week = dict(
+                self._connection.execute(
+                    "SELECT week_monday, fetched FROM timetable_week WHERE gym = ? AND username = ?",
+                    (fliip_gym_name, fliip_username),
+                ).fetchall()
+            )
+        stale_week_date_list = []
+        for week_date in week_date_list:
+            fetched = fetched_by_week.get(get_week_monday(week_date).isoformat())
+            if fetched is None or now - datetime.fromisoformat(fetched) >= timedelta(
+                hours=self.ttl_hours
+            ):
+                stale_week_date_list.append(week_date)
+        return stale_week_date_list
+
+    def get_classes(
+        self,
+        fliip_gym_name: str,
+        fliip_username: str,
+        start_date: date,
+        end_date: date,
+    ) -> list[CalendarClass]:
+        """Return the cached classes from start_date to end_date (included), ordered by date and time."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT element_id, class_date, start_time, end_time, name, status_text, register_onclick "
+                "FROM timetable_class "
+                "WHERE gym = ? AND username = ? AND class_date BETWEEN ? AND ? "
+                "ORDER BY class_date, start_time",
+                (
+                    fliip_gym_name,
+                    fliip_username,
+                    start_date.isoformat(),
+                    end_date.isoformat(),
+                ),
+            ).fetchall()
+        return [
+            CalendarClass(
+                element_id=row[0],
+                class_date=row[1],
+                start_time=row[2],
+                end_time=row[3],
+                name=row[4],
+                status_text=row[5],
+                register_onclick=row[6],
+            )
+            for row in rows
+        ]
+
+
+def query_timetable(
+    account_config: FliipAccountConfig,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    weekday_str: str | None = None,
+    class_hour: int | None = None,
+    status: str | None = None,
+    timetable_cache: TimetableCache | None = None,
+    http_backend: bool = True,
+    headless: bool = True,
+    web_timeout: float = 5.0,
+    use_session_cache: bool = True,
+) -> list[CalendarClass]:
+    """
+    Return the classes of the gym timetable, answered from the timetable cache.
+
+    Only the calendar weeks not cached or stale are fetched (one login for all of them),
+    nothing is loaded when the cache is fresh.
+
+    :param account_config: Account whose calendar is queried (class statuses are per account).
+    :param start_date: First date of the query, today if None.
+    :param end_date: Last date of the query (included), 6 days after start_date if None.
+    :param weekday_str: Weekday name of the classes (e.g. "Tuesday"), all days if None.
+    :param class_hour: Start hour of the classes in 24h format (e.g. 12 for noon), all hours if None.
+    :param status: Normalized status of the classes (see CalendarClass.status), all statuses if None.
+    :param timetable_cache: Timetable cache, the default cache database if None.
+    :param http_backend: If True, fetch the stale weeks with plain HTTP requests instead of Chrome.
+    :raise ValueError: End date before the start date.
+    """
+    if start_date is None:
+        start_date = datetime.now().date()
+    if end_date is None:
+        end_date = start_date + timedelta(days=6)
+    if end_date < start_date:
+        raise ValueError(
+            f"Timetable end date {end_date} is before its start date {start_date}."
+        )
+    own_timetable_cache = timetable_cache is None
+    if own_timetable_cache:
+        timetable_cache = TimetableCache()
+    try:
+        # One page per calendar week, the first one at the start date (as the registering loop)
+        start_week_monday = get_week_monday(start_date)
+        week_date_list = [start_date] + [
+            start_week_monday + timedelta(days=7 * week_ind)
+            for week_ind in range(1, (end_date - start_week_monday).days // 7 + 1)
+        ]
+        stale_week_date_list = timetable_cache.get_stale_week_dates(
+            account_config.fliip_gym_name, account_config.fliip_username, week_date_list
+        )
+        if len(stale_week_date_list) > 0:
             logger.info(
-                f"Force sending log file to {recipient_email} from {sender_email}."
+                f"Fetching {len(stale_week_date_list)} stale calendar week(s) of the timetable..."
             )
-        send_log_file_via_email(
-            log_file_path=logging_file_path,
-            recipient_email=recipient_email,
-            sender_email=sender_email,
-            sender_password=sender_password,
+            _fetch_timetable_weeks(
+                account_config=account_config,
+                week_date_list=stale_week_date_list,
+                timetable_cache=timetable_cache,
+                http_backend=http_backend,
+                headless=headless,
+                web_timeout=web_timeout,
+                use_session_cache=use_session_cache,
+            )
+        calendar_class_list = timetable_cache.get_classes(
+            account_config.fliip_gym_name,
+            account_config.fliip_username,
+            start_date,
+            end_date,
         )
+    finally:
+        if own_timetable_cache:
+            timetable_cache.close()
+    return [
+        calendar_class
+        for calendar_class in calendar_class_list
+        if (
+            weekday_str is None
+            or date.fromisoformat(calendar_class.class_date).strftime("%A").lower()
+            == weekday_str.lower()
+        )
+        and (
+            class_hour is None
+            or int(calendar_class.start_time.split(":")[0]) == class_hour
+        )
+        and (status is None or calendar_class.status == status)
+    ]
 
-    return
+
+# Fetch and cache calendar week pages, in one HTTP session or logged in browser
+def _fetch_timetable_weeks(
+    account_config: FliipAccountConfig,
+    week_date_list: list[date],
+    timetable_cache: TimetableCache,
+    http_backend: bool,
+    headless: bool,
+    web_timeout: float,
+    use_session_cache: bool,
+) -> None:
+    login_kwargs = dict(
+        fliip_username=account_config.fliip_username,
+        fliip_password=account_config.fliip_password,
+        use_session_cache=use_session_cache,
+    )
+    if http_backend:
+        with FliipHttpSession(
+            fliip_gym_name=account_config.fliip_gym_name, web_timeout=web_timeout
+        ) as http_session:
+            http_session.login(**login_kwargs)
+            for week_date in week_date_list:
+                timetable_cache.store_week(
+                    account_config.fliip_gym_name,
+                    account_config.fliip_username,
+                    week_date,
+                    http_session.get_calendar_week(week_date=week_date)[1],
+                )
+        return
+    with get_web_web_handle(headless=headless, web_timeout=web_timeout) as web_handle:
+        fliip_web_page_login(
+            web_handle=web_handle,
+            fliip_gym_name=account_config.fliip_gym_name,
+            **login_kwargs,
+        )
+        for week_date in week_date_list:
+            # Fetched from the logged in page, no page load per week
+            week_page = web_handle.driver.execute_async_script(
+                _fetch_page_script,
+                get_calendar_week_url(account_config.fliip_gym_name, week_date),
+            )
+            if week_page is None or parse_calendar_page_date(week_page) is None:
+                raise UnexpectedCalendarPageError(
+                    f"Unexpected calendar page! (expected {week_date})"
+                )
+            timetable_cache.store_week(
+                account_config.fliip_gym_name,
+                account_config.fliip_username,
+                week_date,
+                parse_calendar_week_page(week_page),
+            )
+
+
+def format_timetable(calendar_class_list: list[CalendarClass]) -> str:
+    """Return the classes as a text table (date, time, name, spots and status)."""
+    lines = []
+    for calendar_class in calendar_class_list:
+        class_date = date.fromisoformat(calendar_class.class_date)
+        spots = calendar_class.spots
+        lines.append(
+            f"{class_date.strftime('%a %Y-%m-%d')} {calendar_class.start_time}-{calendar_class.end_time or '':<5} "
+            f"{calendar_class.name:<30} {f'{spots[0]}/{spots[1]}' if spots is not None else '':>7} {calendar_class.status}"
+        )
+    return "\n".join(lines)
 
 
 if __name__ == "__main__":
-    clean_old_log_entries(logging_file_path)
+    argument_parser = argparse.ArgumentParser(description="Fliip class registering.")
+    argument_parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep warm logged in browsers and wait for jobs from --submit.",
+    )
+    argument_parser.add_argument(
+        "--submit",
+        action="store_true",
+        help="Send a registration job to the running daemon.",
+    )
+    argument_parser.add_argument(
+        "--stop-daemon", action="store_true", help="Stop the running daemon."
+    )
+    argument_parser.add_argument(
+        "--release-scheduler",
+        action="store_true",
+        help="Book the configured classes at the instant their registration opens (next 24h).",
+    )
+    argument_parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Watch the configured FULL classes and book them when a spot frees up.",
+    )
+    argument_parser.add_argument(
+        "--record",
+        action="store_true",
+        help=f"Save the pages and requests of the run as an offline fixture bundle in {fixtures_dir_path.name}/.",
+    )
+    argument_parser.add_argument(
+        "--learn-http-booking",
+        type=Path,
+        metavar="BUNDLE",
+        help="Learn the HTTP backend booking requests from a --record bundle of a browser booking.",
+    )
+    argument_parser.add_argument(
+        "--timetable",
+        action="store_true",
+        help="Print the gym timetable from the timetable cache (only the stale weeks are fetched).",
+    )
+    argument_parser.add_argument(
+        "--date",
+        type=date.fromisoformat,
+        help="First date of the --timetable query (YYYY-MM-DD), today by default.",
+    )
+    argument_parser.add_argument(
+        "--days",
+        type=int,
+        default=7,
+        help="Number of days of the --timetable query.",
+    )
+    argument_parser.add_argument(
+        "--weekday", help="Weekday name of the --timetable classes (e.g. Tuesday)."
+    )
+    argument_parser.add_argument(
+        "--hour", type=int, help="Start hour of the --timetable classes (e.g. 12)."
+    )
+    argument_parser.add_argument(
+        "--status",
+        choices=["open", "full", "confirmed", "waiting", "canceled"],
+        help="Status of the --timetable classes.",
+    )
+    arguments = argument_parser.parse_args()
+    # Stopped by a scheduler: exit normally so the open browsers are closed (see _close_open_web_handles)
+    signal.signal(
+        signal.SIGTERM, lambda signal_number, frame: sys.exit(128 + signal_number)
+    )
+    if arguments.learn_http_booking is not None:
+        learn_http_booking_steps_from_bundle(arguments.learn_http_booking)
+        raise SystemExit()
+    if arguments.submit or arguments.stop_daemon:
+        daemon_result = submit_daemon_job(
+            command="stop" if arguments.stop_daemon else "register"
+        )
+        print(daemon_result["summary"])
+        raise SystemExit(1 if daemon_result.get("has_errors") else 0)
+
+    log_rotation = None  # None to clean old entries, "size" or "time" to rotate the log file
+    if log_rotation is None:
+        clean_old_log_entries(logging_file_path)
+    else:
+        configure_log_rotation(log_rotation)
+    # Learn the wait timeouts from the latencies of the previous runs
+    adaptive_timeouts.load()
+    atexit.register(adaptive_timeouts.save)
 
     # TODO: Get these variables from console arguments or environment variables?
     fliip_gym_name = "crossfitahuntsic"
@@ -553,15 +5957,129 @@ if __name__ == "__main__":
     force_send_log_email = (
         False  # Force sending the log file via email even if no errors occurred
     )
+    http_backend = (
+        False  # Set to true to register with plain HTTP requests instead of Chrome
+    )
+    use_session_cache = (
+        True  # Reuse the encrypted cached session of previous runs instead of logging in
+    )
+    # "lean" blocks images, fonts and analytics and skips the load event, "full" for Chrome defaults
+    default_browser_profile = browser_profiles["lean"]
+    multi_tab = (
+        False  # Set to true to load the target weeks in parallel tabs (one page load for all weeks)
+    )
 
-    # Get Login Infos
-    fliip_username = os.getenv("FLIIP_USERNAME")
-    fliip_password = os.getenv("FLIIP_PASSWORD")
-    if fliip_username is None or fliip_username == "":
-        raise ConnectionAbortedError("FLIIP_USERNAME Environnement Variable Missing!")
-    if fliip_password is None or fliip_password == "":
-        raise ConnectionAbortedError("FLIIP_PASSWORD Environnement Variable Missing!")
+    if arguments.release_scheduler:
+        # Checked before waiting for the first opening, the login is only done shortly before it
+        if not os.getenv("FLIIP_USERNAME") or not os.getenv("FLIIP_PASSWORD"):
+            argument_parser.error(
+                "--release-scheduler needs the FLIIP_USERNAME and FLIIP_PASSWORD environment variables."
+            )
+        run_release_scheduler(
+            account_config=FliipAccountConfig(
+                fliip_gym_name=fliip_gym_name,
+                fliip_username=os.getenv("FLIIP_USERNAME"),
+                fliip_password=os.getenv("FLIIP_PASSWORD"),
+                max_hours_in_future_to_register=max_hours_in_future_to_register,
+                weekday_classes_to_register=weekday_classes_to_register,
+            ),
+            headless=headless,
+            http_backend=http_backend,
+            use_session_cache=use_session_cache,
+        )
+        raise SystemExit()
+
+    if arguments.timetable:
+        # Checked before any cache or page access, a stale week would need a login
+        if not os.getenv("FLIIP_USERNAME") or not os.getenv("FLIIP_PASSWORD"):
+            argument_parser.error(
+                "--timetable needs the FLIIP_USERNAME and FLIIP_PASSWORD environment variables "
+                "(class statuses are per account)."
+            )
+        if arguments.days < 1:
+            argument_parser.error(
+                f"--days must be at least 1 (got {arguments.days})."
+            )
+        timetable_start_date = (
+            arguments.date if arguments.date is not None else datetime.now().date()
+        )
+        print(
+            format_timetable(
+                query_timetable(
+                    account_config=FliipAccountConfig(
+                        fliip_gym_name=fliip_gym_name,
+                        fliip_username=os.getenv("FLIIP_USERNAME"),
+                        fliip_password=os.getenv("FLIIP_PASSWORD"),
+                        max_hours_in_future_to_register=max_hours_in_future_to_register,
+                        weekday_classes_to_register=weekday_classes_to_register,
+                    ),
+                    start_date=timetable_start_date,
+                    end_date=timetable_start_date + timedelta(days=arguments.days - 1),
+                    weekday_str=arguments.weekday,
+                    class_hour=arguments.hour,
+                    status=arguments.status,
+                    headless=headless,
+                    use_session_cache=use_session_cache,
+                )
+            )
+        )
+        raise SystemExit()
+
+    if arguments.watch:
+        # Checked before opening the stores, the watcher logs in first
+        if not os.getenv("FLIIP_USERNAME") or not os.getenv("FLIIP_PASSWORD"):
+            argument_parser.error(
+                "--watch needs the FLIIP_USERNAME and FLIIP_PASSWORD environment variables."
+            )
+        watch_state_store = RegistrationStateStore()
+        watch_timetable_cache = TimetableCache()
+        try:
+            watch_report = watch_full_classes(
+                account_config=FliipAccountConfig(
+                    fliip_gym_name=fliip_gym_name,
+                    fliip_username=os.getenv("FLIIP_USERNAME"),
+                    fliip_password=os.getenv("FLIIP_PASSWORD"),
+                    max_hours_in_future_to_register=max_hours_in_future_to_register,
+                    weekday_classes_to_register=weekday_classes_to_register,
+                ),
+                http_backend=http_backend,
+                headless=headless,
+                use_session_cache=use_session_cache,
+                state_store=watch_state_store,
+                timetable_cache=watch_timetable_cache,
+            )
+        finally:
+            watch_state_store.close()
+            watch_timetable_cache.close()
+        print(watch_report.summary())
+        raise SystemExit(1 if watch_report.has_errors else 0)
 
+    # Optional JSON file of several accounts to register concurrently (see load_account_configs)
+    account_configs_file_path = os.getenv("FLIIP_ACCOUNTS_FILE")
+    if arguments.daemon:
+        if account_configs_file_path is not None and account_configs_file_path != "":
+            daemon_account_config_list = load_account_configs(
+                Path(account_configs_file_path)
+            )
+        else:
+            daemon_account_config_list = [
+                FliipAccountConfig(
+                    fliip_gym_name=fliip_gym_name,
+                    fliip_username=os.getenv("FLIIP_USERNAME"),
+                    fliip_password=os.getenv("FLIIP_PASSWORD"),
+                    max_hours_in_future_to_register=max_hours_in_future_to_register,
+                    weekday_classes_to_register=weekday_classes_to_register,
+                )
+            ]
+        run_daemon(
+            account_config_list=daemon_account_config_list,
+            headless=headless,
+            recipient_email=os.getenv("FLIIP_RECIPIENT_EMAIL"),
+            sender_email=os.getenv("FLIIP_SENDER_EMAIL"),
+            sender_password=os.getenv("FLIIP_SENDER_PASSWORD"),
+            force_send_log_email=force_send_log_email,
+        )
+        raise SystemExit()
     recipient_email = os.getenv("FLIIP_RECIPIENT_EMAIL")  # Optional, can be None
     sender_email = os.getenv(
         "FLIIP_SENDER_EMAIL"
@@ -570,6 +6088,50 @@ if __name__ == "__main__":
         "FLIIP_SENDER_PASSWORD"
     )  # Optional, can be None. Needs to be the gmail address token for SMTP.
 
+    if account_configs_file_path is not None and account_configs_file_path != "":
+        # Log email sent in the background, only waited for once registering is done
+        email_reporter = (
+            EmailReporter(sender_email=sender_email, sender_password=sender_password)
+            if sender_email is not None and sender_password is not None
+            else None
+        )
+        try:
+            run_accounts(
+                account_config_list=load_account_configs(
+                    Path(account_configs_file_path)
+                ),
+                recipient_email=recipient_email,
+                sender_email=sender_email,
+                sender_password=sender_password,
+                headless=headless,
+                force_send_log_email=force_send_log_email,
+                http_backend=http_backend,
+                # A recording starts from the login page
+                use_session_cache=use_session_cache and not arguments.record,
+                email_reporter=email_reporter,
+                multi_tab=multi_tab,
+                record_fixtures_dir_path=fixtures_dir_path if arguments.record else None,
+            )
+        except Exception as e:
+            logger.error(f"Failed to run Fliip registering accounts: {e}.")
+        if email_reporter is not None:
+            email_reporter.close()
+        raise SystemExit()
+
+    # Get Login Infos
+    fliip_username = os.getenv("FLIIP_USERNAME")
+    fliip_password = os.getenv("FLIIP_PASSWORD")
+    if fliip_username is None or fliip_username == "":
+        raise ConnectionAbortedError("FLIIP_USERNAME Environnement Variable Missing!")
+    if fliip_password is None or fliip_password == "":
+        raise ConnectionAbortedError("FLIIP_PASSWORD Environnement Variable Missing!")
+
+    # Log email sent in the background, only waited for once registering is done
+    email_reporter = (
+        EmailReporter(sender_email=sender_email, sender_password=sender_password)
+        if sender_email is not None and sender_password is not None
+        else None
+    )
     try:
         main(
             fliip_gym_name=fliip_gym_name,
@@ -582,6 +6144,14 @@ if __name__ == "__main__":
             sender_password=sender_password,
             headless=headless,
             force_send_log_email=force_send_log_email,
+            http_backend=http_backend,
+            # A recording starts from the login page
+            use_session_cache=use_session_cache and not arguments.record,
+            email_reporter=email_reporter,
+            multi_tab=multi_tab,
+            record_fixtures_dir_path=fixtures_dir_path if arguments.record else None,
         )
     except Exception as e:
         logger.error(f"Failed to run Fliip registering main: {e}.")
+    if email_reporter is not None:
+        email_reporter.close()
@@ -0,0 +1,24 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import fliip_register_class
+
+# Tests must not fill the registering log file
+fliip_register_class.log_queue_listener.handlers = (
+    fliip_register_class.logging_stream_handler,
+)
+
+fixtures_dir_path = Path(__file__).parent.joinpath("fixtures")
+# Recorded fixture bundles (see fliip_register_class.SessionRecorder), redacted --record bundles can be added
+fixture_bundle_paths = sorted(
+    manifest_path.parent for manifest_path in fixtures_dir_path.glob("*/manifest.json")
+)
+
+
+@pytest.fixture(params=fixture_bundle_paths, ids=lambda bundle_path: bundle_path.name)
+def fixture_bundle_path(request) -> Path:
+    return request.param
@@ -0,0 +1 @@
+function register(classId, classDate) { /* sample */ }
\ No newline at end of file
@@ -0,0 +1,21 @@
+import fliip_register_class
+
+
+def test_timeout_floor_follows_web_timeout():
+    adaptive_timeouts = fliip_register_class.AdaptiveTimeouts(min_timeout_s=2.0)
+    for _ in range(10):
+        adaptive_timeouts.observe("login_submit_wait", 0.1)
+    assert adaptive_timeouts.timeout("login_submit_wait", 5.0) == 2.0
+    assert adaptive_timeouts.timeout("login_submit_wait", 20.0) == 5.0
+
+
+def test_timed_out_wait_grows_the_timeout():
+    adaptive_timeouts = fliip_register_class.AdaptiveTimeouts()
+    for _ in range(10):
+        adaptive_timeouts.observe("login_submit_wait", 0.1)
+    assert adaptive_timeouts.timeout("login_submit_wait", 20.0) == 5.0
+    adaptive_timeouts.observe_timeout("login_submit_wait", 5.0)
+    assert adaptive_timeouts.timeout("login_submit_wait", 20.0) == 20.0
+    for _ in range(10):
+        adaptive_timeouts.observe("login_submit_wait", 3.0)
+    assert adaptive_timeouts.timeout("login_submit_wait", 20.0) == 9.0
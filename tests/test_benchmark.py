@@ -0,0 +1,92 @@
+import dataclasses
+from datetime import date, timedelta
+
+import pytest
+
+import fliip_register_class
+
+fliip_benchmark = pytest.importorskip("fliip_benchmark")
+
+# Normalized status of each fake class status (see fliip_register_class.CalendarClass.status)
+fake_class_statuses = {
+    "open": "open",
+    "FULL": "full",
+    "Confirmed": "confirmed",
+    "Waiting": "waiting",
+    "Canceled": "canceled",
+}
+
+
+def _scenario_ids(scenario: fliip_benchmark.BenchmarkScenario) -> str:
+    return scenario.name
+
+
+@pytest.mark.parametrize(
+    "scenario", fliip_benchmark.benchmark_scenarios, ids=_scenario_ids
+)
+def test_fake_calendar_page_follows_the_status_cycle(scenario):
+    status_cycle = scenario.class_status_cycle
+    with fliip_benchmark.FakeFliipServer(scenario) as fake_server:
+        for week_ind in range(2):
+            page_date = date.today() + timedelta(days=7 * week_ind)
+            calendar_page = fake_server.calendar_page(
+                page_date, show_google_calendar_popup=False
+            )
+            assert (
+                fliip_register_class.parse_calendar_page_date(calendar_page).date()
+                == page_date
+            )
+            week_classes = fliip_register_class.parse_calendar_week_page(calendar_page)
+            assert len(week_classes) == 7 * len(fliip_benchmark.fake_class_hours)
+            for (class_date_str, _), calendar_class in week_classes.items():
+                class_date = date.fromisoformat(class_date_str)
+                fake_status = status_cycle[class_date.toordinal() % len(status_cycle)]
+                assert calendar_class.status == fake_class_statuses[fake_status]
+                assert (calendar_class.register_onclick is not None) == (
+                    fake_status in ("open", "FULL")
+                )
+
+
+@pytest.mark.parametrize(
+    "scenario", fliip_benchmark.benchmark_scenarios, ids=_scenario_ids
+)
+def test_http_scenario_outcomes(scenario, monkeypatch):
+    pytest.importorskip("requests")
+    # Globals pointed at the fake server by run_scenario, restored after the test
+    for global_name in (
+        "fliip_base_url_template",
+        "http_booking_steps_file_path",
+        "default_browser_profile",
+    ):
+        monkeypatch.setattr(
+            fliip_register_class,
+            global_name,
+            getattr(fliip_register_class, global_name),
+        )
+    scenario = dataclasses.replace(scenario, latency_s=0.0)
+    status_cycle = scenario.class_status_cycle
+    target_statuses = [
+        status_cycle[class_datetime.date().toordinal() % len(status_cycle)]
+        for week_datetimes in fliip_register_class.plan_target_datetimes(
+            weekday_classes_to_register=scenario.weekday_classes_to_register,
+            max_hours_in_future_to_register=scenario.max_hours_in_future_to_register,
+        ).values()
+        for class_datetime in week_datetimes
+    ]
+    if scenario.out_of_membership:
+        expected_registered, expected_errors = 0, len(target_statuses)
+    else:
+        # Booked, waitlisted or already registered classes are reported registered
+        expected_errors = target_statuses.count("Canceled")
+        expected_registered = len(target_statuses) - expected_errors
+
+    result = fliip_benchmark.run_scenario(scenario, http_backend=True)
+
+    assert (result["registered"], result["errors"]) == (
+        expected_registered,
+        expected_errors,
+    )
+    if scenario.name == "one_class_per_week":
+        assert result["registered"] == 1
+    elif scenario.name == "out_of_membership":
+        assert (result["registered"], result["errors"]) == (0, 2)
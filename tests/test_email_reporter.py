@@ -0,0 +1,145 @@
+import email
+import gzip
+import socketserver
+import threading
+
+import pytest
+
+import fliip_register_class
+
+
+# Stand-in SMTP server keeping the received messages (aiosmtpd is not a dependency)
+class SmtpSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SmtpSinkHandler)
+        self.messages: list[email.message.Message] = []
+        self.connection_count = 0
+        self.quit_count = 0
+        self.logins: list[str] = []
+
+
+class SmtpSinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self) -> None:
+        self.server.connection_count += 1
+        self.reply("220 localhost SMTP sink")
+        while True:
+            line = self.rfile.readline().decode().rstrip("\r\n")
+            if not line:
+                return
+            command = line.split(" ", 1)[0].upper()
+            if command == "EHLO":
+                self.reply("250-localhost")
+                self.reply("250 AUTH PLAIN")
+            elif command == "AUTH":
+                self.server.logins.append(line)
+                self.reply("235 Authentication successful")
+            elif command in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data_lines = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if data_line in (b".\r\n", b""):
+                        break
+                    # Dot-stuffed lines (starting with a dot) are sent with an extra dot
+                    data_lines.append(
+                        data_line[1:] if data_line.startswith(b"..") else data_line
+                    )
+                msg = email.message_from_bytes(b"".join(data_lines))
+                if "Rejected" in msg["Subject"]:
+                    self.reply("554 Transaction failed")
+                    continue
+                self.server.messages.append(msg)
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.server.quit_count += 1
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+@pytest.fixture
+def smtp_sink():
+    with SmtpSink() as smtp_sink:
+        server_thread = threading.Thread(target=smtp_sink.serve_forever, daemon=True)
+        server_thread.start()
+        yield smtp_sink
+        smtp_sink.shutdown()
+
+
+def test_background_reporter_reuses_its_connection(smtp_sink):
+    email_reporter = fliip_register_class.EmailReporter(
+        sender_email="sender@example.com",
+        sender_password="password",
+        smtp_host="127.0.0.1",
+        smtp_port=smtp_sink.server_address[1],
+        use_starttls=False,
+    )
+    fliip_register_class._load_email()
+    for report_ind in range(2):
+        msg = fliip_register_class.MIMEMultipart()
+        msg["From"] = "sender@example.com"
+        msg["To"] = "recipient@example.com"
+        msg["Subject"] = f"Report {report_ind}"
+        email_reporter.send(msg)
+    email_reporter.close()
+    assert [msg["Subject"] for msg in smtp_sink.messages] == ["Report 0", "Report 1"]
+    assert smtp_sink.connection_count == 1
+    assert len(smtp_sink.logins) == 1
+
+
+def test_background_reporter_closes_the_connection_of_a_failed_email(smtp_sink):
+    email_reporter = fliip_register_class.EmailReporter(
+        sender_email="sender@example.com",
+        sender_password="password",
+        smtp_host="127.0.0.1",
+        smtp_port=smtp_sink.server_address[1],
+        use_starttls=False,
+    )
+    fliip_register_class._load_email()
+    for subject in ("Rejected report", "Report"):
+        msg = fliip_register_class.MIMEMultipart()
+        msg["From"] = "sender@example.com"
+        msg["To"] = "recipient@example.com"
+        msg["Subject"] = subject
+        email_reporter.send(msg)
+        email_reporter.flush()
+    # The connection of the failed email is quit, the next email is sent on a new one
+    assert smtp_sink.quit_count == 1
+    email_reporter.close()
+    assert [msg["Subject"] for msg in smtp_sink.messages] == ["Report"]
+    assert smtp_sink.connection_count == 2
+    assert smtp_sink.quit_count == 2
+
+
+def test_synchronous_log_email_uses_the_smtp_settings(smtp_sink, tmp_path, monkeypatch):
+    monkeypatch.setattr(fliip_register_class, "email_smtp_host", "127.0.0.1")
+    monkeypatch.setattr(
+        fliip_register_class, "email_smtp_port", smtp_sink.server_address[1]
+    )
+    monkeypatch.setattr(fliip_register_class, "email_use_starttls", False)
+    log_file_path = tmp_path.joinpath("fliip_register.log")
+    log_file_path.write_bytes(b"first run\nsecond run\n")
+
+    fliip_register_class.send_log_file_via_email(
+        log_file_path=log_file_path,
+        recipient_email="recipient@example.com",
+        sender_email="sender@example.com",
+        sender_password="password",
+        body="1 registered",
+        log_start_offset=len(b"first run\n"),
+    )
+    assert len(smtp_sink.messages) == 1
+    msg = smtp_sink.messages[0]
+    assert msg["To"] == "recipient@example.com"
+    text_part, log_part = msg.get_payload()
+    assert "1 registered" in text_part.get_payload()
+    assert gzip.decompress(log_part.get_payload(decode=True)) == b"second run\n"
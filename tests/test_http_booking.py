@@ -0,0 +1,180 @@
+import dataclasses
+from pathlib import Path
+from urllib.parse import parse_qsl
+
+import pytest
+
+import fliip_register_class
+
+
+@pytest.mark.parametrize(
+    "message, outcome",
+    [
+        ('{"success": true, "message": "Your booking is confirmed."}', "registered"),
+        (
+            "<div><h4>Message</h4><p>You have been added to the waiting list.</p></div>",
+            "waitlisted",
+        ),
+        ("You need a new membership to book this class.", "out_of_membership"),
+        ('{"status": "error", "message": "Booking error."}', "booking_error"),
+        (
+            "Class booked successfully. Contact us if you see any error.",
+            "registered",
+        ),
+        ("You are unregistered: error while booking.", "booking_error"),
+        ("You are already registered to this class.", "already_registered"),
+        ("<html><body>Calendar</body></html>", None),
+    ],
+)
+def test_classify_booking_message(message, outcome):
+    assert fliip_register_class.classify_booking_message(message) == outcome
+
+
+def test_recorded_calendar_pages_parse(fixture_bundle_path):
+    manifest = fliip_register_class.load_fixture_bundle(fixture_bundle_path)
+    calendar_page_list = [
+        exchange["body"]
+        for exchange in manifest["exchanges"]
+        if exchange["method"] == "GET"
+        and exchange["body"] is not None
+        and fliip_register_class.parse_calendar_page_date(exchange["body"]) is not None
+    ]
+    assert len(calendar_page_list) > 0
+    for calendar_page in calendar_page_list:
+        week_classes = fliip_register_class.parse_calendar_week_page(calendar_page)
+        assert len(week_classes) > 0
+        for (class_date, start_time), calendar_class in week_classes.items():
+            assert calendar_class.class_date == class_date
+            assert calendar_class.start_time == start_time
+            assert calendar_class.status != "unknown", calendar_class.status_text
+
+
+def test_learned_booking_steps_use_class_placeholders(fixture_bundle_path):
+    manifest = fliip_register_class.load_fixture_bundle(fixture_bundle_path)
+    recorded_booking = fliip_register_class.find_recorded_booking(manifest)
+    if recorded_booking is None:
+        pytest.skip("No class booking in the bundle")
+    booked_class, _, booking_exchanges = recorded_booking
+    booking_steps = fliip_register_class.learn_http_booking_steps(manifest)
+    assert len(booking_steps) == len(booking_exchanges)
+    value_templates = [
+        value_template
+        for booking_step in booking_steps
+        for value_template in [booking_step.path]
+        + [pair[1] for pair in booking_step.query + booking_step.body]
+    ]
+    # The booked class is sent through its placeholders, never as a recorded literal
+    assert any(
+        "{element_id}" in template or "{arg" in template for template in value_templates
+    )
+    assert not any(
+        booked_class.element_id == template.strip('"') for template in value_templates
+    )
+
+
+def test_http_booking_sends_recorded_requests(fixture_bundle_path):
+    pytest.importorskip("requests")
+    import fliip_benchmark
+
+    manifest = fliip_register_class.load_fixture_bundle(fixture_bundle_path)
+    recorded_booking = fliip_register_class.find_recorded_booking(manifest)
+    if recorded_booking is None:
+        pytest.skip("No class booking in the bundle")
+    booked_class, page_tokens, booking_exchanges = recorded_booking
+    expected_outcome = fliip_register_class.classify_booking_message(
+        booking_exchanges[-1]["body"] or ""
+    )
+
+    with fliip_benchmark.FixtureReplayServer(
+        fixture_bundle_path, speed=0
+    ) as replay_server:
+        with fliip_register_class.FliipHttpSession(
+            fliip_gym_name=manifest["fliip_gym_name"],
+            base_url=replay_server.base_url,
+            booking_steps=fliip_register_class.learn_http_booking_steps(manifest),
+        ) as http_session:
+            http_session.page_tokens = page_tokens
+            if expected_outcome == "waitlisted":
+                with pytest.raises(fliip_register_class.ClassWaitlistedError):
+                    http_session.book_class(booked_class)
+            else:
+                assert http_session.book_class(booked_class) is (
+                    expected_outcome != "already_registered"
+                )
+
+    assert len(replay_server.received_requests) == len(booking_exchanges)
+    for received_request, exchange in zip(
+        replay_server.received_requests, booking_exchanges
+    ):
+        assert received_request["method"] == exchange["method"]
+        assert received_request["path"] == exchange["path"]
+        assert sorted(parse_qsl(received_request["query"])) == sorted(
+            parse_qsl(exchange["query"])
+        )
+        body_format, body_fields = fliip_register_class._parse_request_body(
+            exchange["request_body"]
+        )
+        assert fliip_register_class._parse_request_body(received_request["body"]) == (
+            body_format,
+            body_fields,
+        )
+        for header_name, header_value in (exchange["request_headers"] or {}).items():
+            assert received_request["headers"][header_name] == header_value
+
+
+def test_default_booking_steps_are_the_sample_recording_ones():
+    manifest = fliip_register_class.load_fixture_bundle(
+        Path(__file__).parent.joinpath("fixtures", "sample_booking")
+    )
+    assert fliip_register_class.default_http_booking_steps == (
+        fliip_register_class.learn_http_booking_steps(manifest)
+    )
+
+
+def test_http_backend_books_without_learned_steps(tmp_path, monkeypatch):
+    pytest.importorskip("requests")
+    import fliip_benchmark
+
+    # Globals pointed at the fake server by run_scenario, restored after the test
+    for global_name in ("fliip_base_url_template", "default_browser_profile"):
+        monkeypatch.setattr(
+            fliip_register_class,
+            global_name,
+            getattr(fliip_register_class, global_name),
+        )
+    monkeypatch.setattr(
+        fliip_register_class,
+        "http_booking_steps_file_path",
+        tmp_path.joinpath("fliip_http_booking.json"),
+    )
+    scenario = dataclasses.replace(fliip_benchmark.benchmark_scenarios[0], latency_s=0.0)
+    result = fliip_benchmark.run_scenario(
+        scenario, http_backend=True, learned_booking_steps=False
+    )
+    assert (result["registered"], result["errors"]) == (1, 0)
+
+
+def test_booking_response_outcome_of_reloaded_calendar_page(fixture_bundle_path):
+    manifest = fliip_register_class.load_fixture_bundle(fixture_bundle_path)
+    calendar_page_list = [
+        exchange["body"]
+        for exchange in manifest["exchanges"]
+        if exchange["method"] == "GET"
+        and exchange["body"] is not None
+        and fliip_register_class.parse_calendar_page_date(exchange["body"]) is not None
+    ]
+    for calendar_page in calendar_page_list:
+        for calendar_class in fliip_register_class.parse_calendar_week_page(
+            calendar_page
+        ).values():
+            booking_response_outcome = (
+                fliip_register_class.FliipHttpSession._booking_response_outcome
+            )
+            if calendar_class.status == "confirmed":
+                assert booking_response_outcome(calendar_page, calendar_class) is True
+            elif calendar_class.status == "waiting":
+                with pytest.raises(fliip_register_class.ClassWaitlistedError):
+                    booking_response_outcome(calendar_page, calendar_class)
+            else:
+                with pytest.raises(Exception, match="Booking failed"):
+                    booking_response_outcome(calendar_page, calendar_class)
@@ -0,0 +1,101 @@
+import calendar
+import functools
+from datetime import datetime
+
+import pytest
+
+import fliip_register_class
+
+account_config = fliip_register_class.FliipAccountConfig(
+    fliip_gym_name="samplegym",
+    fliip_username="user@example.com",
+    fliip_password="password",
+    max_hours_in_future_to_register=168,
+    # Every day class, one is always due within the week
+    weekday_classes_to_register={day_name: [23] for day_name in calendar.day_name},
+)
+
+
+def test_worker_keeps_the_partial_report_of_a_failed_run(monkeypatch):
+    registered_datetime = datetime(2025, 1, 14, 12)
+
+    def failing_register_account(report, **kwargs):
+        report.registered_date_list.append(registered_datetime)
+        raise RuntimeError("Browser crashed")
+
+    monkeypatch.setattr(
+        fliip_register_class, "register_account", failing_register_account
+    )
+    report = fliip_register_class._register_account_worker(
+        account_config=account_config,
+        headless=True,
+        web_timeout=1.0,
+        http_backend=True,
+        use_session_cache=False,
+    )
+    assert report.registered_date_list == [registered_datetime]
+    assert str(report.run_error) == "Browser crashed"
+    assert report.has_errors
+
+
+def test_http_session_closed_when_the_login_fails(monkeypatch):
+    pytest.importorskip("requests")
+    closed_sessions = []
+
+    def failing_login(self, **kwargs):
+        raise RuntimeError("Fliip login failed")
+
+    monkeypatch.setattr(fliip_register_class.FliipHttpSession, "login", failing_login)
+    # No run metrics trace written next to the script
+    monkeypatch.setattr(
+        fliip_register_class,
+        "register_account",
+        functools.partial(fliip_register_class.register_account, metrics_dir_path=None),
+    )
+    monkeypatch.setattr(
+        fliip_register_class.FliipHttpSession,
+        "close",
+        lambda self: closed_sessions.append(self),
+    )
+    report = fliip_register_class._register_account_worker(
+        account_config=account_config,
+        headless=True,
+        web_timeout=1.0,
+        http_backend=True,
+        use_session_cache=False,
+    )
+    assert str(report.run_error) == "Fliip login failed"
+    assert len(closed_sessions) == 1
+
+
+def test_accounts_run_passes_the_account_options_through(tmp_path, monkeypatch):
+    account_run_kwargs = []
+
+    def recorded_register_account(**kwargs):
+        account_run_kwargs.append(kwargs)
+        return kwargs["report"]
+
+    monkeypatch.setattr(
+        fliip_register_class, "register_account", recorded_register_account
+    )
+    timetable_cache = fliip_register_class.TimetableCache(db_path=":memory:")
+    monkeypatch.setattr(
+        fliip_register_class, "TimetableCache", lambda: timetable_cache
+    )
+    fliip_register_class.run_accounts(
+        account_config_list=[account_config, account_config],
+        use_state_store=False,
+        metrics_dir_path=tmp_path.joinpath("metrics"),
+        prometheus_textfile_dir_path=tmp_path.joinpath("prometheus"),
+        multi_tab=True,
+        record_fixtures_dir_path=tmp_path.joinpath("fixtures"),
+        direct_week_navigation=False,
+    )
+    assert len(account_run_kwargs) == 2
+    for kwargs in account_run_kwargs:
+        assert kwargs["metrics_dir_path"] == tmp_path.joinpath("metrics")
+        assert kwargs["prometheus_textfile_dir_path"] == tmp_path.joinpath("prometheus")
+        assert kwargs["multi_tab"] is True
+        assert kwargs["record_fixtures_dir_path"] == tmp_path.joinpath("fixtures")
+        assert kwargs["direct_week_navigation"] is False
+        assert kwargs["timetable_cache"] is timetable_cache
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import fliip_register_class
+
+class_datetime = (datetime.now() + timedelta(days=1)).replace(
+    hour=12, minute=0, second=0, microsecond=0
+)
+
+
+def week_classes_with_status(status_text: str) -> dict:
+    calendar_class = fliip_register_class.CalendarClass(
+        element_id=f"812345,{class_datetime.strftime('%Y-%m-%d')}",
+        class_date=class_datetime.strftime("%Y-%m-%d"),
+        start_time="12:00",
+        end_time="13:00",
+        name="CrossFit",
+        status_text=status_text,
+        register_onclick=None,
+    )
+    return {(calendar_class.class_date, calendar_class.start_time): calendar_class}
+
+
+def test_confirmed_class_is_already_registered():
+    assert (
+        fliip_register_class.register_to_class(
+            web_handle=None,
+            datetime_to_register=class_datetime,
+            week_classes=week_classes_with_status("Confirmed"),
+        )
+        is False
+    )
+
+
+def test_waiting_list_class_is_not_already_registered():
+    register_function = lambda datetime_to_register: (
+        fliip_register_class.register_to_class(
+            web_handle=None,
+            datetime_to_register=datetime_to_register,
+            week_classes=week_classes_with_status("Waiting"),
+        )
+    )
+    with pytest.raises(fliip_register_class.ClassWaitlistedError):
+        register_function(class_datetime)
+
+    # Still reported registered by the run, without an error
+    registered_return_list, error_date_list = [], []
+    fliip_register_class.register_calendar_week(
+        register_function=register_function,
+        datetime_to_register_list=[class_datetime],
+        registered_return_list=registered_return_list,
+        error_date_list=error_date_list,
+    )
+    assert registered_return_list == [class_datetime]
+    assert error_date_list == []
@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import fliip_register_class
+
+
+def test_waitlisted_class_is_registered_again():
+    state_store = fliip_register_class.RegistrationStateStore(db_path=":memory:")
+    class_datetime = datetime.now().replace(second=0, microsecond=0) + timedelta(days=1)
+
+    def register_function(datetime_to_register):
+        raise fliip_register_class.ClassWaitlistedError()
+
+    recorded_register_function = fliip_register_class._recorded_register_function(
+        register_function, state_store, "samplegym", "user@example.com"
+    )
+    with pytest.raises(fliip_register_class.ClassWaitlistedError):
+        recorded_register_function(class_datetime)
+    state = state_store.get("samplegym", "user@example.com", class_datetime)
+    assert state["status"] == "waitlisted"
+    assert state["last_error"] is None
+    assert not state_store.is_done("samplegym", "user@example.com", class_datetime)
+
+    recorded_register_function = fliip_register_class._recorded_register_function(
+        lambda datetime_to_register: True,
+        state_store,
+        "samplegym",
+        "user@example.com",
+    )
+    assert recorded_register_function(class_datetime) is True
+    assert state_store.is_done("samplegym", "user@example.com", class_datetime)
+    state_store.close()
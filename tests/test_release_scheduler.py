@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import fliip_register_class
+
+
+def test_release_booking_latencies_are_measured_at_the_booking(tmp_path, monkeypatch):
+    pytest.importorskip("requests")
+    fliip_benchmark = pytest.importorskip("fliip_benchmark")
+    scenario = fliip_benchmark.benchmark_scenarios[0]
+    monkeypatch.setattr(
+        fliip_register_class,
+        "http_booking_steps_file_path",
+        tmp_path.joinpath("fliip_http_booking.json"),
+    )
+    class_datetime = min(
+        class_datetime
+        for week_datetimes in fliip_register_class.plan_target_datetimes(
+            weekday_classes_to_register=scenario.weekday_classes_to_register,
+            max_hours_in_future_to_register=scenario.max_hours_in_future_to_register,
+        ).values()
+        for class_datetime in week_datetimes
+    )
+    with fliip_benchmark.FakeFliipServer(scenario) as fake_server:
+        monkeypatch.setattr(
+            fliip_register_class, "fliip_base_url_template", fake_server.base_url
+        )
+        release_datetime = datetime.now() + timedelta(seconds=0.5)
+        result = fliip_register_class.register_at_release(
+            account_config=fliip_register_class.FliipAccountConfig(
+                fliip_gym_name="benchmark",
+                fliip_username="benchmark@fliip.test",
+                fliip_password="benchmark",
+                max_hours_in_future_to_register=scenario.max_hours_in_future_to_register,
+                weekday_classes_to_register=scenario.weekday_classes_to_register,
+            ),
+            release_datetime=release_datetime,
+            class_datetime=class_datetime,
+            prelaunch_lead_s=0.5,
+            http_backend=True,
+            use_session_cache=False,
+        )
+    assert result.error is None
+    assert result.registered is True
+    # Submitted at the first booking request, after the week page fetch of the release
+    assert 0 < result.submit_latency_s < result.done_latency_s
@@ -0,0 +1,42 @@
+import pytest
+
+import fliip_register_class
+
+
+def _retry_engine() -> fliip_register_class.RetryEngine:
+    return fliip_register_class.RetryEngine(
+        policy=fliip_register_class.RetryPolicy(max_attempts=4, base_delay_s=0)
+    )
+
+
+@pytest.mark.parametrize("step", ["booking_confirm", "booking_alert", "booking_script"])
+def test_failures_after_confirm_click_reload_before_retry(step):
+    calls = []
+
+    def book_class():
+        calls.append("book")
+        if len(calls) == 1:
+            raise fliip_register_class.BookingStepError("click failed", step=step)
+        return True
+
+    assert (
+        _retry_engine().call(
+            book_class, "booking", reload_page=lambda: calls.append("reload")
+        )
+        is True
+    )
+    assert calls == ["book", "reload", "book"]
+
+
+def test_class_not_found_reloads_once():
+    calls = []
+
+    def book_class():
+        calls.append("book")
+        raise fliip_register_class.ClassNotFoundError("no class")
+
+    with pytest.raises(fliip_register_class.ClassNotFoundError):
+        _retry_engine().call(
+            book_class, "booking", reload_page=lambda: calls.append("reload")
+        )
+    assert calls == ["book", "reload", "book"]
@@ -0,0 +1,67 @@
+import json
+import logging
+import logging.handlers
+import sys
+
+import fliip_register_class
+
+
+def test_json_log_line_has_exception_apart():
+    try:
+        raise ValueError("Booking failed")
+    except ValueError:
+        record = fliip_register_class.logger.makeRecord(
+            fliip_register_class.logger.name,
+            logging.ERROR,
+            __file__,
+            1,
+            "Registration failed for %s",
+            ("2025-01-14 12:00",),
+            exc_info=sys.exc_info(),
+        )
+    record.stack_info = "Stack (most recent call last):\n  test"
+    record = fliip_register_class.logging_queue_handler.prepare(record)
+    log_entry = json.loads(fliip_register_class.JsonLinesFormatter().format(record))
+    assert log_entry["message"] == "Registration failed for 2025-01-14 12:00"
+    assert "ValueError: Booking failed" in log_entry["exc"]
+    assert log_entry["stack"].startswith("Stack")
+    # The console keeps the traceback after the message
+    assert "ValueError: Booking failed" in fliip_register_class.logging_stream_formatter.format(
+        record
+    )
+
+
+def test_run_log_spans_rotated_files(tmp_path, monkeypatch):
+    log_file_path = tmp_path.joinpath("fliip_register.log")
+    rotating_file_handler = logging.handlers.RotatingFileHandler(
+        log_file_path, maxBytes=2000, backupCount=5
+    )
+    rotating_file_handler.setFormatter(fliip_register_class.JsonLinesFormatter())
+    run_log_index = fliip_register_class.RunLogIndex(
+        tmp_path.joinpath("fliip_register.log.index.json")
+    )
+    rotating_file_handler.addFilter(run_log_index.mark_start)
+    monkeypatch.setattr(fliip_register_class, "logging_file_handler", rotating_file_handler)
+    monkeypatch.setattr(fliip_register_class, "run_log_index", run_log_index)
+    monkeypatch.setattr(
+        fliip_register_class.log_queue_listener,
+        "handlers",
+        (rotating_file_handler, run_log_index),
+    )
+
+    with fliip_register_class.log_context(run_id="otherrun"):
+        fliip_register_class.logger.info("Line of another run")
+    with fliip_register_class.log_context(run_id="rotatedrun"):
+        for line_ind in range(40):
+            fliip_register_class.logger.info(f"Line {line_ind} of the rotated run")
+    fliip_register_class.flush_logs()
+    rotating_file_handler.close()
+
+    assert len(fliip_register_class.get_rotated_log_file_paths(log_file_path)) > 0
+    assert run_log_index.get("rotatedrun") is None
+    run_log_lines = fliip_register_class.read_run_log(
+        "rotatedrun", log_file_path
+    ).splitlines()
+    assert [json.loads(line)["message"] for line in run_log_lines] == [
+        f"Line {line_ind} of the rotated run" for line_ind in range(40)
+    ]
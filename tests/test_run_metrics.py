@@ -0,0 +1,34 @@
+import os
+import time
+
+import fliip_register_class
+
+
+def test_old_and_extra_traces_are_removed(tmp_path):
+    for _ in range(5):
+        fliip_register_class.RunMetrics().write_json_trace(tmp_path)
+    trace_file_paths = sorted(tmp_path.glob("trace_*.json"))
+    assert len(trace_file_paths) == 5
+    old_time = time.time() - 40 * 24 * 3600
+    os.utime(trace_file_paths[-1], (old_time, old_time))
+
+    fliip_register_class.clean_old_metrics_traces(tmp_path, max_traces=3)
+    # Oldest names past the max count, then the stale one
+    assert sorted(tmp_path.glob("trace_*.json")) == trace_file_paths[2:4]
+
+
+def test_prometheus_textfile_has_the_spans_and_counters(tmp_path):
+    run_metrics = fliip_register_class.RunMetrics(gym="samplegym")
+    run_metrics.record_span("login", time.time(), 1.5)
+    run_metrics.record_span("login", time.time(), 0.5)
+    run_metrics.count("webdriver_commands", 3)
+    textfile_path = tmp_path.joinpath("fliip.prom")
+
+    run_metrics.write_prometheus_textfile(textfile_path)
+    textfile_lines = textfile_path.read_text().splitlines()
+    assert 'fliip_span_duration_seconds{gym="samplegym",span="login"} 2.0' in textfile_lines
+    assert 'fliip_span_count{gym="samplegym",span="login"} 2' in textfile_lines
+    assert (
+        'fliip_counter{gym="samplegym",counter="webdriver_commands"} 3' in textfile_lines
+    )
+    assert not textfile_path.with_suffix(".prom.tmp").exists()
@@ -0,0 +1,40 @@
+import pytest
+
+import fliip_register_class
+
+
+def test_rejected_cached_session_is_invalidated(tmp_path, monkeypatch):
+    requests = pytest.importorskip("requests")
+    pytest.importorskip("cryptography")
+    monkeypatch.setattr(fliip_register_class, "session_cache_dir_path", tmp_path)
+    fliip_register_class.save_session_cache(
+        "samplegym",
+        "user@example.com",
+        "password",
+        cookies=[{"name": "fliip_session", "value": "stale", "path": "/"}],
+        language="en",
+    )
+    assert (
+        fliip_register_class.load_session_cache(
+            "samplegym", "user@example.com", "password"
+        )
+        is not None
+    )
+
+    def rejected_get(path, **kwargs):
+        response = requests.Response()
+        response.status_code = 403
+        raise requests.HTTPError("403 Client Error: Forbidden", response=response)
+
+    with fliip_register_class.FliipHttpSession(
+        fliip_gym_name="samplegym", base_url="http://127.0.0.1:9"
+    ) as http_session:
+        monkeypatch.setattr(http_session, "_get", rejected_get)
+        assert not http_session._restore_cached_session("user@example.com", "password")
+        assert len(http_session.session.cookies) == 0
+    assert (
+        fliip_register_class.load_session_cache(
+            "samplegym", "user@example.com", "password"
+        )
+        is None
+    )
@@ -0,0 +1,44 @@
+import json
+import html
+
+import fliip_register_class
+
+
+def test_redact_secret_forms():
+    username = "Jane.Doe+gym@Example.com"
+    password = 'p&ss"wörd<1>'
+    session_recorder = fliip_register_class.SessionRecorder(
+        fliip_gym_name="samplegym", backend="http", secrets=[username, password]
+    )
+    page = "".join(
+        [
+            f'<input value="{html.escape(username.lower())}">',
+            json.dumps({"email": username.upper(), "password": password}),
+            "username=Jane.Doe%2Bgym%40Example.com&password=p%26ss%22w%C3%B6rd%3C1%3E",
+            f"<p>{html.escape(password, quote=False)}</p>",
+        ]
+    )
+    assert session_recorder.redact(page) == (
+        '<input value="REDACTED">{"email": "REDACTED", "password": "REDACTED"}'
+        "username=REDACTED&password=REDACTED<p>REDACTED</p>"
+    )
+    # Passwords are case sensitive, only their exact forms are replaced
+    assert session_recorder.redact(password.upper()) == password.upper()
+
+
+def test_recordings_started_in_the_same_second_get_their_own_bundle(tmp_path):
+    session_recorders = [
+        fliip_register_class.SessionRecorder(
+            fliip_gym_name="samplegym", backend="http", secrets=[]
+        )
+        for _ in range(2)
+    ]
+    session_recorders[1].start_time = session_recorders[0].start_time
+    bundle_dir_paths = [
+        session_recorder.save(tmp_path) for session_recorder in session_recorders
+    ]
+    assert bundle_dir_paths[0] != bundle_dir_paths[1]
+    assert all(
+        bundle_dir_path.joinpath("manifest.json").exists()
+        for bundle_dir_path in bundle_dir_paths
+    )
@@ -0,0 +1,90 @@
+import calendar
+import threading
+import time
+
+import pytest
+
+import fliip_register_class
+
+account_config = fliip_register_class.FliipAccountConfig(
+    fliip_gym_name="benchmark",
+    fliip_username="benchmark@fliip.test",
+    fliip_password="benchmark",
+    max_hours_in_future_to_register=168,
+    weekday_classes_to_register={day_name: [12] for day_name in calendar.day_name},
+)
+
+
+def test_watcher_books_a_freed_up_full_class_only(tmp_path, monkeypatch):
+    pytest.importorskip("requests")
+    fliip_benchmark = pytest.importorskip("fliip_benchmark")
+    monkeypatch.setattr(
+        fliip_register_class,
+        "http_booking_steps_file_path",
+        tmp_path.joinpath("fliip_http_booking.json"),
+    )
+    # Open and FULL classes every other day
+    scenario = fliip_benchmark.BenchmarkScenario(
+        name="watch",
+        weekday_classes_to_register=account_config.weekday_classes_to_register,
+        class_status_cycle=["open", "FULL"],
+    )
+    full_class_datetime = next(
+        class_datetime
+        for week_datetimes in fliip_register_class.plan_target_datetimes(
+            weekday_classes_to_register=account_config.weekday_classes_to_register,
+            max_hours_in_future_to_register=account_config.max_hours_in_future_to_register,
+        ).values()
+        for class_datetime in week_datetimes
+        if class_datetime.date().toordinal() % 2 == 1
+    )
+    stop_event = threading.Event()
+    with fliip_benchmark.FakeFliipServer(scenario) as fake_server:
+        monkeypatch.setattr(
+            fliip_register_class, "fliip_base_url_template", fake_server.base_url
+        )
+
+        def free_up_spot() -> None:
+            time.sleep(0.5)
+            with fake_server._lock:
+                fake_server.class_statuses[
+                    (full_class_datetime.date().isoformat(), 12)
+                ] = "open"
+            time.sleep(1.5)
+            stop_event.set()
+
+        spot_thread = threading.Thread(target=free_up_spot)
+        spot_thread.start()
+        report = fliip_register_class.watch_full_classes(
+            account_config=account_config,
+            http_backend=True,
+            use_session_cache=False,
+            min_poll_period_s=0.2,
+            stop_event=stop_event,
+        )
+        spot_thread.join()
+    assert report.registered_date_list == [full_class_datetime]
+    # The open classes are left to the registering runs
+    assert fake_server.class_statuses == {
+        (full_class_datetime.date().isoformat(), 12): "Confirmed"
+    }
+
+
+def test_watcher_http_session_closed_when_the_login_fails(monkeypatch):
+    pytest.importorskip("requests")
+    closed_sessions = []
+
+    def failing_login(self, **kwargs):
+        raise RuntimeError("Fliip login failed")
+
+    monkeypatch.setattr(fliip_register_class.FliipHttpSession, "login", failing_login)
+    monkeypatch.setattr(
+        fliip_register_class.FliipHttpSession,
+        "close",
+        lambda self: closed_sessions.append(self),
+    )
+    with pytest.raises(RuntimeError, match="Fliip login failed"):
+        fliip_register_class.watch_full_classes(
+            account_config=account_config, http_backend=True, use_session_cache=False
+        )
+    assert len(closed_sessions) == 1